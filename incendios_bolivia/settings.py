@@ -164,6 +164,101 @@ LEAFLET_CONFIG = {
                {"attribution": "&copy; OpenStreetMap contributors"})],
 }
 
+# Límites administrativos locales (GeoJSON o shapefile) para asignar
+# departamento/municipio durante la ingesta. 'propiedad' es el atributo
+# del feature con el nombre; si el archivo no existe se usan las cajas
+# aproximadas de NASAFirmsUpdater.departamentos_coords.
+LIMITES_ADMINISTRATIVOS = {
+    "departamento": {
+        "ruta": BASE_DIR / "data" / "limites" / "departamentos.geojson",
+        "propiedad": "nombre",
+        "resolucion": 0.01,
+    },
+    "municipio": {
+        "ruta": BASE_DIR / "data" / "limites" / "municipios.geojson",
+        "propiedad": "nombre",
+        "resolucion": 0.01,
+    },
+}
+
+# Cache en disco de respuestas NASA FIRMS, por (fuente, bbox, rango de días).
+# Los rangos que incluyen el día en curso (UTC) expiran en ttl_abierto
+# segundos; los días ya terminados se sirven localmente durante ttl_cerrado.
+FIRMS_CACHE = {
+    "activo": True,
+    "directorio": BASE_DIR / "cache" / "firms",
+    "ttl_abierto": 10 * 60,
+    "ttl_cerrado": 30 * 24 * 3600,
+    "max_bytes": 500 * 1024 * 1024,
+}
+
+# Ciclo de vida de los incendios: horas sin detecciones nuevas en el evento
+# para pasar de activo a controlado y de controlado a extinto.
+CICLO_VIDA_INCENDIOS = {
+    "controlado_horas": 24,
+    "extinto_horas": 72,
+}
+
+# Retención: las detecciones extintas más antiguas que retencion_dias se
+# mueven a Parquet particionado por mes (requiere pyarrow) con el comando
+# archivar_detecciones. El resumen diario y los eventos se conservan.
+ARCHIVO_HISTORICO = {
+    "directorio": BASE_DIR / "data" / "historico",
+    "retencion_dias": 90,
+    "filas_por_lote": 50000,
+}
+
+# Teselas vectoriales (MVT) de /tiles/{z}/{x}/{y}.pbf: se guardan comprimidas
+# en 'directorio' y la ingesta borra las que toca. 'margen' (en unidades de
+# 'extension') incluye puntos vecinos para que los símbolos no se corten en
+# el borde; 'max_detecciones' limita las más recientes por tesela.
+TESELAS_MVT = {
+    "directorio": BASE_DIR / "cache" / "teselas",
+    "zoom_maximo": 18,
+    "extension": 4096,
+    "margen": 64,
+    "max_detecciones": 50000,
+    "max_age": 60,
+}
+
+# Índice de clusters por zoom de las detecciones en 'estados'
+# (/api/incendios/clusters/). Celdas de 'celda_px' píxeles (potencia de dos);
+# sobre zoom_maximo se devuelven los puntos. Se actualiza tras cada ingesta
+# con solo lo modificado y se reconstruye entero cada 'reconstruir_horas'.
+CLUSTERS_INCENDIOS = {
+    "archivo": BASE_DIR / "cache" / "clusters.npz",
+    "zoom_maximo": 16,
+    "celda_px": 64,
+    "estados": ["activo", "controlado"],
+    "reconstruir_horas": 24,
+}
+
+# Mapa de calor precalculado (/tiles/densidad/<ventana>/z/x/y.png): grillas
+# por zoom hasta zoom_maximo para cada ventana (en horas) sobre el bbox de
+# Bolivia, suavizadas con un núcleo de sigma_px píxeles. Se recalculan tras
+# cada ingesta; sobre zoom_maximo el mapa amplía las teselas del último zoom.
+DENSIDAD_INCENDIOS = {
+    "directorio": BASE_DIR / "cache" / "densidad",
+    "ventanas": {"24h": 24, "7d": 7 * 24, "30d": 30 * 24},
+    "zoom_maximo": 7,
+    "sigma_px": 4.0,
+    "bbox": (-22.9, -69.6, -9.7, -57.5),
+    "max_age": 300,
+}
+
+# PRAGMA aplicados a cada conexión SQLite (monitoreo/utils/conexion_sqlite.py).
+# WAL deja leer al dashboard mientras la ingesta escribe; busy_timeout (ms)
+# espera un bloqueo en lugar de fallar con "database is locked". Un valor
+# None desactiva el PRAGMA correspondiente.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 30000,
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "MEMORY",
+}
+
 # CORS
 CORS_ALLOW_ALL_ORIGINS = True
 
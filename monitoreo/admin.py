@@ -1,9 +1,14 @@
 # monitoreo/admin.py
 from django.contrib import admin
+from django.db import transaction
 from django.contrib.gis.admin import GISModelAdmin
-from .models import Departamento, IncendioForestal
+from .models import (AreaProtegida, Departamento, EventoIncendio, IncendioForestal, MarcaIngesta,
+                     ResumenDiario, TrabajoIngesta, TramoBackfill)
 import folium
 from django.utils.safestring import mark_safe
+from monitoreo.utils import teselas
+from monitoreo.utils.conexion_sqlite import escritura
+from monitoreo.utils.resumen import DeltasResumen
 
 @admin.register(Departamento)
 class DepartamentoAdmin(admin.ModelAdmin):
@@ -11,23 +16,91 @@ class DepartamentoAdmin(admin.ModelAdmin):
     search_fields = ['nombre', 'capital']
     list_filter = ['nombre']
 
+@admin.register(AreaProtegida)
+class AreaProtegidaAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'categoria', 'departamento']
+    search_fields = ['nombre', 'departamento']
+    list_filter = ['categoria']
+
+@admin.register(MarcaIngesta)
+class MarcaIngestaAdmin(admin.ModelAdmin):
+    list_display = ['fuente', 'ultima_adquisicion', 'fecha_actualizacion']
+
+@admin.register(TrabajoIngesta)
+class TrabajoIngestaAdmin(admin.ModelAdmin):
+    list_display = ['id', 'estado', 'etapa', 'filas_procesadas', 'solicitudes', 'fecha_creacion', 'fecha_fin']
+    list_filter = ['estado']
+    readonly_fields = ['fecha_creacion', 'fecha_inicio', 'fecha_fin']
+
+@admin.register(TramoBackfill)
+class TramoBackfillAdmin(admin.ModelAdmin):
+    list_display = ['fuente', 'fecha_inicio', 'dias', 'estado', 'intentos', 'filas', 'nuevos', 'fecha_actualizacion']
+    list_filter = ['estado', 'fuente']
+
+@admin.register(ResumenDiario)
+class ResumenDiarioAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'departamento', 'severidad', 'satelite', 'total', 'area_total_ha']
+    list_filter = ['severidad', 'satelite', 'departamento']
+    date_hierarchy = 'fecha'
+
+@admin.register(EventoIncendio)
+class EventoIncendioAdmin(admin.ModelAdmin):
+    list_display = ['nombre', 'departamento', 'num_detecciones', 'area_total_ha', 'frp_maximo',
+                    'primera_deteccion', 'ultima_deteccion', 'estado']
+    list_filter = ['estado', 'departamento']
+    search_fields = ['nombre', 'departamento__nombre']
+
 @admin.register(IncendioForestal)
 class IncendioForestalAdmin(GISModelAdmin):  # ¡Usa GISModelAdmin!
     list_display = ['nombre', 'departamento', 'fecha_deteccion', 'severidad', 'estado', 'area_afectada_ha']
     list_filter = ['estado', 'severidad', 'departamento', 'fecha_deteccion', 'satelite']
-    search_fields = ['nombre', 'departamento__nombre', 'notas']
+    search_fields = ['nombre', 'departamento__nombre', 'municipio', 'notas']
     readonly_fields = ['fecha_ultima_actualizacion', 'mapa_preview']
+    raw_id_fields = ['evento']
+    
+    # El resumen diario se mantiene por deltas: las ediciones y borrados del
+    # admin restan lo anterior y suman lo nuevo en la misma transacción
+    def save_model(self, request, obj, form, change):
+        resumen = DeltasResumen()
+        with escritura():
+            if change:
+                resumen.sumar_incendio(IncendioForestal.objects.get(pk=obj.pk), signo=-1)
+            super().save_model(request, obj, form, change)
+            resumen.sumar_incendio(obj)
+            resumen.aplicar()
+    
+    def delete_model(self, request, obj):
+        latitud, longitud = obj.latitud, obj.longitud
+        resumen = DeltasResumen()
+        with escritura():
+            resumen.sumar_incendio(IncendioForestal.objects.get(pk=obj.pk), signo=-1)
+            super().delete_model(request, obj)
+            resumen.aplicar()
+        transaction.on_commit(lambda: teselas.invalidar([latitud], [longitud]))
+    
+    def delete_queryset(self, request, queryset):
+        """Acción "eliminar seleccionados": invalida las teselas del lote una sola vez"""
+        resumen = DeltasResumen()
+        with escritura():
+            incendios = list(queryset.only('fecha_deteccion', 'departamento_id', 'severidad', 'satelite',
+                                           'area_afectada_ha', 'intensidad', 'latitud', 'longitud'))
+            for incendio in incendios:
+                resumen.sumar_incendio(incendio, signo=-1)
+            super().delete_queryset(request, queryset)
+            resumen.aplicar()
+        transaction.on_commit(lambda: teselas.invalidar([i.latitud for i in incendios],
+                                                        [i.longitud for i in incendios]))
     
     # Campos organizados en pestañas
     fieldsets = [
         ('Información Básica', {
-            'fields': ['nombre', 'departamento', 'estado', 'severidad']
+            'fields': ['nombre', 'departamento', 'municipio', 'estado', 'severidad']
         }),
         ('Ubicación Geoespacial', {
             'fields': ['ubicacion', 'mapa_preview']
         }),
         ('Métricas del Incendio', {
-            'fields': ['intensidad', 'area_afectada_ha', 'confianza_deteccion']
+            'fields': ['intensidad', 'area_afectada_ha', 'frp', 'confianza_deteccion', 'evento']
         }),
         ('Datos Satelitales', {
             'fields': ['satelite', 'brillo_temperatura', 'pixel_size', 'fuente_datos']
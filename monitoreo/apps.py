@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class MonitoreoConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "monitoreo"
+
+    def ready(self):
+        from monitoreo import signals  # noqa: F401
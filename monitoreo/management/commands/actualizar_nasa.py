@@ -1,6 +1,11 @@
 # monitoreo/management/commands/actualizar_nasa.py - VERSIÓN CORREGIDA
-from django.core.management.base import BaseCommand
-from monitoreo.utils.nasa_firms import NASAFirmsUpdater
+import tempfile
+import threading
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from monitoreo.utils.nasa_firms import FUENTES_FIRMS, NASAFirmsUpdater
+from monitoreo.utils.planificador import BloqueoInstancia, instalar_senales, vigilar
 from decouple import config
 
 class Command(BaseCommand):
@@ -16,11 +21,78 @@ class Command(BaseCommand):
         parser.add_argument(
             '--source',
             type=str,
-            default='MODIS_NRT',
-            help='Fuente de datos (MODIS_NRT, VIIRS_NRT, etc.)'
+            nargs='+',
+            default=['MODIS_NRT'],
+            help=f'Fuente(s) de datos, se descargan en paralelo ({", ".join(FUENTES_FIRMS)}, o "todas")'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=30,
+            help='Timeout por fuente en segundos (default: 30)'
+        )
+        parser.add_argument(
+            '--tiles',
+            type=str,
+            default='1x1',
+            help='Divide el bbox de Bolivia en FILASxCOLUMNAS teselas (ej: 3x3)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Descargas simultáneas de teselas por fuente (default: 4)'
+        )
+        parser.add_argument(
+            '--streaming',
+            action='store_true',
+            help='Parsea y escribe la respuesta en bloques (memoria acotada)'
+        )
+        parser.add_argument(
+            '--chunksize',
+            type=int,
+            default=5000,
+            help='Filas por bloque en modo streaming (default: 5000)'
+        )
+        parser.add_argument(
+            '--sin-cache',
+            action='store_true',
+            help='Ignora el cache en disco de respuestas FIRMS'
+        )
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Reprocesa toda la ventana de --days ignorando la marca de agua y las filas ya vistas '
+                 '(no admite --watch)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Tamaño de lote para bulk_create/bulk_update (default: 500)'
+        )
+        parser.add_argument(
+            '--por-fila',
+            action='store_true',
+            help='Usa la ruta de escritura por fila en lugar de la ruta bulk'
+        )
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='Queda en ejecución y consulta según las ventanas de paso/publicación de cada satélite'
+        )
+        parser.add_argument(
+            '--lock',
+            type=str,
+            default=str(Path(tempfile.gettempdir()) / 'monitoreo_actualizar_nasa.lock'),
+            help='Archivo de bloqueo de instancia única para --watch'
         )
     
     def handle(self, *args, **options):
+        if options['watch'] and options['completo']:
+            # Sin marcas de agua cada ciclo volvería a bajar la ventana entera
+            raise CommandError('--completo no se puede usar con --watch')
+        
         # Verificar API Key
         api_key = config('NASA_FIRMS_API_KEY', default=None)
         if not api_key:
@@ -32,11 +104,28 @@ class Command(BaseCommand):
         
         self.stdout.write(self.style.SUCCESS(f'🚀 Iniciando actualización NASA FIRMS (últimos {options["days"]} días)...'))
         
-        updater = NASAFirmsUpdater(api_key=api_key)
+        updater = NASAFirmsUpdater(
+            api_key=api_key,
+            batch_size=options['batch_size'],
+            modo_bulk=not options['por_fila'],
+            timeout=options['timeout'],
+            tiles=[int(n) for n in options['tiles'].lower().split('x')],
+            workers_tiles=options['workers'],
+            streaming=options['streaming'],
+            chunksize=options['chunksize'],
+            # En --watch cada consulta debe ver datos frescos
+            usar_cache=not (options['sin_cache'] or options['watch']),
+            incremental=not options['completo']
+        )
+        fuentes = FUENTES_FIRMS if 'todas' in options['source'] else options['source']
+        
+        if options['watch']:
+            return self._vigilar(updater, fuentes, options)
         
         try:
             resultados = updater.ejecutar_actualizacion(
-                days=options['days']
+                days=options['days'],
+                sources=fuentes
             )
             
             # Mostrar resultados
@@ -46,6 +135,14 @@ class Command(BaseCommand):
             self.stdout.write(f"   🔄 Actualizados: {resultados['actualizados']}")
             self.stdout.write(f"   📈 Total en BD: {resultados['total']}")
             self.stdout.write(f"   ⚡ Activos: {resultados['activos']}")
+            cambios = ', '.join(f"{n} → {estado}" for estado, n in resultados['estados'].items() if n)
+            self.stdout.write(f"   🔁 Cambios de estado: {cambios or 'ninguno'}")
+            for fuente, filas in resultados['fuentes'].items():
+                self.stdout.write(f"   📡 {fuente}: {filas}")
+            if resultados['cache']:
+                self.stdout.write(
+                    f"   📦 Cache: {resultados['cache']['hits']} hits, {resultados['cache']['misses']} misses"
+                )
             
             if resultados['nuevos'] == 0 and resultados['actualizados'] == 0:
                 self.stdout.write(self.style.WARNING('⚠️  No se encontraron incendios nuevos en el área de Bolivia'))
@@ -56,4 +153,17 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('💡 Verifica:'))
             self.stdout.write(self.style.WARNING('   1. Tu API Key es válida'))
             self.stdout.write(self.style.WARNING('   2. Tienes conexión a internet'))
-            self.stdout.write(self.style.WARNING('   3. La API de NASA FIRMS está funcionando'))
\ No newline at end of file
+            self.stdout.write(self.style.WARNING('   3. La API de NASA FIRMS está funcionando'))
+    def _vigilar(self, updater, fuentes, options):
+        """Modo planificador de larga duración"""
+        bloqueo = BloqueoInstancia(options['lock'])
+        if not bloqueo.adquirir():
+            self.stdout.write(self.style.ERROR(f'❌ Ya hay un planificador en ejecución ({options["lock"]})'))
+            return
+        
+        parar = threading.Event()
+        instalar_senales(parar)
+        self.stdout.write(self.style.SUCCESS(f'🛰️  Planificador iniciado para {", ".join(fuentes)} (Ctrl+C para detener)'))
+        with bloqueo:
+            ciclos = vigilar(updater, fuentes, options['days'], parar=parar, bloqueo=bloqueo)
+        self.stdout.write(self.style.SUCCESS(f'⏹️  Planificador detenido tras {ciclos} ciclo(s)'))
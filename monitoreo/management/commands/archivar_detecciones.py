@@ -0,0 +1,81 @@
+# monitoreo/management/commands/archivar_detecciones.py
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from monitoreo.utils.archivo_historico import archivar, compactar, configuracion
+
+
+class Command(BaseCommand):
+    help = ('Mueve detecciones extintas más antiguas que la retención a Parquet particionado '
+            'por mes y las borra de SQLite (el resumen diario y los eventos se conservan)')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Retención en días (default: ARCHIVO_HISTORICO["retencion_dias"])'
+        )
+        parser.add_argument(
+            '--directorio',
+            type=str,
+            default=None,
+            help='Directorio del archivo histórico (default: ARCHIVO_HISTORICO["directorio"])'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=None,
+            help='Detecciones por lote (default: ARCHIVO_HISTORICO["filas_por_lote"])'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Solo cuenta las detecciones que se archivarían'
+        )
+        parser.add_argument(
+            '--compactar',
+            action='store_true',
+            help='Une los archivos de cada partición mensual en uno solo'
+        )
+        parser.add_argument(
+            '--vacuum',
+            action='store_true',
+            help='Ejecuta VACUUM al terminar para devolver el espacio liberado al disco'
+        )
+
+    def handle(self, *args, **options):
+        dias = options['dias'] if options['dias'] is not None else configuracion()['retencion_dias']
+        inicio = time.perf_counter()
+        try:
+            resultado = archivar(
+                antes_de=timezone.now() - timedelta(days=dias),
+                directorio=options['directorio'],
+                filas_por_lote=options['lote'],
+                simular=options['simular'],
+            )
+            if options['simular']:
+                self.stdout.write(
+                    f"🔎 Se archivarían {resultado['archivadas']} detecciones anteriores a "
+                    f"{resultado['antes_de']:%Y-%m-%d}"
+                )
+                return
+            self.stdout.write(self.style.SUCCESS(
+                f"🗄️ {resultado['archivadas']} detecciones archivadas en {resultado['archivos']} "
+                f"archivo(s) ({time.perf_counter() - inicio:.1f}s)"
+            ))
+
+            if options['compactar']:
+                particiones = compactar(options['directorio'])
+                self.stdout.write(f'🧱 {particiones} partición(es) compactada(s)')
+        except ImportError as e:
+            raise CommandError(f'El archivo histórico requiere pyarrow: {e}')
+
+        if options['vacuum'] and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM')
+            self.stdout.write('🧹 VACUUM completado')
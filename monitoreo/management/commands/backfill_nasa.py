@@ -0,0 +1,133 @@
+# monitoreo/management/commands/backfill_nasa.py
+from datetime import date
+
+from decouple import config
+from django.core.management.base import BaseCommand, CommandError
+
+from monitoreo.utils.backfill import ejecutar_backfill
+from monitoreo.utils.nasa_firms import FUENTES_FIRMS, NASAFirmsUpdater
+
+
+class Command(BaseCommand):
+    help = ('Carga un rango histórico de NASA FIRMS en tramos de días, descargados en paralelo '
+            'y con puntos de control para reanudar una corrida interrumpida')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--desde', '--from',
+            dest='desde',
+            type=date.fromisoformat,
+            required=True,
+            help='Primer día (UTC, AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--hasta', '--to',
+            dest='hasta',
+            type=date.fromisoformat,
+            required=True,
+            help='Último día incluido (UTC, AAAA-MM-DD)'
+        )
+        parser.add_argument(
+            '--fuentes', '--sources',
+            dest='fuentes',
+            type=str,
+            nargs='+',
+            default=['MODIS_NRT'],
+            help=(f'Fuente(s) FIRMS ({", ".join(FUENTES_FIRMS)}, o "todas"). Para fechas de más de '
+                  'unos meses usar los productos estándar, p. ej. MODIS_SP o VIIRS_SNPP_SP')
+        )
+        parser.add_argument(
+            '--dias-por-tramo',
+            type=int,
+            default=5,
+            help='Días por solicitud a FIRMS (default: 5; máximo 10). Para reanudar usar el mismo valor'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Tramos descargándose a la vez (default: 4)'
+        )
+        parser.add_argument(
+            '--tiles',
+            type=str,
+            default='1x1',
+            help='Divide el bbox de Bolivia en FILASxCOLUMNAS teselas por tramo (ej: 2x2)'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=60,
+            help='Timeout por solicitud en segundos (default: 60)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tamaño de lote para bulk_create/bulk_update (default: 1000)'
+        )
+        parser.add_argument(
+            '--sin-reintentos',
+            action='store_true',
+            help='No reintenta los tramos que fallaron en corridas anteriores'
+        )
+
+    def handle(self, *args, **options):
+        api_key = config('NASA_FIRMS_API_KEY', default=None)
+        if not api_key:
+            raise CommandError('API Key no configurada. Agrega NASA_FIRMS_API_KEY a .env')
+        if options['hasta'] < options['desde']:
+            raise CommandError('--hasta es anterior a --desde')
+
+        updater = NASAFirmsUpdater(
+            api_key=api_key,
+            batch_size=options['batch_size'],
+            timeout=options['timeout'],
+            tiles=[int(n) for n in options['tiles'].lower().split('x')],
+            incremental=False,
+        )
+        if not 1 <= options['dias_por_tramo'] <= updater.dias_maximos:
+            raise CommandError(f'--dias-por-tramo debe estar entre 1 y {updater.dias_maximos}')
+        fuentes = FUENTES_FIRMS if 'todas' in options['fuentes'] else options['fuentes']
+
+        self.stdout.write(self.style.SUCCESS(
+            f"🗓️ Backfill {options['desde']} → {options['hasta']} ({', '.join(fuentes)})"
+        ))
+
+        def informar(tramo, totales):
+            hechos = totales['completados'] + totales['errores']
+            if tramo.estado == 'completado':
+                self.stdout.write(
+                    f"   ✅ [{hechos}/{totales['tramos']}] {tramo.fuente} {tramo.fecha_inicio} "
+                    f"+{tramo.dias}d: {tramo.filas} filas, {tramo.nuevos} nuevas"
+                )
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"   ❌ [{hechos}/{totales['tramos']}] {tramo.fuente} {tramo.fecha_inicio} "
+                    f"+{tramo.dias}d: {tramo.error}"
+                ))
+
+        try:
+            totales = ejecutar_backfill(
+                options['desde'], options['hasta'], fuentes,
+                dias_por_tramo=options['dias_por_tramo'],
+                workers=options['workers'],
+                updater=updater,
+                reintentar=not options['sin_reintentos'],
+                informar=informar,
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('⏹️  Interrumpido: vuelve a ejecutar el comando para reanudar'))
+            return
+
+        if not totales['tramos']:
+            self.stdout.write('✅ Nada pendiente: todos los tramos ya estaban completados')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totales['completados']}/{totales['tramos']} tramos en {totales['segundos']}s: "
+            f"{totales['filas']} filas, {totales['nuevos']} nuevas, {totales['actualizados']} actualizadas"
+        ))
+        if totales['errores']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  {totales['errores']} tramo(s) con error: vuelve a ejecutar para reintentarlos"
+            ))
@@ -0,0 +1,121 @@
+# monitoreo/management/commands/benchmark_espacial.py
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from monitoreo.utils.clave_espacial import clave_espacial, rangos_bbox
+from monitoreo.utils.limites import BBOX_BOLIVIA
+
+
+class Command(BaseCommand):
+    help = 'Compara consultas por bbox con full scan vs. rangos de clave_espacial en SQLite'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=2000000,
+            help='Detecciones sintéticas a generar (default: 2000000)'
+        )
+        parser.add_argument(
+            '--consultas',
+            type=int,
+            default=50,
+            help='Consultas por tamaño de bbox (default: 50)'
+        )
+        parser.add_argument(
+            '--max-rangos',
+            type=int,
+            default=24,
+            help='Máximo de rangos de clave por bbox (default: 24)'
+        )
+
+    def _poblar(self, conexion, filas):
+        rng = np.random.default_rng(0)
+        # Focos agrupados como en temporada de quemas, sobre el bbox de Bolivia
+        centros = np.c_[
+            rng.uniform(BBOX_BOLIVIA['min_lat'], BBOX_BOLIVIA['max_lat'], 2000),
+            rng.uniform(BBOX_BOLIVIA['min_lon'], BBOX_BOLIVIA['max_lon'], 2000),
+        ]
+        conexion.execute(
+            'CREATE TABLE incendio (id INTEGER PRIMARY KEY, latitud REAL, longitud REAL, clave_espacial INTEGER)'
+        )
+        for inicio in range(0, filas, 200000):
+            n = min(200000, filas - inicio)
+            origen = centros[rng.integers(0, len(centros), n)]
+            lat = origen[:, 0] + rng.normal(0, 0.15, n)
+            lon = origen[:, 1] + rng.normal(0, 0.15, n)
+            conexion.executemany(
+                'INSERT INTO incendio (latitud, longitud, clave_espacial) VALUES (?, ?, ?)',
+                zip(lat.tolist(), lon.tolist(), clave_espacial(lat, lon).tolist())
+            )
+        conexion.execute('CREATE INDEX incendio_clave ON incendio (clave_espacial)')
+        conexion.execute('ANALYZE')
+        conexion.commit()
+
+    def _sql_rangos(self, bbox, max_rangos):
+        rangos = rangos_bbox(*bbox, max_rangos=max_rangos)
+        condicion = ' OR '.join(['clave_espacial BETWEEN ? AND ?'] * len(rangos))
+        sql = (f'SELECT count(*) FROM incendio WHERE ({condicion}) '
+               'AND latitud BETWEEN ? AND ? AND longitud BETWEEN ? AND ?')
+        parametros = [v for r in rangos for v in r] + [bbox[0], bbox[2], bbox[1], bbox[3]]
+        return sql, parametros, len(rangos)
+
+    def handle(self, *args, **options):
+        directorio = tempfile.mkdtemp()
+        ruta = os.path.join(directorio, 'benchmark_espacial.sqlite3')
+        conexion = sqlite3.connect(ruta)
+        try:
+            inicio = time.perf_counter()
+            self._poblar(conexion, options['filas'])
+            self.stdout.write(
+                f"📦 {options['filas']:,} filas en {time.perf_counter() - inicio:.1f}s ({ruta})"
+            )
+
+            rng = np.random.default_rng(1)
+            sql_scan = ('SELECT count(*) FROM incendio WHERE latitud BETWEEN ? AND ? '
+                        'AND longitud BETWEEN ? AND ?')
+            for lado in (0.05, 0.2, 1.0):
+                bboxes = []
+                for _ in range(options['consultas']):
+                    lat = rng.uniform(BBOX_BOLIVIA['min_lat'], BBOX_BOLIVIA['max_lat'] - lado)
+                    lon = rng.uniform(BBOX_BOLIVIA['min_lon'], BBOX_BOLIVIA['max_lon'] - lado)
+                    bboxes.append((lat, lon, lat + lado, lon + lado))
+
+                t0 = time.perf_counter()
+                esperado = [conexion.execute(sql_scan, (b[0], b[2], b[1], b[3])).fetchone()[0]
+                            for b in bboxes]
+                t_scan = (time.perf_counter() - t0) / len(bboxes)
+
+                t0 = time.perf_counter()
+                obtenido = []
+                num_rangos = 0
+                for b in bboxes:
+                    sql, parametros, n = self._sql_rangos(b, options['max_rangos'])
+                    obtenido.append(conexion.execute(sql, parametros).fetchone()[0])
+                    num_rangos += n
+                t_clave = (time.perf_counter() - t0) / len(bboxes)
+
+                if obtenido != esperado:
+                    self.stdout.write(self.style.ERROR('❌ Los resultados no coinciden'))
+                self.stdout.write(
+                    f"🔲 bbox {lado}°: scan {t_scan * 1000:.1f} ms | clave {t_clave * 1000:.2f} ms "
+                    f"({num_rangos / len(bboxes):.1f} rangos, {np.mean(esperado):.0f} filas, "
+                    f"x{t_scan / max(t_clave, 1e-9):.0f})"
+                )
+
+            sql, parametros, _ = self._sql_rangos(bboxes[0], options['max_rangos'])
+            plan = conexion.execute(f'EXPLAIN QUERY PLAN {sql}', parametros).fetchall()
+            busquedas = [fila[-1] for fila in plan if fila[-1].startswith('SEARCH')]
+            self.stdout.write(f"🧭 Plan de consulta con clave_espacial: {plan[0][-1]}, "
+                              f"{len(busquedas)} búsquedas en el índice")
+            for detalle in sorted(set(busquedas)):
+                self.stdout.write(f"   {detalle}")
+        finally:
+            conexion.close()
+            os.remove(ruta)
+            os.rmdir(directorio)
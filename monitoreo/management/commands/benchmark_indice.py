@@ -0,0 +1,81 @@
+# monitoreo/management/commands/benchmark_indice.py
+import random
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from monitoreo.utils.indice_espacial import IndiceEspacioTemporal
+
+
+class Command(BaseCommand):
+    help = 'Compara la detección de duplicados con el índice en memoria vs. una consulta ORM por fila'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos',
+            type=str,
+            default='1000,10000,100000,1000000',
+            help='Tamaños del índice a probar, separados por coma'
+        )
+        parser.add_argument(
+            '--consultas',
+            type=int,
+            default=20000,
+            help='Número de búsquedas por tamaño (default: 20000)'
+        )
+        parser.add_argument(
+            '--orm',
+            type=int,
+            default=200,
+            help='Consultas ORM a cronometrar sobre la BD actual (0 para omitir)'
+        )
+
+    def _punto_aleatorio(self, rnd):
+        # Bounding box de Bolivia
+        return rnd.uniform(-22.9, -9.7), rnd.uniform(-69.6, -57.5)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(42)
+        fechas = [date(2024, 8, 1) + timedelta(days=i) for i in range(10)]
+        consultas = options['consultas']
+
+        self.stdout.write(self.style.SUCCESS('🧪 Índice espacio-temporal en memoria'))
+        for tamano in [int(t) for t in options['tamanos'].split(',')]:
+            indice = IndiceEspacioTemporal(tolerancia=0.01)
+            for _ in range(tamano):
+                lat, lon = self._punto_aleatorio(rnd)
+                fecha = rnd.choice(fechas)
+                indice.agregar(
+                    SimpleNamespace(latitud=lat, longitud=lon,
+                                    fecha_deteccion=datetime(fecha.year, fecha.month, fecha.day)),
+                    fecha
+                )
+
+            puntos = [(*self._punto_aleatorio(rnd), rnd.choice(fechas)) for _ in range(consultas)]
+            inicio = time.perf_counter()
+            for lat, lon, fecha in puntos:
+                indice.buscar(lat, lon, fecha)
+            duracion = time.perf_counter() - inicio
+
+            self.stdout.write(
+                f"   {tamano:>9,} incendios indexados: {duracion / consultas * 1e6:7.2f} µs/búsqueda"
+            )
+
+        if options['orm']:
+            from monitoreo.models import IncendioForestal
+
+            total = IncendioForestal.objects.count()
+            self.stdout.write(self.style.SUCCESS(f'🐢 Consulta ORM por fila ({total:,} filas en BD)'))
+            inicio = time.perf_counter()
+            for _ in range(options['orm']):
+                lat, lon = self._punto_aleatorio(rnd)
+                IncendioForestal.objects.filter(
+                    latitud__range=(lat - 0.01, lat + 0.01),
+                    longitud__range=(lon - 0.01, lon + 0.01),
+                    fecha_deteccion__date=timezone.localdate()
+                ).first()
+            duracion = time.perf_counter() - inicio
+            self.stdout.write(f"   {duracion / options['orm'] * 1e6:7.2f} µs/consulta")
@@ -0,0 +1,224 @@
+# monitoreo/management/commands/benchmark_sqlite.py
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from monitoreo.utils.conexion_sqlite import aplicar_pragmas, pragmas
+from monitoreo.utils.limites import BBOX_BOLIVIA
+
+DEPARTAMENTOS = 9
+
+
+class Command(BaseCommand):
+    help = ('Mide lectores concurrentes durante una ingesta en SQLite: configuración por '
+            'defecto con transacciones grandes vs. WAL + PRAGMA + transacciones cortas')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base',
+            type=int,
+            default=300000,
+            help='Detecciones ya existentes antes de la ingesta (default: 300000)'
+        )
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=100000,
+            help='Detecciones que escribe la ingesta (default: 100000)'
+        )
+        parser.add_argument(
+            '--bloque',
+            type=int,
+            default=20000,
+            help='Filas por bloque de ingesta; "antes" escribe cada bloque en una '
+                 'sola transacción (default: 20000)'
+        )
+        parser.add_argument(
+            '--filas-por-transaccion',
+            type=int,
+            default=2000,
+            help='Filas por transacción en la configuración nueva (default: 2000)'
+        )
+        parser.add_argument(
+            '--lectores',
+            type=int,
+            default=4,
+            help='Procesos lectores concurrentes (default: 4)'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=float,
+            default=0.05,
+            help='Segundos entre consultas de cada lector, como pedidos del dashboard (default: 0.05)'
+        )
+
+    def _conectar(self, ruta, config):
+        # isolation_level=None: los BEGIN/COMMIT son explícitos, como en Django
+        conexion = sqlite3.connect(ruta, timeout=config['timeout'], isolation_level=None,
+                                   check_same_thread=False)
+        aplicar_pragmas(conexion, config['pragmas'])
+        return conexion
+
+    def _filas(self, rng, n, inicio_s):
+        lat = rng.uniform(BBOX_BOLIVIA['min_lat'], BBOX_BOLIVIA['max_lat'], n)
+        lon = rng.uniform(BBOX_BOLIVIA['min_lon'], BBOX_BOLIVIA['max_lon'], n)
+        fecha = inicio_s + rng.uniform(0, 30 * 86400, n)
+        depto = rng.integers(1, DEPARTAMENTOS + 1, n)
+        area = rng.gamma(2.0, 20.0, n)
+        return list(zip(lat.tolist(), lon.tolist(), fecha.tolist(), depto.tolist(), area.tolist()))
+
+    def _poblar(self, ruta, base):
+        conexion = sqlite3.connect(ruta, isolation_level=None)
+        conexion.execute(
+            'CREATE TABLE incendio (id INTEGER PRIMARY KEY, latitud REAL, longitud REAL, '
+            'fecha REAL, departamento INTEGER, area REAL)'
+        )
+        conexion.execute('CREATE INDEX incendio_fecha ON incendio (fecha)')
+        conexion.execute('CREATE INDEX incendio_lat ON incendio (latitud)')
+        conexion.execute('BEGIN')
+        conexion.executemany(
+            'INSERT INTO incendio (latitud, longitud, fecha, departamento, area) VALUES (?, ?, ?, ?, ?)',
+            self._filas(np.random.default_rng(0), base, 0.0)
+        )
+        conexion.execute('COMMIT')
+        conexion.close()
+
+    def _escritor(self, ruta, config, filas, bloque, resultado):
+        conexion = self._conectar(ruta, config)
+        rng = np.random.default_rng(1)
+        escritas = errores = 0
+        inicio = time.perf_counter()
+        for desde in range(0, filas, bloque):
+            lote = self._filas(rng, min(bloque, filas - desde), 20 * 86400.0)
+            lats = [f[0] for f in lote]
+            # Como la ingesta: busca duplicados del bloque y luego escribe. Antes la
+            # búsqueda iba dentro de la única transacción; ahora va fuera de las cortas
+            duplicados = ('SELECT count(*) FROM incendio WHERE latitud BETWEEN ? AND ? AND fecha >= ?',
+                          (min(lats), max(lats), 20 * 86400.0))
+            if not config['leer_en_transaccion']:
+                conexion.execute(*duplicados).fetchone()
+            for i in range(0, len(lote), config['filas_por_transaccion']):
+                parte = lote[i:i + config['filas_por_transaccion']]
+                try:
+                    conexion.execute(config['begin'])
+                    if config['leer_en_transaccion']:
+                        conexion.execute(*duplicados).fetchone()
+                    conexion.executemany(
+                        'INSERT INTO incendio (latitud, longitud, fecha, departamento, area) '
+                        'VALUES (?, ?, ?, ?, ?)', parte
+                    )
+                    conexion.execute('COMMIT')
+                    escritas += len(parte)
+                except sqlite3.OperationalError:
+                    if conexion.in_transaction:
+                        conexion.execute('ROLLBACK')
+                    errores += 1
+        resultado.update(escritas=escritas, errores_escritura=errores,
+                         duracion=time.perf_counter() - inicio)
+        conexion.close()
+
+    def _lector(self, ruta, config, pausa, parar, salida):
+        conexion = self._conectar(ruta, config)
+        consultas = (
+            # Consultas del dashboard: agregados por departamento y últimas detecciones
+            ('SELECT departamento, count(*), sum(area) FROM incendio WHERE fecha >= ? '
+             'GROUP BY departamento', (29 * 86400.0,)),
+            ('SELECT id, latitud, longitud FROM incendio WHERE fecha >= ? ORDER BY fecha DESC LIMIT 100',
+             (0.0,)),
+        )
+        latencias, errores = [], 0
+        i = 0
+        while not parar.is_set():
+            sql, parametros = consultas[i % len(consultas)]
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                conexion.execute(sql, parametros).fetchall()
+                latencias.append(time.perf_counter() - t0)
+            except sqlite3.OperationalError:
+                errores += 1
+            parar.wait(pausa)
+        conexion.close()
+        salida.put((latencias, errores))
+
+    def _ejecutar(self, nombre, config, options):
+        directorio = tempfile.mkdtemp()
+        ruta = os.path.join(directorio, 'benchmark_sqlite.sqlite3')
+        try:
+            self._poblar(ruta, options['base'])
+            # journal_mode es persistente en el archivo: se fija antes de abrir lectores
+            self._conectar(ruta, config).close()
+
+            # Lectores en procesos aparte, como los workers web frente a la ingesta
+            contexto = multiprocessing.get_context('fork')
+            parar = contexto.Event()
+            salida = contexto.Queue()
+            lectores = [
+                contexto.Process(target=self._lector,
+                                 args=(ruta, config, options['pausa'], parar, salida))
+                for _ in range(options['lectores'])
+            ]
+            for proceso in lectores:
+                proceso.start()
+            time.sleep(0.5)
+            resultado = {}
+            self._escritor(ruta, config, options['filas'], options['bloque'], resultado)
+            parar.set()
+            latencias, errores = [], 0
+            for _ in lectores:
+                parciales, fallidas = salida.get()
+                latencias += parciales
+                errores += fallidas
+            for proceso in lectores:
+                proceso.join()
+        finally:
+            for archivo in os.listdir(directorio):
+                os.remove(os.path.join(directorio, archivo))
+            os.rmdir(directorio)
+
+        ms = np.array(latencias) * 1000 if latencias else np.zeros(1)
+        self.stdout.write(
+            f"{nombre}: lecturas {len(latencias):,} | p50 {np.percentile(ms, 50):.1f} ms | "
+            f"p99 {np.percentile(ms, 99):.1f} ms | máx {ms.max():.0f} ms | "
+            f"errores lectura {errores}"
+        )
+        self.stdout.write(
+            f"{' ' * len(nombre)}  escritura {resultado['escritas'] / resultado['duracion']:,.0f} filas/s "
+            f"({resultado['escritas']:,} filas en {resultado['duracion']:.1f}s, "
+            f"{resultado['errores_escritura']} transacciones fallidas)"
+        )
+        return np.percentile(ms, 99), resultado['escritas'] / resultado['duracion']
+
+    def handle(self, *args, **options):
+        configuraciones = {
+            '⏪ antes  ': {
+                # Valores por defecto de SQLite y del backend de Django
+                'pragmas': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+                'timeout': 5.0,
+                'begin': 'BEGIN',
+                'leer_en_transaccion': True,
+                'filas_por_transaccion': options['bloque'],
+            },
+            '⏩ después': {
+                'pragmas': pragmas(),
+                'timeout': pragmas().get('busy_timeout', 5000) / 1000,
+                'begin': 'BEGIN IMMEDIATE',
+                'leer_en_transaccion': False,
+                'filas_por_transaccion': options['filas_por_transaccion'],
+            },
+        }
+        self.stdout.write(
+            f"🗄️ {options['base']:,} filas base, ingesta de {options['filas']:,} filas, "
+            f"{options['lectores']} lectores"
+        )
+        medidas = [self._ejecutar(nombre, config, options) for nombre, config in configuraciones.items()]
+        (p99_antes, tasa_antes), (p99_despues, tasa_despues) = medidas
+        self.stdout.write(self.style.SUCCESS(
+            f"📈 p99 de lectura x{p99_antes / max(p99_despues, 1e-9):.1f} menor, "
+            f"escritura x{tasa_despues / max(tasa_antes, 1e-9):.2f}"
+        ))
@@ -0,0 +1,49 @@
+# monitoreo/management/commands/cargar_areas_protegidas.py
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from monitoreo.models import AreaProtegida
+
+
+class Command(BaseCommand):
+    help = 'Carga áreas protegidas desde un GeoJSON (Polygon/MultiPolygon en EPSG:4326)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('ruta', type=str, help='Archivo GeoJSON (FeatureCollection)')
+        parser.add_argument(
+            '--propiedad',
+            type=str,
+            default='nombre',
+            help='Propiedad con el nombre del área (default: nombre)'
+        )
+        parser.add_argument(
+            '--reemplazar',
+            action='store_true',
+            help='Elimina las áreas existentes antes de cargar'
+        )
+
+    def handle(self, *args, **options):
+        with open(options['ruta'], encoding='utf-8') as f:
+            features = json.load(f)['features']
+
+        cargadas = 0
+        with transaction.atomic():
+            if options['reemplazar']:
+                AreaProtegida.objects.all().delete()
+            for feature in features:
+                geometria = feature.get('geometry') or {}
+                if geometria.get('type') not in ('Polygon', 'MultiPolygon'):
+                    continue
+                propiedades = feature.get('properties') or {}
+                # save() calcula el bbox; los triggers actualizan el R-tree
+                AreaProtegida(
+                    nombre=propiedades.get(options['propiedad'], 'Sin nombre'),
+                    categoria=propiedades.get('categoria', ''),
+                    departamento=propiedades.get('departamento', ''),
+                    geometria=geometria,
+                ).save()
+                cargadas += 1
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {cargadas} área(s) protegida(s) cargada(s)'))
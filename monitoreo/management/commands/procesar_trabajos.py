@@ -0,0 +1,36 @@
+# monitoreo/management/commands/procesar_trabajos.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from monitoreo.utils.trabajos import procesar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de ingesta NASA FIRMS encolados desde la web'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa los trabajos pendientes y termina'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=5.0,
+            help='Segundos entre revisiones de la cola (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('🛰️  Esperando trabajos de ingesta...')
+        try:
+            while True:
+                procesados = procesar_pendientes()
+                if procesados:
+                    self.stdout.write(self.style.SUCCESS(f'✅ {procesados} trabajo(s) procesado(s)'))
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write('⏹️  Detenido')
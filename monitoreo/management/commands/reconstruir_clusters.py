@@ -0,0 +1,24 @@
+# monitoreo/management/commands/reconstruir_clusters.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from monitoreo.utils.clusters import actualizar_clusters
+
+
+class Command(BaseCommand):
+    help = 'Actualiza el índice de clusters por zoom de las detecciones activas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--completo',
+            action='store_true',
+            help='Reconstruye desde cero en lugar de aplicar solo los cambios'
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        indice = actualizar_clusters(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Clusters: {len(indice)} detecciones en {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,17 @@
+# monitoreo/management/commands/reconstruir_resumen.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from monitoreo.utils.resumen import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero el resumen diario (fecha, departamento, severidad, satélite)'
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        filas = reconstruir_resumen()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Resumen reconstruido: {filas} filas en {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="incendioforestal",
+            name="municipio",
+            field=models.CharField(
+                blank=True, max_length=100, verbose_name="Municipio"
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-17 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0002_incendioforestal_municipio"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HuellaDeteccion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("huella", models.BigIntegerField(unique=True)),
+                ("fuente", models.CharField(max_length=50)),
+                ("fecha_adquisicion", models.DateTimeField(db_index=True)),
+            ],
+            options={
+                "verbose_name": "Huella de detección",
+                "verbose_name_plural": "Huellas de detección",
+            },
+        ),
+        migrations.CreateModel(
+            name="MarcaIngesta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fuente",
+                    models.CharField(
+                        max_length=50, unique=True, verbose_name="Fuente FIRMS"
+                    ),
+                ),
+                (
+                    "ultima_adquisicion",
+                    models.DateTimeField(verbose_name="Última adquisición ingerida"),
+                ),
+                ("fecha_actualizacion", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Marca de ingesta",
+                "verbose_name_plural": "Marcas de ingesta",
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0003_marcaingesta_huelladeteccion"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrabajoIngesta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "⏳ Pendiente"),
+                            ("en_curso", "🔄 En curso"),
+                            ("completado", "✅ Completado"),
+                            ("error", "❌ Error"),
+                        ],
+                        db_index=True,
+                        default="pendiente",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "etapa",
+                    models.CharField(
+                        blank=True, max_length=50, verbose_name="Etapa actual"
+                    ),
+                ),
+                ("parametros", models.JSONField(blank=True, default=dict)),
+                ("filas_procesadas", models.PositiveIntegerField(default=0)),
+                (
+                    "solicitudes",
+                    models.PositiveIntegerField(
+                        default=1, help_text="Pedidos fusionados en este trabajo"
+                    ),
+                ),
+                ("resultado", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True)),
+                ("fecha_creacion", models.DateTimeField(auto_now_add=True)),
+                ("fecha_inicio", models.DateTimeField(blank=True, null=True)),
+                ("fecha_fin", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Trabajo de ingesta",
+                "verbose_name_plural": "Trabajos de ingesta",
+                "ordering": ["-fecha_creacion"],
+            },
+        ),
+    ]
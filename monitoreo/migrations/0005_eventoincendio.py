@@ -0,0 +1,110 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:06
+
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.deletion
+
+
+def frp_desde_area(apps, schema_editor):
+    # El área se estimaba como frp * 0.15; se recupera el FRP de los registros previos
+    IncendioForestal = apps.get_model("monitoreo", "IncendioForestal")
+    IncendioForestal.objects.update(frp=F("area_afectada_ha") / 0.15)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0004_trabajoingesta"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="incendioforestal",
+            name="frp",
+            field=models.FloatField(
+                default=0,
+                help_text="Fire Radiative Power reportado por FIRMS",
+                verbose_name="FRP (MW)",
+            ),
+        ),
+        migrations.CreateModel(
+            name="EventoIncendio",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "nombre",
+                    models.CharField(max_length=200, verbose_name="Nombre del evento"),
+                ),
+                ("latitud", models.FloatField(default=0)),
+                ("longitud", models.FloatField(default=0)),
+                ("min_latitud", models.FloatField(default=0)),
+                ("max_latitud", models.FloatField(default=0)),
+                ("min_longitud", models.FloatField(default=0)),
+                ("max_longitud", models.FloatField(default=0)),
+                (
+                    "num_detecciones",
+                    models.PositiveIntegerField(default=0, verbose_name="Detecciones"),
+                ),
+                (
+                    "area_total_ha",
+                    models.FloatField(default=0, verbose_name="Área total (hectáreas)"),
+                ),
+                (
+                    "frp_maximo",
+                    models.FloatField(default=0, verbose_name="FRP máximo (MW)"),
+                ),
+                ("primera_deteccion", models.DateTimeField(blank=True, null=True)),
+                (
+                    "ultima_deteccion",
+                    models.DateTimeField(blank=True, db_index=True, null=True),
+                ),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("activo", "🔥 Activo"),
+                            ("controlado", "⚠️ Controlado"),
+                            ("extinto", "✅ Extinto"),
+                        ],
+                        default="activo",
+                        max_length=20,
+                    ),
+                ),
+                ("fecha_ultima_actualizacion", models.DateTimeField(auto_now=True)),
+                (
+                    "departamento",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="monitoreo.departamento",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Evento de incendio",
+                "verbose_name_plural": "Eventos de incendio",
+                "ordering": ["-ultima_deteccion"],
+            },
+        ),
+        migrations.AddField(
+            model_name="incendioforestal",
+            name="evento",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="detecciones",
+                to="monitoreo.eventoincendio",
+            ),
+        ),
+        migrations.RunPython(frp_desde_area, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0005_eventoincendio"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="eventoincendio",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("activo", "🔥 Activo"),
+                    ("controlado", "⚠️ Controlado"),
+                    ("extinto", "✅ Extinto"),
+                ],
+                db_index=True,
+                default="activo",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="incendioforestal",
+            name="estado",
+            field=models.CharField(
+                choices=[
+                    ("activo", "🔥 Activo"),
+                    ("controlado", "⚠️ Controlado"),
+                    ("extinto", "✅ Extinto"),
+                ],
+                db_index=True,
+                default="activo",
+                max_length=20,
+            ),
+        ),
+    ]
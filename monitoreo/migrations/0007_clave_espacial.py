@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:09
+
+from django.db import migrations, models
+
+from monitoreo.utils.clave_espacial import clave_espacial
+
+
+def calcular_claves(apps, schema_editor):
+    IncendioForestal = apps.get_model("monitoreo", "IncendioForestal")
+    filas = IncendioForestal.objects.filter(clave_espacial__isnull=True).values_list(
+        "id", "latitud", "longitud"
+    )
+    lote = 5000
+    ids = list(filas.values_list("id", flat=True))
+    for inicio in range(0, len(ids), lote):
+        bloque = list(filas.filter(id__in=ids[inicio : inicio + lote]))
+        claves = clave_espacial([f[1] for f in bloque], [f[2] for f in bloque])
+        IncendioForestal.objects.bulk_update(
+            [
+                IncendioForestal(id=f[0], clave_espacial=int(c))
+                for f, c in zip(bloque, claves)
+            ],
+            ["clave_espacial"],
+            batch_size=500,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0006_indice_estado"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="incendioforestal",
+            name="clave_espacial",
+            field=models.BigIntegerField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(calcular_claves, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:11
+
+from django.db import migrations, models
+
+from monitoreo.utils import rtree
+
+
+def instalar_rtree(apps, schema_editor):
+    rtree.instalar(schema_editor.connection)
+
+
+def desinstalar_rtree(apps, schema_editor):
+    rtree.desinstalar(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0007_clave_espacial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AreaProtegida",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("nombre", models.CharField(max_length=200)),
+                ("categoria", models.CharField(blank=True, max_length=100)),
+                ("departamento", models.CharField(blank=True, max_length=100)),
+                (
+                    "geometria",
+                    models.JSONField(
+                        help_text="Polygon o MultiPolygon GeoJSON (EPSG:4326)"
+                    ),
+                ),
+                ("min_latitud", models.FloatField(default=0, editable=False)),
+                ("max_latitud", models.FloatField(default=0, editable=False)),
+                ("min_longitud", models.FloatField(default=0, editable=False)),
+                ("max_longitud", models.FloatField(default=0, editable=False)),
+            ],
+            options={
+                "verbose_name": "Área protegida",
+                "verbose_name_plural": "Áreas protegidas",
+            },
+        ),
+        migrations.RunPython(instalar_rtree, desinstalar_rtree),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+from monitoreo.utils.resumen import reconstruir_resumen
+
+
+def poblar_resumen(apps, schema_editor):
+    reconstruir_resumen(
+        apps.get_model("monitoreo", "IncendioForestal"),
+        apps.get_model("monitoreo", "ResumenDiario"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0008_areaprotegida_rtree"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="incendioforestal",
+            name="fecha_deteccion",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                verbose_name="Fecha de detección",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ResumenDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("fecha", models.DateField(db_index=True)),
+                ("severidad", models.CharField(max_length=20)),
+                ("satelite", models.CharField(max_length=50)),
+                ("total", models.IntegerField(default=0, verbose_name="Detecciones")),
+                (
+                    "area_total_ha",
+                    models.FloatField(default=0, verbose_name="Área total (hectáreas)"),
+                ),
+                (
+                    "suma_intensidad",
+                    models.FloatField(
+                        default=0, help_text="Suma de intensidades (para el promedio)"
+                    ),
+                ),
+                (
+                    "fecha_actualizacion",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "departamento",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to="monitoreo.departamento",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumen diario",
+                "verbose_name_plural": "Resúmenes diarios",
+                "ordering": ["-fecha"],
+                "unique_together": {("fecha", "departamento", "severidad", "satelite")},
+            },
+        ),
+        migrations.RunPython(poblar_resumen, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.7 on 2026-10-17 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("monitoreo", "0009_resumendiario"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TramoBackfill",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "fuente",
+                    models.CharField(max_length=50, verbose_name="Fuente FIRMS"),
+                ),
+                ("fecha_inicio", models.DateField(verbose_name="Primer día (UTC)")),
+                ("dias", models.PositiveSmallIntegerField()),
+                (
+                    "estado",
+                    models.CharField(
+                        choices=[
+                            ("pendiente", "⏳ Pendiente"),
+                            ("completado", "✅ Completado"),
+                            ("error", "❌ Error"),
+                        ],
+                        db_index=True,
+                        default="pendiente",
+                        max_length=20,
+                    ),
+                ),
+                ("intentos", models.PositiveIntegerField(default=0)),
+                ("filas", models.PositiveIntegerField(default=0)),
+                ("nuevos", models.PositiveIntegerField(default=0)),
+                ("actualizados", models.PositiveIntegerField(default=0)),
+                ("error", models.TextField(blank=True)),
+                ("fecha_actualizacion", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Tramo de backfill",
+                "verbose_name_plural": "Tramos de backfill",
+                "ordering": ["fecha_inicio", "fuente"],
+                "unique_together": {("fuente", "fecha_inicio", "dias")},
+            },
+        ),
+    ]
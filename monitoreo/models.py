@@ -37,6 +37,41 @@ class Departamento(models.Model):
         verbose_name = "Departamento"
         verbose_name_plural = "Departamentos"
 
+class EventoIncendio(models.Model):
+    """Agrupación de detecciones FIRMS cercanas en espacio y tiempo (un mismo incendio)"""
+    nombre = models.CharField(max_length=200, verbose_name="Nombre del evento")
+    departamento = models.ForeignKey(Departamento, on_delete=models.SET_NULL, null=True, blank=True)
+    
+    # Centroide y extensión de las detecciones
+    latitud = models.FloatField(default=0)
+    longitud = models.FloatField(default=0)
+    min_latitud = models.FloatField(default=0)
+    max_latitud = models.FloatField(default=0)
+    min_longitud = models.FloatField(default=0)
+    max_longitud = models.FloatField(default=0)
+    
+    # Agregados
+    num_detecciones = models.PositiveIntegerField(default=0, verbose_name="Detecciones")
+    area_total_ha = models.FloatField(default=0, verbose_name="Área total (hectáreas)")
+    frp_maximo = models.FloatField(default=0, verbose_name="FRP máximo (MW)")
+    primera_deteccion = models.DateTimeField(null=True, blank=True)
+    ultima_deteccion = models.DateTimeField(null=True, blank=True, db_index=True)
+    
+    estado = models.CharField(max_length=20, default='activo', db_index=True, choices=[
+        ('activo', '🔥 Activo'),
+        ('controlado', '⚠️ Controlado'),
+        ('extinto', '✅ Extinto'),
+    ])
+    fecha_ultima_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Evento de incendio"
+        verbose_name_plural = "Eventos de incendio"
+        ordering = ['-ultima_deteccion']
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.num_detecciones} detecciones)"
+
 class IncendioForestal(gis_models.Model):
     """Modelo completo para incendios forestales"""
     ESTADO_CHOICES = [
@@ -53,21 +88,27 @@ class IncendioForestal(gis_models.Model):
     ]
     
     nombre = models.CharField(max_length=200, verbose_name="Nombre del incendio")
-    fecha_deteccion = models.DateTimeField(default=timezone.now, verbose_name="Fecha de detección")
+    fecha_deteccion = models.DateTimeField(default=timezone.now, db_index=True, verbose_name="Fecha de detección")
     fecha_ultima_actualizacion = models.DateTimeField(auto_now=True)
     
     # Ubicación geoespacial (IMPORTANTE: con GIS)
     latitud = models.FloatField(verbose_name="Latitud")
     longitud = models.FloatField(verbose_name="Longitud")
+    # Clave Z-order de (latitud, longitud) para consultas por bbox/radio con índice
+    clave_espacial = models.BigIntegerField(null=True, blank=True, db_index=True, editable=False)
     
     # Relaciones
     departamento = models.ForeignKey(Departamento, on_delete=models.SET_NULL, null=True, blank=True)
+    municipio = models.CharField(max_length=100, blank=True, verbose_name="Municipio")
     
     # Métricas
     intensidad = models.FloatField(default=0.5, help_text="Intensidad del incendio (0-1)")
     severidad = models.CharField(max_length=20, choices=SEVERIDAD_CHOICES, default='medio')
     area_afectada_ha = models.FloatField(default=0, verbose_name="Área afectada (hectáreas)")
     confianza_deteccion = models.FloatField(default=0.8, help_text="Confianza en la detección (0-1)")
+    frp = models.FloatField(default=0, verbose_name="FRP (MW)", help_text="Fire Radiative Power reportado por FIRMS")
+    evento = models.ForeignKey(EventoIncendio, on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='detecciones')
     
     # Datos satelitales
     satelite = models.CharField(max_length=50, default="MODIS", verbose_name="Satélite fuente")
@@ -75,7 +116,7 @@ class IncendioForestal(gis_models.Model):
     pixel_size = models.FloatField(default=1.0, verbose_name="Tamaño de pixel (km)")
     
     # Metadatos
-    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='activo')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='activo', db_index=True)
     fuente_datos = models.CharField(max_length=100, default="NASA FIRMS", verbose_name="Fuente de datos")
     notas = models.TextField(blank=True, verbose_name="Observaciones")
     
@@ -96,4 +137,156 @@ class IncendioForestal(gis_models.Model):
             fecha_str = self.fecha_deteccion.strftime('%Y%m%d_%H%M')
             depto = self.departamento.nombre if self.departamento else 'Desconocido'
             self.nombre = f"Incendio_{depto}_{fecha_str}"
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if self.latitud is not None and self.longitud is not None:
+            from monitoreo.utils.clave_espacial import clave_espacial
+            self.clave_espacial = clave_espacial(self.latitud, self.longitud)
+        super().save(*args, **kwargs)
+
+class ResumenDiario(models.Model):
+    """
+    Agregado materializado por (fecha local, departamento, severidad, satélite).
+    La ingesta lo mantiene con deltas; `reconstruir_resumen` lo recalcula.
+    """
+    fecha = models.DateField(db_index=True)
+    departamento = models.ForeignKey(Departamento, on_delete=models.SET_NULL, null=True, blank=True)
+    severidad = models.CharField(max_length=20)
+    satelite = models.CharField(max_length=50)
+    
+    total = models.IntegerField(default=0, verbose_name="Detecciones")
+    area_total_ha = models.FloatField(default=0, verbose_name="Área total (hectáreas)")
+    suma_intensidad = models.FloatField(default=0, help_text="Suma de intensidades (para el promedio)")
+    fecha_actualizacion = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = "Resumen diario"
+        verbose_name_plural = "Resúmenes diarios"
+        ordering = ['-fecha']
+        unique_together = [('fecha', 'departamento', 'severidad', 'satelite')]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.departamento or 'Sin departamento'} - {self.severidad}: {self.total}"
+
+class AreaProtegida(models.Model):
+    """
+    Área protegida con su polígono en GeoJSON (SQLite sin SpatiaLite). El bbox
+    se guarda en columnas propias y se indexa con un R-tree de SQLite.
+    """
+    nombre = models.CharField(max_length=200)
+    categoria = models.CharField(max_length=100, blank=True)
+    departamento = models.CharField(max_length=100, blank=True)
+    geometria = models.JSONField(help_text="Polygon o MultiPolygon GeoJSON (EPSG:4326)")
+    
+    min_latitud = models.FloatField(default=0, editable=False)
+    max_latitud = models.FloatField(default=0, editable=False)
+    min_longitud = models.FloatField(default=0, editable=False)
+    max_longitud = models.FloatField(default=0, editable=False)
+    
+    class Meta:
+        verbose_name = "Área protegida"
+        verbose_name_plural = "Áreas protegidas"
+    
+    def __str__(self):
+        return self.nombre
+    
+    def aristas(self):
+        """Aristas del polígono para pruebas punto-en-polígono (se calculan una vez)"""
+        if not hasattr(self, '_aristas'):
+            from monitoreo.utils.rtree import aristas_geojson
+            self._aristas = aristas_geojson(self.geometria)
+        return self._aristas
+    
+    def save(self, *args, **kwargs):
+        self.__dict__.pop('_aristas', None)
+        x1, y1, _, _ = self.aristas()
+        self.min_latitud, self.max_latitud = float(y1.min()), float(y1.max())
+        self.min_longitud, self.max_longitud = float(x1.min()), float(x1.max())
+        super().save(*args, **kwargs)
+
+class MarcaIngesta(models.Model):
+    """Marca de agua por fuente FIRMS: última adquisición ya ingerida"""
+    fuente = models.CharField(max_length=50, unique=True, verbose_name="Fuente FIRMS")
+    ultima_adquisicion = models.DateTimeField(verbose_name="Última adquisición ingerida")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Marca de ingesta"
+        verbose_name_plural = "Marcas de ingesta"
+    
+    def __str__(self):
+        return f"{self.fuente} - {self.ultima_adquisicion:%Y-%m-%d %H:%M}"
+
+
+class HuellaDeteccion(models.Model):
+    """Hash de contenido de una fila FIRMS ya procesada (ventana reciente)"""
+    huella = models.BigIntegerField(unique=True)
+    fuente = models.CharField(max_length=50)
+    fecha_adquisicion = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        verbose_name = "Huella de detección"
+        verbose_name_plural = "Huellas de detección"
+
+
+class TrabajoIngesta(models.Model):
+    """Actualización NASA FIRMS encolada para ejecutarse fuera de la petición HTTP"""
+    ESTADO_CHOICES = [
+        ('pendiente', '⏳ Pendiente'),
+        ('en_curso', '🔄 En curso'),
+        ('completado', '✅ Completado'),
+        ('error', '❌ Error'),
+    ]
+    
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', db_index=True)
+    etapa = models.CharField(max_length=50, blank=True, verbose_name="Etapa actual")
+    parametros = models.JSONField(default=dict, blank=True)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    solicitudes = models.PositiveIntegerField(default=1, help_text="Pedidos fusionados en este trabajo")
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = "Trabajo de ingesta"
+        verbose_name_plural = "Trabajos de ingesta"
+        ordering = ['-fecha_creacion']
+    
+    def __str__(self):
+        return f"Trabajo #{self.pk} - {self.estado}"
+    
+    @property
+    def segundos_transcurridos(self):
+        if not self.fecha_inicio:
+            return 0
+        return ((self.fecha_fin or timezone.now()) - self.fecha_inicio).total_seconds()
+
+
+class TramoBackfill(models.Model):
+    """Punto de control de backfill_nasa: un rango de días de una fuente FIRMS"""
+    ESTADO_CHOICES = [
+        ('pendiente', '⏳ Pendiente'),
+        ('completado', '✅ Completado'),
+        ('error', '❌ Error'),
+    ]
+    
+    fuente = models.CharField(max_length=50, verbose_name="Fuente FIRMS")
+    fecha_inicio = models.DateField(verbose_name="Primer día (UTC)")
+    dias = models.PositiveSmallIntegerField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente', db_index=True)
+    intentos = models.PositiveIntegerField(default=0)
+    filas = models.PositiveIntegerField(default=0)
+    nuevos = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Tramo de backfill"
+        verbose_name_plural = "Tramos de backfill"
+        unique_together = [('fuente', 'fecha_inicio', 'dias')]
+        ordering = ['fecha_inicio', 'fuente']
+    
+    def __str__(self):
+        return f"{self.fuente} {self.fecha_inicio:%Y-%m-%d} (+{self.dias}d) - {self.estado}"
@@ -0,0 +1,38 @@
+# monitoreo/signals.py
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from monitoreo.models import Departamento, IncendioForestal
+from monitoreo.utils import cache_departamentos, conexion_sqlite, rtree, teselas
+
+
+@receiver(post_save, sender=Departamento)
+@receiver(post_delete, sender=Departamento)
+def invalidar_cache_departamentos(sender, **kwargs):
+    """Mantiene coherente el cache de departamentos usado en la ingesta"""
+    cache_departamentos.invalidar_cache()
+
+
+# Sin receptor post_delete: anularía el borrado rápido de Django en los
+# borrados masivos (archivar), que ya invalidan todo el lote de una vez.
+# Los borrados del admin invalidan en IncendioForestalAdmin.
+@receiver(post_save, sender=IncendioForestal)
+def invalidar_teselas(sender, instance, **kwargs):
+    """Teselas MVT de una detección guardada una a una (admin, ruta por fila)"""
+    latitud, longitud = instance.latitud, instance.longitud
+    transaction.on_commit(lambda: teselas.invalidar([latitud], [longitud]))
+
+
+@receiver(post_migrate)
+def reinstalar_rtree(sender, using='default', **kwargs):
+    """Repone triggers R-tree que una reconstrucción de tabla de SQLite pudo borrar"""
+    if sender.name == 'monitoreo':
+        rtree.instalar(connections[using])
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    """WAL, busy_timeout y demás PRAGMA en cada conexión nueva"""
+    conexion_sqlite.configurar_conexion(connection)
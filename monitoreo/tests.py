@@ -1,3 +1,1110 @@
-from django.test import TestCase
+import gzip
+import importlib.util
+import json
+import math
+import os
+import shutil
+import sqlite3
+import struct
+import tempfile
+import threading
+import zlib
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from monitoreo.models import (
+    AreaProtegida, Departamento, EventoIncendio, IncendioForestal, MarcaIngesta, ResumenDiario,
+    TrabajoIngesta, TramoBackfill,
+)
+from monitoreo.utils import archivo_historico, clusters, consultas, densidad, geojson, nasa_firms, teselas
+from monitoreo.utils.backfill import ejecutar_backfill, tramos
+from monitoreo.utils.ciclo_vida import actualizar_estados
+from monitoreo.utils.clave_espacial import clave_espacial, filtrar_bbox, filtrar_radio, rangos_bbox
+from monitoreo.utils.conexion_sqlite import aplicar_pragmas
+from monitoreo.utils.eventos import agrupar
+from monitoreo.utils.http_firms import CacheRespuestas
+from monitoreo.utils.indice_espacial import IndiceEspacioTemporal
+from monitoreo.utils.limites import GrillaLimites, _anillos, _aristas, puntos_en_poligono
+from monitoreo.utils.nasa_firms import NASAFirmsUpdater
+from monitoreo.utils import rtree
+from monitoreo.utils.resumen import reconstruir_resumen
+from monitoreo.utils.planificador import BloqueoInstancia, PlanificadorPasos
+from monitoreo.utils.trabajos import encolar_actualizacion, ejecutar_trabajo
+
+
+def _df_firms(filas):
+    """Construye un DataFrame con el formato del CSV de NASA FIRMS"""
+    return pd.DataFrame(filas, columns=[
+        'latitude', 'longitude', 'brightness', 'acq_date', 'acq_time',
+        'satellite', 'confidence', 'bright_t31', 'frp',
+    ])
+
+
+FILAS_EJEMPLO = [
+    (-17.80, -63.20, 420.0, '2024-08-20', '1405', 'Terra', 80, 300.1, 35.0),
+    (-17.805, -63.205, 350.0, '2024-08-20', '1740', 'Aqua', 60, 298.0, 12.0),
+    (-16.50, -68.20, 310.0, '2024-08-20', '0330', 'Aqua', 40, 290.0, 5.0),
+    (-16.50, -68.20, 480.0, '2024-08-21', '1420', 'Terra', 95, 305.0, 80.0),
+    (-21.50, -64.70, 200.0, '2024-08-21', '1425', 'Terra', 30, 285.0, 2.5),
+]
+
+
+def _varint(datos, i):
+    valor = desplazamiento = 0
+    while True:
+        byte = datos[i]
+        valor |= (byte & 0x7f) << desplazamiento
+        desplazamiento += 7
+        i += 1
+        if byte < 0x80:
+            return valor, i
+
+
+def _varints(datos):
+    """Varints empaquetados (campos packed)"""
+    valores, i = [], 0
+    while i < len(datos):
+        valor, i = _varint(datos, i)
+        valores.append(valor)
+    return valores
+
+
+def _campos_protobuf(datos):
+    """(campo, valor) de un mensaje protobuf: int, float (64 bits) o bytes"""
+    i = 0
+    while i < len(datos):
+        clave, i = _varint(datos, i)
+        if clave & 7 == 0:
+            valor, i = _varint(datos, i)
+        elif clave & 7 == 1:
+            valor, i = struct.unpack_from('<d', datos, i)[0], i + 8
+        else:
+            n, i = _varint(datos, i)
+            valor, i = datos[i:i + n], i + n
+        yield clave >> 3, valor
+
+
+def _leer_mvt(datos):
+    """{capa: [(id, x, y, propiedades)]} de una tesela MVT con features Point"""
+    def zigzag(n):
+        return -(n + 1) // 2 if n & 1 else n // 2
+
+    capas = {}
+    for _, capa in _campos_protobuf(datos):
+        campos = list(_campos_protobuf(capa))
+        claves = [v.decode() for c, v in campos if c == 3]
+        valores = []
+        for tipo, valor in (next(_campos_protobuf(v)) for c, v in campos if c == 4):
+            valores.append(valor.decode() if tipo == 1 else zigzag(valor) if tipo == 6
+                           else bool(valor) if tipo == 7 else valor)
+        features = []
+        for feature in (dict(_campos_protobuf(v)) for c, v in campos if c == 2):
+            etiquetas = _varints(feature.get(2, b''))
+            _, x, y = _varints(feature[4])
+            features.append((feature.get(1), zigzag(x), zigzag(y),
+                             {claves[k]: valores[v] for k, v in zip(etiquetas[::2], etiquetas[1::2])}))
+        capas[next(v.decode() for c, v in campos if c == 1)] = features
+    return capas
+
+
+class ProcesarIncendiosTests(TestCase):
+    campos = ['latitud', 'longitud', 'intensidad', 'severidad', 'area_afectada_ha', 'departamento_id']
+
+    def _estado(self):
+        return list(IncendioForestal.objects.order_by('latitud', 'longitud', 'fecha_deteccion')
+                    .values_list(*self.campos))
+
+    def test_bulk_equivale_a_por_fila(self):
+        updater = NASAFirmsUpdater(api_key='test', batch_size=2)
+        df = _df_firms(FILAS_EJEMPLO)
+
+        por_fila = updater.procesar_incendios(df, bulk=False)
+        estado_por_fila = self._estado()
+        IncendioForestal.objects.all().delete()
+
+        bulk = updater.procesar_incendios(df, bulk=True)
+
+        self.assertEqual(por_fila, (4, 1))
+        self.assertEqual(bulk, por_fila)
+        self.assertEqual(self._estado(), estado_por_fila)
+
+    def test_bulk_actualiza_existentes(self):
+        updater = NASAFirmsUpdater(api_key='test')
+        df = _df_firms(FILAS_EJEMPLO)
+
+        updater.procesar_incendios(df)
+        self.assertEqual(updater.procesar_incendios(df), (0, 5))
+        self.assertEqual(IncendioForestal.objects.count(), 4)
+
+
+class IndiceEspacioTemporalTests(SimpleTestCase):
+    def _indice(self, *puntos):
+        indice = IndiceEspacioTemporal(tolerancia=0.01)
+        for lat, lon, fecha in puntos:
+            indice.agregar(SimpleNamespace(latitud=lat, longitud=lon, fecha_deteccion=fecha), fecha.date())
+        return indice
+
+    def test_tolerancia_en_bordes_de_celda(self):
+        fecha = datetime(2024, 8, 20, 12, tzinfo=dt_timezone.utc)
+        # -16.5 es borde de celda: los candidatos quedan en la celda vecina
+        indice = self._indice((-16.5095, -64.0, fecha), (-16.4890, -64.0, fecha))
+        self.assertEqual(indice.buscar(-16.4999, -64.0, fecha.date()).latitud, -16.5095)
+        self.assertIsNone(indice.buscar(-16.5200, -64.0, fecha.date()))
+        self.assertIsNone(indice.buscar(-16.4999, -63.9899, fecha.date()))
+        self.assertEqual(len(indice), 2)
+
+    def test_mismo_dia_y_mas_reciente(self):
+        mediodia = datetime(2024, 8, 20, 12, tzinfo=dt_timezone.utc)
+        tarde, anterior = mediodia + timedelta(hours=11, minutes=59), mediodia - timedelta(hours=12, minutes=1)
+        # El más reciente se agrega primero: la búsqueda no depende del orden de inserción
+        indice = self._indice((-16.5, -64.0, tarde), (-16.505, -64.005, mediodia), (-16.5, -64.0, anterior))
+        self.assertEqual(indice.buscar(-16.502, -64.002, mediodia.date()).fecha_deteccion, tarde)
+        # Día anterior (23:59 del 19): solo coincide con su propio día
+        self.assertEqual(indice.buscar(-16.5, -64.0, anterior.date()).fecha_deteccion, anterior)
+        self.assertIsNone(indice.buscar(-16.5, -64.0, (mediodia + timedelta(days=1)).date()))
+
+
+class TransformarTests(TestCase):
+    def test_columnas_derivadas(self):
+        updater = NASAFirmsUpdater(api_key='test')
+        df = _df_firms(FILAS_EJEMPLO)
+        df['confidence'] = df['confidence'].astype(object)
+        df.loc[4, 'confidence'] = 'h'
+
+        t = updater.transformar(df)
+
+        self.assertEqual(list(t['severidad']), ['critico', 'alto', 'alto', 'critico', 'medio'])
+        self.assertEqual(list(t['intensidad'].round(2)), [0.84, 0.7, 0.62, 0.96, 0.4])
+        self.assertAlmostEqual(t['area_afectada_ha'].iloc[0], 35.0 * 0.15)
+        self.assertEqual(t['confianza_deteccion'].iloc[4], 0.9)
+        self.assertEqual(t['nombre'].iloc[2], 'Incendio_2024-08-20_03h')
+
+        # FIRMS reporta en UTC; se guarda con la zona de America/La_Paz (UTC-4)
+        fecha = t['fecha_deteccion'].iloc[2]
+        self.assertEqual(fecha.utcoffset().total_seconds(), -4 * 3600)
+        self.assertEqual((fecha.date().isoformat(), fecha.hour), ('2024-08-19', 23))
+
+
+class AsignarDepartamentosTests(TestCase):
+    def test_vectorizado_equivale_a_identificar_departamento(self):
+        updater = NASAFirmsUpdater(api_key='test')
+        df = pd.DataFrame({
+            # Incluye puntos en zonas de solapamiento, bordes exactos y fuera de Bolivia
+            'latitude': [-16.5, -16.0, -15.5, -12.0, -20.0, -22.9, -9.0, -13.5],
+            'longitude': [-68.2, -64.0, -66.5, -66.0, -63.0, -66.0, -65.0, -64.5],
+        })
+
+        nombres = updater.asignar_departamentos(df)
+        esperados = [
+            d.nombre if d else None
+            for d in (updater.identificar_departamento(lat, lon)
+                      for lat, lon in zip(df['latitude'], df['longitude']))
+        ]
+        self.assertEqual(nombres.tolist(), esperados)
+
+
+class EventosIncendioTests(TestCase):
+    def test_agrupar_por_proximidad_y_brecha_temporal(self):
+        horas = 3600.0
+        etiquetas = agrupar(
+            lat=[-17.800, -17.805, -17.812, -17.800, -16.500],
+            lon=[-63.200, -63.205, -63.212, -63.200, -68.200],
+            segundos=[0, 2 * horas, 5 * horas, 200 * horas, 0],
+        )
+        # Las tres primeras son un mismo frente; la cuarta llega días después
+        self.assertEqual(len(set(etiquetas[:3])), 1)
+        self.assertEqual(len(set(etiquetas)), 3)
+
+    def test_ingesta_incremental_crea_y_fusiona_eventos(self):
+        updater = NASAFirmsUpdater(api_key='test')
+        updater.procesar_incendios(_df_firms([
+            (-17.800, -63.200, 420.0, '2024-08-20', '1405', 'Terra', 80, 300.1, 35.0),
+            (-17.822, -63.200, 350.0, '2024-08-20', '1740', 'Aqua', 60, 298.0, 12.0),
+        ]))
+        self.assertEqual(EventoIncendio.objects.count(), 2)
+
+        # Una detección intermedia une ambos frentes en el evento más antiguo
+        updater.procesar_incendios(_df_firms([
+            (-17.811, -63.200, 480.0, '2024-08-20', '1750', 'Aqua', 95, 305.0, 80.0),
+        ]))
+        evento = EventoIncendio.objects.get()
+        self.assertEqual(evento.num_detecciones, 3)
+        self.assertEqual(evento.frp_maximo, 80.0)
+        self.assertAlmostEqual(evento.area_total_ha, (35.0 + 12.0 + 80.0) * 0.15)
+        self.assertEqual((evento.min_latitud, evento.max_latitud), (-17.822, -17.8))
+        self.assertEqual(evento.primera_deteccion.isoformat(), '2024-08-20T14:05:00+00:00')
+        self.assertFalse(IncendioForestal.objects.filter(evento__isnull=True).exists())
+
+    def test_actualizacion_de_deteccion_recalcula_el_evento(self):
+        for bulk in (True, False):
+            IncendioForestal.objects.all().delete()
+            EventoIncendio.objects.all().delete()
+            updater = NASAFirmsUpdater(api_key='test')
+            fila = (-17.800, -63.200, 420.0, '2024-08-20', '1405', 'Terra', 80, 300.1, 35.0)
+            updater.procesar_incendios(_df_firms([fila]), bulk=bulk)
+            self.assertEqual(EventoIncendio.objects.get().frp_maximo, 35.0)
+
+            # Misma detección con FRP mayor: se actualiza, no hay filas nuevas
+            self.assertEqual(updater.procesar_incendios(_df_firms([fila[:-1] + (90.0,)]), bulk=bulk), (0, 1))
+            evento = EventoIncendio.objects.get()
+            self.assertEqual(evento.frp_maximo, 90.0)
+            self.assertAlmostEqual(evento.area_total_ha, 90.0 * 0.15)
+
+
+class CicloVidaTests(TestCase):
+    def test_transiciones_por_lotes_segun_ultima_deteccion(self):
+        updater = NASAFirmsUpdater(api_key='test')
+        updater.procesar_incendios(_df_firms(FILAS_EJEMPLO))
+        # Detección sin evento (p. ej. cargada antes de existir la agrupación)
+        IncendioForestal.objects.filter(latitud=-21.5).update(evento=None)
+
+        ahora = datetime(2024, 8, 22, 14, 0, tzinfo=dt_timezone.utc)
+        cambios = actualizar_estados(ahora)
+        # Santa Cruz (20, 14:05 UTC) pasa a controlado; el evento de La Paz
+        # sigue activo por su detección del 21 y la de Tarija por su propia fecha
+        self.assertEqual(cambios['incendios'], {'activo': 0, 'controlado': 1, 'extinto': 0})
+        self.assertEqual(cambios['eventos'], {'activo': 0, 'controlado': 1, 'extinto': 0})
+
+        cambios = actualizar_estados(ahora + timedelta(days=5))
+        self.assertEqual(cambios['incendios'], {'activo': 0, 'controlado': 0, 'extinto': 4})
+        self.assertEqual(IncendioForestal.objects.filter(estado='extinto').count(), 4)
+
+        # Un nuevo paso sobre el evento lo reactiva con todas sus detecciones
+        actualizar_estados(ahora)
+        self.assertEqual(set(IncendioForestal.objects.values_list('estado', flat=True)),
+                         {'activo', 'controlado'})
+
+
+@skipUnless(importlib.util.find_spec('pyarrow'), 'requiere pyarrow')
+class ArchivoHistoricoTests(TestCase):
+    def test_archiva_compacta_y_lee_con_poda(self):
+        NASAFirmsUpdater(api_key='test').procesar_incendios(_df_firms(FILAS_EJEMPLO))
+        actualizar_estados(datetime(2024, 8, 30, tzinfo=dt_timezone.utc))
+        resumen = sorted(ResumenDiario.objects.values_list('fecha', 'departamento_id', 'severidad', 'total'))
+        eventos = EventoIncendio.objects.count()
+
+        with tempfile.TemporaryDirectory() as directorio, \
+                override_settings(ARCHIVO_HISTORICO={'directorio': directorio}):
+            corte = datetime(2024, 8, 21, tzinfo=dt_timezone.utc)
+            self.assertEqual(archivo_historico.archivar(corte, simular=True)['archivadas'], 2)
+            self.assertEqual(archivo_historico.archivar(corte)['archivadas'], 2)
+            self.assertEqual(archivo_historico.archivar(datetime(2024, 9, 1, tzinfo=dt_timezone.utc),
+                                                        filas_por_lote=1)['archivadas'], 2)
+            self.assertEqual(IncendioForestal.objects.count(), 0)
+            self.assertEqual(EventoIncendio.objects.count(), eventos)
+
+            # Tres archivos en la partición de agosto quedan en uno
+            self.assertEqual(archivo_historico.compactar(), 1)
+            self.assertEqual(len(list(Path(directorio).glob('anio=2024/mes=8/*.parquet'))), 1)
+
+            la_paz = archivo_historico.leer_historico(columnas=['id', 'latitud'],
+                                                      bbox=(-17.0, -69.0, -16.0, -68.0))
+            self.assertEqual(list(la_paz.columns), ['id', 'latitud'])
+            self.assertEqual(len(la_paz), 2)
+            self.assertEqual(len(archivo_historico.leer_historico(desde=corte)), 2)
+            self.assertEqual(len(archivo_historico.leer_historico(
+                hasta=datetime(2024, 8, 1, tzinfo=dt_timezone.utc))), 0)
+
+            # El resumen se conserva y también se puede reconstruir desde el archivo
+            actual = sorted(ResumenDiario.objects.values_list('fecha', 'departamento_id', 'severidad', 'total'))
+            self.assertEqual(actual, resumen)
+            reconstruir_resumen()
+            self.assertEqual(sorted(ResumenDiario.objects.values_list(
+                'fecha', 'departamento_id', 'severidad', 'total')), resumen)
+
+    def test_cambio_de_estado_durante_el_lote_no_pierde_detecciones(self):
+        NASAFirmsUpdater(api_key='test').procesar_incendios(_df_firms(FILAS_EJEMPLO))
+        ids = list(IncendioForestal.objects.order_by('id').values_list('id', flat=True))
+        IncendioForestal.objects.filter(id__in=[ids[0], ids[2]]).update(estado='extinto')
+        tabla_real = archivo_historico._tabla
+
+        def tabla(filas):
+            # La fila intermedia del rango de ids se extingue después de leer el lote
+            IncendioForestal.objects.filter(id=ids[1]).update(estado='extinto')
+            return tabla_real(filas)
+
+        with tempfile.TemporaryDirectory() as directorio, \
+                override_settings(ARCHIVO_HISTORICO={'directorio': directorio}), \
+                mock.patch.object(archivo_historico, '_tabla', tabla):
+            corte = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+            self.assertEqual(archivo_historico.archivar(corte, filas_por_lote=2)['archivadas'], 2)
+            self.assertTrue(IncendioForestal.objects.filter(id=ids[1]).exists())
+            archivados = archivo_historico.leer_historico(columnas=['id'])['id'].tolist()
+            self.assertEqual(sorted(archivados), [ids[0], ids[2]])
+
+
+class ClaveEspacialTests(TestCase):
+    def test_rangos_cubren_exactamente_el_bbox(self):
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(-23.0, -9.5, 200000)
+        lon = rng.uniform(-70.0, -57.0, 200000)
+        claves = clave_espacial(lat, lon)
+
+        for bbox in [(-17.9, -63.3, -17.7, -63.1), (-20.0, -66.0, -14.0, -60.0), (-16.5, -68.2, -16.5, -68.2)]:
+            rangos = rangos_bbox(*bbox)
+            self.assertLessEqual(len(rangos), 24)
+            en_rangos = np.zeros(len(claves), dtype=bool)
+            for desde, hasta in rangos:
+                en_rangos |= (claves >= desde) & (claves <= hasta)
+            en_bbox = (lat >= bbox[0]) & (lat <= bbox[2]) & (lon >= bbox[1]) & (lon <= bbox[3])
+            # Todo punto del bbox cae en algún rango (los rangos pueden incluir de más)
+            self.assertFalse((en_bbox & ~en_rangos).any())
+
+    def test_consultas_por_bbox_y_radio(self):
+        NASAFirmsUpdater(api_key='test').procesar_incendios(_df_firms(FILAS_EJEMPLO))
+        self.assertFalse(IncendioForestal.objects.filter(clave_espacial__isnull=True).exists())
+
+        en_bbox = filtrar_bbox(IncendioForestal.objects.all(), -18.0, -64.0, -16.0, -63.0)
+        self.assertEqual(list(en_bbox.values_list('latitud', flat=True)), [-17.8])
+
+        cerca = filtrar_radio(IncendioForestal.objects.all(), -16.45, -68.2, 10)
+        self.assertEqual(cerca.count(), 2)
+        self.assertAlmostEqual(cerca.first().distancia_km, 5.56, places=2)
+
+
+class IndiceRTreeTests(TestCase):
+    def setUp(self):
+        NASAFirmsUpdater(api_key='test').procesar_incendios(_df_firms(FILAS_EJEMPLO))
+
+    def test_rtree_sincronizado_por_triggers(self):
+        self.assertTrue(rtree.disponible())
+        en_bbox = rtree.detecciones_en_bbox(-18.0, -64.0, -16.0, -63.0)
+        self.assertEqual(list(en_bbox.values_list('latitud', flat=True)), [-17.8])
+
+        # Actualizaciones masivas y borrados también llegan al índice
+        IncendioForestal.objects.filter(latitud=-17.8).update(latitud=-21.4, longitud=-64.6)
+        self.assertFalse(rtree.detecciones_en_bbox(-18.0, -64.0, -16.0, -63.0).exists())
+        cerca = rtree.detecciones_cerca(-21.5, -64.7, 20)
+        self.assertEqual([round(c.distancia_km, 1) for c in cerca], [0.0, 15.2])
+
+        IncendioForestal.objects.filter(latitud=-16.5).delete()
+        self.assertEqual(rtree.detecciones_en_bbox(-17.0, -69.0, -16.0, -68.0).count(), 0)
+
+    def test_areas_protegidas_candidatas_y_prueba_exacta(self):
+        # Triángulo: su bbox contiene (-21.0, -64.9) pero el polígono no
+        area = AreaProtegida(nombre='Tariquía', categoria='Reserva', geometria={
+            'type': 'Polygon',
+            'coordinates': [[[-65.0, -22.0], [-64.0, -22.0], [-64.5, -21.0], [-65.0, -22.0]]],
+        })
+        area.save()
+        self.assertEqual((area.min_latitud, area.max_longitud), (-22.0, -64.0))
+
+        self.assertEqual(rtree.areas_para_punto(-21.5, -64.7), [area])
+        self.assertEqual(rtree.areas_para_punto(-21.1, -64.9), [])
+        self.assertEqual([i.latitud for i in rtree.detecciones_en_area(area)], [-21.5])
+
+
+class ApiIncendiosJsonTests(TestCase):
+    def setUp(self):
+        santa_cruz = Departamento.objects.create(nombre='Santa Cruz', codigo='SC')
+        base = datetime(2024, 8, 20, 14, 0, tzinfo=dt_timezone.utc)
+        # Pares con la misma fecha: el id desempata el orden
+        for i in range(7):
+            IncendioForestal.objects.create(
+                nombre=f'Foco {i}', latitud=-17.0 - i * 0.1, longitud=-63.0,
+                fecha_deteccion=base + timedelta(hours=i // 2),
+                severidad='alto' if i % 2 else 'bajo',
+                departamento=santa_cruz if i < 3 else None,
+            )
+
+    def test_paginacion_por_cursor_recorre_todo_sin_repetir(self):
+        url = '/api/incendios/json/?limite=3'
+        vistos = []
+        while url:
+            datos = self.client.get(url).json()
+            vistos += datos['incendios']
+            url = datos['metadata']['siguiente_url']
+        claves = [(i['fecha_deteccion'], i['id']) for i in vistos]
+        self.assertEqual(len(set(claves)), 7)
+        self.assertEqual(claves, sorted(claves, reverse=True))
+        self.assertEqual(vistos[-1]['departamento'], 'Santa Cruz')
+
+        # Una página con cursor es una sola consulta, sin importar la profundidad
+        cursor = self.client.get('/api/incendios/json/?limite=3').json()['metadata']['siguiente']
+        with self.assertNumQueries(1):
+            self.client.get('/api/incendios/json/', {'limite': 3, 'cursor': cursor})
+
+    def test_filtros_y_errores(self):
+        def ids(**parametros):
+            respuesta = self.client.get('/api/incendios/json/', parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            return [i['nombre'] for i in respuesta.json()['incendios']]
+
+        self.assertEqual(ids(bbox='-63.5,-17.25,-62.5,-16.9', severidad='alto'), ['Foco 1'])
+        self.assertEqual(ids(departamento='Santa Cruz', estado='activo'), ['Foco 2', 'Foco 1', 'Foco 0'])
+        self.assertEqual(len(ids(desde='2024-08-20T15:00:00Z')), 5)
+        self.assertEqual(len(ids(hasta='2024-08-19')), 0)
+
+        for parametros in ({'bbox': '1,2,3'}, {'severidad': 'extremo'}, {'departamento': 'Atlantis'},
+                           {'cursor': 'no-es-un-cursor'}, {'limite': 0}):
+            self.assertEqual(self.client.get('/api/incendios/json/', parametros).status_code, 400)
+
+    def test_geojson_en_streaming_por_bloques(self):
+        respuesta = self.client.get('/api/incendios/geojson/', {'severidad': 'alto'},
+                                    HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        datos = json.loads(gzip.decompress(b''.join(respuesta.streaming_content)))
+        self.assertEqual(datos['type'], 'FeatureCollection')
+        self.assertEqual([f['properties']['nombre'] for f in datos['features']],
+                         ['Foco 5', 'Foco 3', 'Foco 1'])
+        self.assertEqual(datos['features'][-1]['geometry'],
+                         {'type': 'Point', 'coordinates': [-63.0, -17.1]})
+        self.assertEqual(datos['features'][-1]['properties']['departamento'], 'Santa Cruz')
+
+        # Bloques de 3 filas y codificación sin orjson: mismo documento
+        queryset = consultas.filtrar_incendios({})
+        completo = b''.join(geojson.feature_collection(queryset))
+        orjson, geojson.orjson = geojson.orjson, None
+        try:
+            partes = list(geojson.feature_collection(queryset, filas_por_bloque=3))
+        finally:
+            geojson.orjson = orjson
+        self.assertEqual(len(partes), 5)
+        self.assertEqual(json.loads(b''.join(partes)), json.loads(completo))
+        self.assertEqual(len(json.loads(completo)['features']), 7)
+
+        self.assertEqual(self.client.get('/api/incendios/geojson/', {'bbox': 'x'}).status_code, 400)
+
+
+def _pixeles_globales(lat, lon, z):
+    """Posición (x, y) en unidades de tesela del zoom z"""
+    n = 2 ** z
+    return ((lon + 180) / 360 * n, (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+
+
+def _tesela(lat, lon, z):
+    return (z, *(int(v) for v in _pixeles_globales(lat, lon, z)))
+
+
+class TeselasMvtTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        ajustes = self.settings(TESELAS_MVT={'directorio': self.directorio})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.updater = NASAFirmsUpdater(api_key='test')
+        self.updater.procesar_incendios(_df_firms(FILAS_EJEMPLO))
+
+    def _pedir(self, z, x, y, **encabezados):
+        return self.client.get(f'/tiles/{z}/{x}/{y}.pbf', **encabezados)
+
+    def test_tesela_desde_cache_con_gzip_y_etag(self):
+        santa_cruz = _tesela(-17.8, -63.2, 8)
+        respuesta = self._pedir(*santa_cruz, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        features = _leer_mvt(gzip.decompress(respuesta.content))['incendios']
+
+        esperados = IncendioForestal.objects.filter(latitud__lt=-17.7, longitud__gt=-63.3)
+        self.assertEqual({f[0] for f in features}, set(esperados.values_list('id', flat=True)))
+        self.assertTrue(all(0 <= f[1] < 4096 and 0 <= f[2] < 4096 for f in features))
+        for id, _, _, propiedades in features:
+            incendio = esperados.get(id=id)
+            self.assertEqual(
+                (propiedades['severidad'], propiedades['satelite'], propiedades['frp'], propiedades['fecha']),
+                (incendio.severidad, incendio.satelite, incendio.frp, int(incendio.fecha_deteccion.timestamp()))
+            )
+
+        # La segunda vez sale del archivo en disco; con el ETag no se reenvía
+        cacheada = self._pedir(*santa_cruz, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(cacheada.streaming)
+        self.assertEqual(gzip.decompress(b''.join(cacheada.streaming_content)),
+                         gzip.decompress(respuesta.content))
+        self.assertEqual(self._pedir(*santa_cruz, HTTP_IF_NONE_MATCH=cacheada['ETag']).status_code, 304)
+        sin_gzip = self._pedir(*santa_cruz)
+        self.assertFalse(sin_gzip.has_header('Content-Encoding'))
+        self.assertEqual(sin_gzip.content, gzip.decompress(respuesta.content))
+
+        self.assertEqual(self._pedir(2, 4, 0).status_code, 404)
+        self.assertEqual(self._pedir(*_tesela(-30, -60, 8))['Content-Length'], '0')
+
+    def test_la_ingesta_invalida_solo_las_teselas_tocadas(self):
+        santa_cruz, la_paz = _tesela(-17.8, -63.2, 8), _tesela(-16.5, -68.2, 8)
+        mundo = (0, 0, 0)
+        for tesela in (santa_cruz, la_paz, mundo):
+            self._pedir(*tesela)
+        self.assertTrue(all(teselas.ruta(*t).exists() for t in (santa_cruz, la_paz, mundo)))
+
+        self.updater.procesar_incendios(_df_firms(FILAS_EJEMPLO[:1]))
+        self.assertFalse(teselas.ruta(*santa_cruz).exists())
+        self.assertFalse(teselas.ruta(*mundo).exists())
+        self.assertTrue(teselas.ruta(*la_paz).exists())
+
+        # Un render que empezó antes de una invalidación no se guarda
+        marca = self.directorio / teselas.MARCA_INVALIDACION
+        os.utime(marca, (marca.stat().st_atime, marca.stat().st_mtime + 60))
+        self._pedir(*santa_cruz)
+        self.assertFalse(teselas.ruta(*santa_cruz).exists())
+
+    def test_borrados_del_admin_invalidan_sin_anular_el_borrado_rapido(self):
+        from django.contrib import admin
+        from django.db.models.signals import post_delete
+
+        # Un receptor post_delete obligaría a cargar cada fila en los borrados masivos
+        self.assertFalse(post_delete.has_listeners(IncendioForestal))
+
+        la_paz = _tesela(-16.5, -68.2, 8)
+        self._pedir(*la_paz)
+        self.assertTrue(teselas.ruta(*la_paz).exists())
+        modelo_admin = admin.site._registry[IncendioForestal]
+        with self.captureOnCommitCallbacks(execute=True):
+            modelo_admin.delete_queryset(None, IncendioForestal.objects.filter(longitud__lt=-68))
+        self.assertFalse(teselas.ruta(*la_paz).exists())
+
+
+class ClustersTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.archivo = Path(directorio.name) / 'clusters.npz'
+        ajustes = self.settings(CLUSTERS_INCENDIOS={'archivo': self.archivo, 'zoom_maximo': 12})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_jerarquia_conserva_conteos_y_severidad(self):
+        rng = np.random.default_rng(7)
+        n = 3000
+        lat, lon = rng.uniform(-22, -10, n), rng.uniform(-69, -58, n)
+        severidad = rng.integers(0, 4, n)
+        indice = clusters.IndiceClusters(np.arange(1, n + 1), lat, lon, severidad, timezone.now(),
+                                         zoom_maximo=12)
+        anteriores = 1
+        for zoom in range(indice.zoom_maximo + 2):
+            seleccion = indice.consultar(-23, -70, -9, -57, zoom)
+            self.assertEqual(seleccion['cantidad'].sum(), n)
+            self.assertGreaterEqual(len(seleccion['cantidad']), anteriores)
+            anteriores = len(seleccion['cantidad'])
+        self.assertEqual(indice.consultar(-23, -70, -9, -57, 0)['severidad'].max(), severidad.max())
+
+        # Al máximo zoom, los puntos del bbox (las celdas pueden asomar apenas fuera)
+        seleccion = indice.consultar(-16, -65, -15, -64, 20)
+        dentro = (lat >= -16) & (lat <= -15) & (lon >= -65) & (lon <= -64)
+        self.assertTrue(set(np.flatnonzero(dentro) + 1) <= set(seleccion['id'].tolist()))
+        self.assertTrue(np.all(np.abs(seleccion['lat'] + 15.5) <= 0.52))
+
+    def test_actualizacion_incremental_igual_a_reconstruir(self):
+        for i in range(6):
+            IncendioForestal.objects.create(nombre=f'Foco {i}', latitud=-17 - i, longitud=-63 + i,
+                                            fecha_deteccion=timezone.now(), severidad='bajo')
+        # Sin índice en disco la solicitud no lo construye
+        self.assertEqual(self.client.get('/api/incendios/clusters/', {'bbox': '-70,-23,-57,-9'}).status_code, 503)
+        self.assertFalse(self.archivo.exists())
+        clusters.actualizar_clusters(completo=True)
+
+        cambiado = IncendioForestal.objects.get(nombre='Foco 0')
+        cambiado.severidad = 'critico'
+        cambiado.save()
+        IncendioForestal.objects.filter(nombre='Foco 1').update(
+            estado='extinto', fecha_ultima_actualizacion=timezone.now()
+        )
+        IncendioForestal.objects.create(nombre='Foco 6', latitud=-12, longitud=-60,
+                                        fecha_deteccion=timezone.now())
+
+        incremental = clusters.actualizar_clusters()
+        completo = clusters.IndiceClusters.desde_filas(
+            IncendioForestal.objects.exclude(estado='extinto').values_list('id', 'latitud', 'longitud', 'severidad'),
+            timezone.now(), zoom_maximo=12,
+        )
+        self.assertEqual(len(incremental), 6)
+        for zoom in (0, 5, 13):
+            for campo in ('clave', 'cantidad', 'severidad', 'id'):
+                np.testing.assert_array_equal(incremental.niveles[zoom][campo], completo.niveles[zoom][campo])
+
+        respuesta = self.client.get('/api/incendios/clusters/', {'bbox': '-70,-23,-57,-9', 'zoom': 0})
+        datos = respuesta.json()
+        self.assertEqual(datos['clusters'], [{
+            'lat': datos['clusters'][0]['lat'], 'lon': datos['clusters'][0]['lon'],
+            'cantidad': 6, 'severidad_max': 'critico', 'id': None,
+        }])
+        self.assertEqual(self.client.get('/api/incendios/clusters/', {'zoom': 3}).status_code, 400)
+
+    def test_borrados_salen_al_vencer_la_construccion_completa(self):
+        for i in range(3):
+            IncendioForestal.objects.create(nombre=f'Foco {i}', latitud=-17 - i, longitud=-63 + i,
+                                            fecha_deteccion=timezone.now(), severidad='bajo')
+        inicio = timezone.now()
+        with mock.patch.object(clusters.timezone, 'now', return_value=inicio):
+            clusters.actualizar_clusters(completo=True)
+        # Las actualizaciones incrementales no renuevan la construcción completa
+        with mock.patch.object(clusters.timezone, 'now', return_value=inicio + timedelta(hours=23)):
+            clusters.actualizar_clusters()
+        borrado = IncendioForestal.objects.get(nombre='Foco 0')
+        borrado.delete()
+
+        with mock.patch.object(clusters.timezone, 'now', return_value=inicio + timedelta(hours=25)):
+            indice = clusters.actualizar_clusters()
+        self.assertNotIn(borrado.id, indice.niveles[13]['id'].tolist())
+        self.assertEqual(len(indice), 2)
+        self.assertEqual(clusters.IndiceClusters.cargar(self.archivo).construido, inicio + timedelta(hours=25))
+
+
+def _png_rgba(contenido):
+    """Píxeles (alto, ancho, 4) de un PNG RGBA sin filtros como los de densidad.png"""
+    posicion, idat = 8, b''
+    while posicion < len(contenido):
+        largo, tipo = struct.unpack('>I4s', contenido[posicion:posicion + 8])
+        if tipo == b'IHDR':
+            ancho, alto = struct.unpack('>II', contenido[posicion + 8:posicion + 16])
+        elif tipo == b'IDAT':
+            idat += contenido[posicion + 8:posicion + 8 + largo]
+        posicion += 12 + largo
+    filas = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(alto, ancho * 4 + 1)
+    return filas[:, 1:].reshape(alto, ancho, 4)
+
+
+class DensidadTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = Path(directorio.name)
+        ajustes = self.settings(DENSIDAD_INCENDIOS={'directorio': self.directorio, 'zoom_maximo': 6})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        ahora = timezone.now()
+        # Santa Cruz reciente, Tarija de hace 3 días
+        for i in range(5):
+            IncendioForestal.objects.create(nombre=f'SC {i}', latitud=-17.8, longitud=-63.2 + i * 0.01,
+                                            fecha_deteccion=ahora - timedelta(hours=2), intensidad=0.9)
+        IncendioForestal.objects.create(nombre='Tarija', latitud=-21.5, longitud=-64.7,
+                                        fecha_deteccion=ahora - timedelta(days=3), intensidad=0.7)
+
+    def _alfa(self, ventana, lat, lon, z=6):
+        """Canal alfa de la tesela que contiene el punto, alrededor de su píxel"""
+        _, x, y = _tesela(lat, lon, z)
+        respuesta = self.client.get(f'/tiles/densidad/{ventana}/{z}/{x}/{y}.png')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'image/png')
+        contenido = respuesta.content
+        self.assertTrue(contenido.startswith(b'\x89PNG\r\n\x1a\n'))
+        px, py = (int(v * 256) % 256 for v in _pixeles_globales(lat, lon, z))
+        return _png_rgba(contenido)[max(py - 2, 0):py + 3, max(px - 2, 0):px + 3, 3]
+
+    def test_ventanas_y_teselas(self):
+        # Sin grillas en disco la solicitud no las calcula
+        _, x, y = _tesela(-17.8, -63.2, 6)
+        self.assertEqual(self.client.get(f'/tiles/densidad/24h/6/{x}/{y}.png').status_code, 503)
+        self.assertFalse((self.directorio / 'densidad.npz').exists())
+
+        densidad.actualizar_densidad()
+        self.assertGreater(self._alfa('24h', -17.8, -63.2).max(), 0)
+        self.assertEqual(self._alfa('24h', -21.5, -64.7).max(), 0)
+        self.assertGreater(self._alfa('7d', -21.5, -64.7).max(), 0)
+        # Lejos de toda detección: transparente
+        self.assertEqual(self._alfa('30d', -10.5, -68.5).max(), 0)
+
+        url = f'/tiles/densidad/24h/6/{x}/{y}.png'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(f'/tiles/densidad/1h/6/{x}/{y}.png').status_code, 404)
+        self.assertEqual(self.client.get(f'/tiles/densidad/24h/7/{x}/{y}.png').status_code, 404)
+
+        # Si un recálculo borra la versión en cache la tesela se vuelve a generar
+        shutil.rmtree(self.directorio / 'teselas')
+        self.assertGreater(self._alfa('24h', -17.8, -63.2).max(), 0)
+
+        # Un recálculo cambia la versión: el cache anterior se descarta
+        anteriores = list((self.directorio / 'teselas').iterdir())
+        densidad.actualizar_densidad(ahora=timezone.now() + timedelta(days=2))
+        self.assertTrue(all(not carpeta.exists() for carpeta in anteriores))
+        self.assertEqual(self._alfa('24h', -17.8, -63.2).max(), 0)
+        self.assertNotEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_mapa_avanzado_sin_puntos_embebidos(self):
+        reconstruir_resumen()
+        respuesta = self.client.get('/mapa-avanzado/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['estadisticas']['total_incendios'], 6)
+        self.assertEqual(respuesta.context['estadisticas']['activos'], 6)
+        self.assertIn('/tiles/densidad/24h/', respuesta.context['mapa_html'])
+        self.assertNotIn('heatLayer', respuesta.context['mapa_html'])
+
+
+class ResumenDiarioTests(TestCase):
+    def _resumen(self):
+        return sorted(
+            (r.fecha, r.departamento_id, r.severidad, r.satelite, r.total,
+             round(r.area_total_ha, 6), round(r.suma_intensidad, 6))
+            for r in ResumenDiario.objects.exclude(total=0)
+        )
+
+    def test_deltas_de_ingesta_equivalen_a_reconstruir(self):
+        for bulk in (True, False):
+            IncendioForestal.objects.all().delete()
+            ResumenDiario.objects.all().delete()
+            updater = NASAFirmsUpdater(api_key='test')
+            updater.procesar_incendios(_df_firms(FILAS_EJEMPLO), bulk=bulk)
+            # Segunda pasada: cambia la severidad de una detección existente
+            updater.procesar_incendios(_df_firms([
+                (-17.80, -63.20, 200.0, '2024-08-20', '1800', 'Terra', 80, 300.1, 1.0),
+            ]), bulk=bulk)
+
+            incremental = self._resumen()
+            reconstruir_resumen()
+            self.assertEqual(incremental, self._resumen())
+            self.assertEqual(sum(fila[4] for fila in incremental), 4)
+
+    def test_admin_mantiene_el_resumen(self):
+        NASAFirmsUpdater(api_key='test').procesar_incendios(_df_firms(FILAS_EJEMPLO))
+        modelo_admin = admin.site._registry[IncendioForestal]
+        incendios = list(IncendioForestal.objects.order_by('id'))
+
+        incendios[0].severidad = 'critico' if incendios[0].severidad != 'critico' else 'bajo'
+        incendios[0].area_afectada_ha += 5
+        modelo_admin.save_model(None, incendios[0], None, True)
+        modelo_admin.delete_model(None, incendios[1])
+        modelo_admin.delete_queryset(None, IncendioForestal.objects.filter(id=incendios[2].id))
+
+        incremental = self._resumen()
+        reconstruir_resumen()
+        self.assertEqual(incremental, self._resumen())
+        self.assertEqual(sum(fila[4] for fila in incremental), 2)
+
+    def test_dashboard_lee_el_resumen(self):
+        NASAFirmsUpdater(api_key='test').procesar_incendios(_df_firms(FILAS_EJEMPLO))
+        respuesta = self.client.get('/dashboard/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['estadisticas']['total_incendios'], 4)
+
+
+class ConexionSqliteTests(TestCase):
+    def test_pragmas_de_concurrencia(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            conexion = sqlite3.connect(os.path.join(directorio, 'prueba.sqlite3'))
+            vigentes = aplicar_pragmas(conexion)
+            conexion.close()
+        self.assertEqual(vigentes['journal_mode'], 'wal')
+        self.assertEqual(vigentes['synchronous'], 1)
+        self.assertEqual(vigentes['temp_store'], 2)
+
+        # Las conexiones de Django se configuran al crearse (connection_created)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 30000)
+
+    def test_ingesta_bulk_en_transacciones_cortas(self):
+        updater = NASAFirmsUpdater(api_key='test')
+        updater.filas_por_transaccion = 2
+        self.assertEqual(updater.procesar_incendios(_df_firms(FILAS_EJEMPLO)), (4, 1))
+        self.assertEqual(updater.procesar_incendios(_df_firms(FILAS_EJEMPLO[:3])), (0, 3))
+        self.assertEqual(IncendioForestal.objects.count(), 4)
+
+        incremental = sorted(ResumenDiario.objects.exclude(total=0).values_list(
+            'fecha', 'departamento_id', 'severidad', 'satelite', 'total'))
+        reconstruir_resumen()
+        self.assertEqual(incremental, sorted(ResumenDiario.objects.values_list(
+            'fecha', 'departamento_id', 'severidad', 'satelite', 'total')))
+
+    def test_ingestas_simultaneas_no_duplican(self):
+        """
+        Dos ingestas de la misma ventana (trabajo web y backfill, por ejemplo)
+        con el peor intercalado: la segunda escribe justo antes de que la
+        primera abra su transacción. La búsqueda de duplicados de la primera
+        va dentro de esa transacción y ya ve lo escrito por la segunda.
+        """
+        df = _df_firms(FILAS_EJEMPLO)
+        for bulk in (True, False):
+            IncendioForestal.objects.all().delete()
+            ResumenDiario.objects.all().delete()
+            primera, segunda = NASAFirmsUpdater(api_key='test'), NASAFirmsUpdater(api_key='test')
+            escritura_real = nasa_firms.escritura
+            intercalar = [True]
+
+            def escritura(*args, **kwargs):
+                if intercalar:
+                    intercalar.pop()
+                    self.assertEqual(segunda.procesar_incendios(df, bulk=bulk), (4, 1))
+                return escritura_real(*args, **kwargs)
+
+            with mock.patch.object(nasa_firms, 'escritura', escritura):
+                self.assertEqual(primera.procesar_incendios(df, bulk=bulk), (0, 5))
+            self.assertEqual(IncendioForestal.objects.count(), 4)
+            self.assertEqual(sum(ResumenDiario.objects.values_list('total', flat=True)), 4)
+
+
+class GrillaLimitesTests(SimpleTestCase):
+    def test_grilla_coincide_con_punto_en_poligono_exacto(self):
+        angulos = np.linspace(0, 2 * np.pi, 120, endpoint=False)
+        radio = 3 + 1.5 * np.sin(7 * angulos)
+        estrella = np.c_[-64 + radio * np.cos(angulos), -16 + radio * np.sin(angulos)]
+        geometrias = [
+            {'type': 'Polygon', 'coordinates': [np.vstack([estrella, estrella[:1]]).tolist()]},
+            # Polígono con hueco
+            {'type': 'Polygon', 'coordinates': [
+                [[-69, -22], [-65, -22], [-65, -19], [-69, -19], [-69, -22]],
+                [[-68, -21], [-66, -21], [-66, -20], [-68, -20], [-68, -21]],
+            ]},
+        ]
+        aristas = [_aristas(_anillos(g)) for g in geometrias]
+        grilla = GrillaLimites(['Estrella', 'Marco'], aristas)
+
+        rng = np.random.default_rng(0)
+        lat = rng.uniform(-23.5, -9.0, 50000)
+        lon = rng.uniform(-70.0, -57.0, 50000)
+
+        esperado = np.full(len(lat), -1)
+        for codigo in reversed(range(len(aristas))):
+            esperado[puntos_en_poligono(lon, lat, aristas[codigo])] = codigo
+
+        np.testing.assert_array_equal(grilla.codigos(lat, lon), esperado)
+        self.assertEqual(list(grilla.nombres_para([-16.0, -20.5], [-64.0, -67.0])), ['Estrella', None])
+
+    def test_solapamiento_gana_el_primer_poligono(self):
+        cuadrados = [
+            {'type': 'Polygon', 'coordinates': [[[-66, -18], [-62, -18], [-62, -14], [-66, -14], [-66, -18]]]},
+            {'type': 'Polygon', 'coordinates': [[[-64, -16], [-60, -16], [-60, -12], [-64, -12], [-64, -16]]]},
+        ]
+        grilla = GrillaLimites(['Primero', 'Segundo'], [_aristas(_anillos(g)) for g in cuadrados])
+        # Interior del solape (celda llena) y junto a un borde (celda mixta)
+        self.assertEqual(list(grilla.nombres_para([-15.0, -14.001, -13.0], [-63.0, -63.0, -61.0])),
+                         ['Primero', 'Primero', 'Segundo'])
+
+
+class PlanificadorPasosTests(SimpleTestCase):
+    def test_consulta_seguido_en_ventana_y_duerme_entre_ventanas(self):
+        fuente = 'VIIRS_SNPP_NRT'
+        plan = PlanificadorPasos([fuente], jitter=0)
+        ahora = datetime(2024, 8, 20, 14, 0, tzinfo=dt_timezone.utc)
+        self.assertEqual(plan.fuentes_a_consultar(ahora), [fuente])
+
+        # Fuera de ventana: la siguiente consulta es al abrirse la próxima
+        ventana = next(v for v in plan.ventanas(fuente, ahora, ahora + timedelta(days=1))
+                       if v.inicio > ahora)
+        self.assertEqual(plan.registrar_consulta(fuente, ahora, {}), ventana.inicio)
+        self.assertEqual(plan.espera(ahora), (ventana.inicio - ahora).total_seconds())
+
+        # Dentro de la ventana sin datos: intervalos crecientes con tope
+        t = ventana.inicio
+        esperas = []
+        for _ in range(6):
+            siguiente = plan.registrar_consulta(fuente, t, {})
+            esperas.append((siguiente - t).total_seconds())
+            t = siguiente
+        self.assertEqual(esperas, [300, 450, 675, 1012.5, 1518.75, 1800])
+
+        # Cuando la marca de agua alcanza el paso, la ventana queda cubierta
+        siguiente = plan.registrar_consulta(fuente, t, {fuente: ventana.paso})
+        self.assertEqual(siguiente, t + timedelta(hours=6))
+
+    def test_bloqueo_de_instancia_unica(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'planificador.lock')
+            primero = BloqueoInstancia(ruta)
+            self.assertTrue(primero.adquirir())
+            self.assertFalse(BloqueoInstancia(ruta).adquirir())
+
+            # Sin latido durante más del vencimiento se considera abandonado
+            os.utime(ruta, (0, 0))
+            segundo = BloqueoInstancia(ruta)
+            self.assertTrue(segundo.adquirir())
+            segundo.liberar()
+            self.assertFalse(os.path.exists(ruta))
+
+    def test_watch_rechaza_completo(self):
+        with self.assertRaisesMessage(CommandError, '--completo'):
+            call_command('actualizar_nasa', '--watch', '--completo')
+
+
+class _FirmsStubHandler(BaseHTTPRequestHandler):
+    """Sirve respuestas CSV tipo FIRMS filtrando DETECCIONES por el bbox pedido"""
+    cabecera = ('latitude,longitude,brightness,scan,track,acq_date,acq_time,satellite,'
+                'instrument,confidence,version,bright_t31,frp,daynight')
+    # Incluye puntos sobre los bordes internos de una grilla 2x2 del bbox de
+    # Bolivia (lat -16.3, lon -63.55)
+    detecciones = [
+        (-16.3, -63.55, '1405'),   # borde vertical compartido
+        (-16.3, -65.0, '1410'),
+        (-20.0, -60.0, '1415'),
+        (-12.0, -68.0, '1420'),
+        (-16.3, -60.0, '1425'),    # borde horizontal compartido
+    ]
+    # Datos NRT: detecciones de ayer (UTC)
+    fecha = (datetime.now(dt_timezone.utc).date() - timedelta(days=1)).isoformat()
+    solicitudes = []
+
+    def do_GET(self):
+        partes = self.path.split('/')
+        # Con fecha inicial (/AAAA-MM-DD al final) las detecciones son de ese día
+        fecha = partes.pop() if '-' in partes[-1] else self.fecha
+        source, area, days = partes[-3:]
+        oeste, sur, este, norte = map(float, area.split(','))
+        self.solicitudes.append(self.path)
+        if source == 'FALLA':
+            self.send_response(400)
+            self.end_headers()
+            return
+        filas = [
+            f"{lat},{lon},330.5,1.0,1.0,{fecha},{hora},Terra,MODIS,70,6.1NRT,295.2,15.3,D"
+            for lat, lon, hora in self.detecciones
+            if oeste <= lon <= este and sur <= lat <= norte
+        ]
+        cuerpo = '\n'.join([self.cabecera] + filas).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+class DescargaPorTeselasTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _FirmsStubHandler)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.servidor.server_address[1]}/api/area/csv"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = self.settings(CLUSTERS_INCENDIOS={'archivo': Path(directorio.name) / 'clusters.npz'},
+                                DENSIDAD_INCENDIOS={'directorio': Path(directorio.name) / 'densidad'})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def _updater(self, **kwargs):
+        kwargs.setdefault('usar_cache', False)
+        updater = NASAFirmsUpdater(api_key='test', timeout=5, **kwargs)
+        updater.base_url = self.base_url
+        return updater
+
+    def test_teselas_en_paralelo_sin_duplicados_en_bordes(self):
+        _FirmsStubHandler.solicitudes = []
+        completo = self._updater().obtener_datos_nasa(days=1)
+        teselado = self._updater(tiles=(2, 2), workers_tiles=4).obtener_datos_nasa(days=1)
+
+        self.assertEqual(len(_FirmsStubHandler.solicitudes), 5)
+        self.assertEqual(len(completo), 5)
+        self.assertEqual(
+            sorted(teselado['acq_time']), sorted(completo['acq_time'])
+        )
+
+    def test_streaming_por_bloques_equivale_a_descarga_completa(self):
+        completo = self._updater().obtener_datos_nasa(days=1)
+        bloques = list(self._updater(tiles=(2, 2)).iterar_datos_nasa(days=1, chunksize=1))
+
+        self.assertTrue(all(len(b) == 1 for b in bloques))
+        self.assertEqual(
+            sorted(pd.concat(bloques)['acq_time']), sorted(completo['acq_time'])
+        )
+
+    def test_actualizacion_en_streaming(self):
+        resultado = self._updater(tiles=(2, 2), chunksize=2).ejecutar_actualizacion(
+            days=1, sources=['MODIS_NRT', 'FALLA'], streaming=True
+        )
+        self.assertEqual((resultado['nuevos'], resultado['actualizados']), (5, 0))
+        self.assertEqual(resultado['fuentes'], {'MODIS_NRT': 5, 'FALLA': 'error'})
+
+    def test_cache_en_disco_evita_descargas_repetidas(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            updater = self._updater(tiles=(2, 2))
+            updater.cache = CacheRespuestas(directorio)
+            _FirmsStubHandler.solicitudes = []
+
+            primero = updater.obtener_datos_nasa(days=1)
+            segundo = updater.obtener_datos_nasa(days=1)
+
+            self.assertEqual(len(_FirmsStubHandler.solicitudes), 4)
+            self.assertEqual(updater.cache.estadisticas(), {'hits': 4, 'misses': 4})
+            pd.testing.assert_frame_equal(primero, segundo)
+
+            # Una descarga cortada a mitad no deja el .tmp en el cache
+            def cortada():
+                yield b'latitude,longitude\n'
+                raise ConnectionError('conexión cortada')
+
+            with self.assertRaises(ConnectionError):
+                updater.cache.guardar('cortada', cortada())
+            self.assertEqual(list(Path(directorio).rglob('*.tmp')), [])
+
+    def test_ingesta_incremental_descarta_filas_vistas(self):
+        updater = self._updater()
+        primera = updater.ejecutar_actualizacion(days=7)
+        segunda = updater.ejecutar_actualizacion(days=7)
+
+        self.assertEqual((primera['nuevos'], primera['actualizados']), (5, 0))
+        self.assertEqual((segunda['nuevos'], segunda['actualizados']), (0, 0))
+        self.assertEqual(MarcaIngesta.objects.get(fuente='MODIS_NRT').ultima_adquisicion.isoformat(),
+                         f'{_FirmsStubHandler.fecha}T14:25:00+00:00')
+        # Con marca de ayer basta pedir 2 días; sin marca se pide la ventana completa
+        self.assertEqual(updater.dias_pendientes(['MODIS_NRT', 'VIIRS_SNPP_NRT'], 7),
+                         {'MODIS_NRT': 2, 'VIIRS_SNPP_NRT': 7})
+
+    def test_fuente_fallida_no_afecta_a_las_demas(self):
+        df, resumen = self._updater(tiles=(2, 2)).obtener_datos_multifuente(
+            days=1, sources=['MODIS_NRT', 'FALLA']
+        )
+        self.assertEqual(resumen, {'MODIS_NRT': 5, 'FALLA': 'error'})
+        self.assertEqual(set(df['source']), {'MODIS_NRT'})
+
+    def test_trabajo_de_ingesta_fusiona_pedidos_y_reporta_progreso(self):
+        trabajo, fusionado = encolar_actualizacion(days=1, sources=['MODIS_NRT'])
+        mismo, fusionado_2 = encolar_actualizacion(days=3, sources=['FALLA'])
+
+        self.assertFalse(fusionado)
+        self.assertTrue(fusionado_2)
+        self.assertEqual(mismo.id, trabajo.id)
+        self.assertEqual(TrabajoIngesta.objects.count(), 1)
+        self.assertEqual(mismo.parametros, {'days': 3, 'sources': ['MODIS_NRT', 'FALLA']})
+
+        trabajo = ejecutar_trabajo(trabajo.id, updater=self._updater(tiles=(2, 2)))
+        self.assertEqual(trabajo.estado, 'completado')
+        self.assertEqual(trabajo.solicitudes, 2)
+        self.assertEqual(trabajo.filas_procesadas, 5)
+        self.assertEqual(trabajo.resultado['fuentes'], {'MODIS_NRT': 5, 'FALLA': 'error'})
+        # Un trabajo ya tomado no se vuelve a ejecutar
+        self.assertIsNone(ejecutar_trabajo(trabajo.id))
+
+        # El estado expone parámetros y resultado: solo para usuarios autenticados
+        url = f'/api/nasa/trabajos/{trabajo.id}/'
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create_user('operador'))
+        self.assertEqual(self.client.get(url).json()['trabajo']['estado'], 'completado')
+
+    def test_backfill_por_tramos_reanuda_desde_puntos_de_control(self):
+        desde, hasta = date(2024, 8, 1), date(2024, 8, 12)
+        self.assertEqual(tramos(desde, hasta, 5),
+                         [(date(2024, 8, 1), 5), (date(2024, 8, 6), 5), (date(2024, 8, 11), 2)])
+
+        _FirmsStubHandler.solicitudes = []
+        totales = ejecutar_backfill(desde, hasta, ['MODIS_NRT', 'FALLA'], dias_por_tramo=5,
+                                    workers=3, updater=self._updater())
+        self.assertEqual(len(_FirmsStubHandler.solicitudes), 6)
+        self.assertEqual((totales['completados'], totales['errores']), (3, 3))
+        # Cada tramo trae las 5 detecciones fechadas en su primer día
+        self.assertEqual(totales['nuevos'], 15)
+        self.assertEqual(IncendioForestal.objects.count(), 15)
+        self.assertEqual(EventoIncendio.objects.count(), 15)
+        self.assertEqual(sum(ResumenDiario.objects.values_list('total', flat=True)), 15)
+
+        # Segunda corrida: solo se reintentan los tramos fallidos
+        _FirmsStubHandler.solicitudes = []
+        totales = ejecutar_backfill(desde, hasta, ['MODIS_NRT', 'FALLA'], dias_por_tramo=5,
+                                    updater=self._updater())
+        self.assertEqual(len(_FirmsStubHandler.solicitudes), 3)
+        self.assertTrue(all('/FALLA/' in ruta for ruta in _FirmsStubHandler.solicitudes))
+        self.assertEqual(TramoBackfill.objects.get(fuente='FALLA', fecha_inicio=desde).intentos, 2)
+        self.assertEqual(TramoBackfill.objects.filter(estado='completado').count(), 3)
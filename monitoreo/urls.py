@@ -10,6 +10,12 @@ urlpatterns = [
     path('dashboard/', views.dashboard, name='dashboard'),
     path('api/incendios/', views.api_incendios, name='api_incendios'),
     path('api/incendios/json/', views.api_incendios_json, name='api_incendios_json'),
+    path('api/incendios/geojson/', views.api_incendios_geojson, name='api_incendios_geojson'),
+    path('api/incendios/clusters/', views.api_clusters, name='api_clusters'),
+    path('tiles/<int:z>/<int:x>/<int:y>.pbf', views.tesela_mvt, name='tesela_mvt'),
+    path('tiles/densidad/<str:ventana>/<int:z>/<int:x>/<int:y>.png', views.tesela_densidad,
+         name='tesela_densidad'),
     path('api/nasa/actualizar/', views.actualizar_datos_nasa, name='actualizar_nasa'),
     path('api/nasa/estado/', views.estado_actualizacion, name='estado_nasa'),
+    path('api/nasa/trabajos/<int:trabajo_id>/', views.estado_trabajo, name='estado_trabajo'),
 ]
\ No newline at end of file
@@ -0,0 +1,301 @@
+# monitoreo/utils/archivo_historico.py
+import logging
+import os
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from django.conf import settings
+from django.utils import timezone
+
+from monitoreo.utils import teselas
+from monitoreo.utils.conexion_sqlite import escritura
+
+logger = logging.getLogger(__name__)
+
+# Parámetros por DELETE ... WHERE id IN (...), bajo el límite de SQLite (999)
+IDS_POR_CONSULTA = 500
+
+# (columna del archivo, campo ORM) de cada detección archivada
+CAMPOS = [
+    ('id', 'id'),
+    ('nombre', 'nombre'),
+    ('fecha_deteccion', 'fecha_deteccion'),
+    ('latitud', 'latitud'),
+    ('longitud', 'longitud'),
+    ('clave_espacial', 'clave_espacial'),
+    ('departamento_id', 'departamento_id'),
+    ('departamento', 'departamento__nombre'),
+    ('municipio', 'municipio'),
+    ('intensidad', 'intensidad'),
+    ('severidad', 'severidad'),
+    ('area_afectada_ha', 'area_afectada_ha'),
+    ('confianza_deteccion', 'confianza_deteccion'),
+    ('frp', 'frp'),
+    ('evento_id', 'evento_id'),
+    ('satelite', 'satelite'),
+    ('brillo_temperatura', 'brillo_temperatura'),
+    ('estado', 'estado'),
+    ('fuente_datos', 'fuente_datos'),
+]
+
+# Prefijo de archivos aún no confirmados: pyarrow.dataset ignora los que empiezan con '_'
+PENDIENTE = '_pendiente-'
+
+
+def configuracion():
+    """settings.ARCHIVO_HISTORICO con valores por defecto"""
+    return {
+        'directorio': Path(settings.BASE_DIR) / 'data' / 'historico',
+        'retencion_dias': 90,
+        'filas_por_lote': 50000,
+        **getattr(settings, 'ARCHIVO_HISTORICO', {}),
+    }
+
+
+def _esquema():
+    import pyarrow as pa
+
+    tipos = {
+        'id': pa.int64(), 'clave_espacial': pa.int64(), 'departamento_id': pa.int64(),
+        'evento_id': pa.int64(), 'fecha_deteccion': pa.timestamp('us', tz='UTC'),
+        'latitud': pa.float64(), 'longitud': pa.float64(), 'intensidad': pa.float64(),
+        'area_afectada_ha': pa.float64(), 'confianza_deteccion': pa.float64(),
+        'frp': pa.float64(), 'brillo_temperatura': pa.float64(),
+    }
+    campos = [pa.field(columna, tipos.get(columna, pa.string())) for columna, _ in CAMPOS]
+    # Día local (America/La_Paz), igual que en el resumen diario
+    return pa.schema(campos + [pa.field('dia', pa.date32())])
+
+
+def _particionado():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([('anio', pa.int16()), ('mes', pa.int8())]), flavor='hive')
+
+
+def _tabla(filas):
+    import pyarrow as pa
+
+    esquema = _esquema()
+    columnas = list(zip(*filas))
+    dias = [timezone.localdate(f) for f in columnas[2]]
+    arrays = [pa.array(valores, type=esquema.field(i).type) for i, valores in enumerate(columnas)]
+    arrays += [
+        pa.array(dias, type=pa.date32()),
+        pa.array([d.year for d in dias], type=pa.int16()),
+        pa.array([d.month for d in dias], type=pa.int8()),
+    ]
+    return pa.Table.from_arrays(arrays, names=esquema.names + ['anio', 'mes'])
+
+
+def _marca():
+    """Nombre único por corrida: dos corridas en el mismo segundo no se pisan"""
+    return f"{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def _recuperar_pendientes(directorio):
+    """
+    Resuelve lotes de una corrida interrumpida: si sus detecciones siguen en
+    la base el archivo sobra; si ya se borraron, el archivo es la única copia
+    y se confirma.
+    """
+    import pyarrow.parquet as pq
+    from monitoreo.models import IncendioForestal
+
+    for ruta in Path(directorio).rglob(f'{PENDIENTE}*.parquet'):
+        ids = pq.read_table(ruta, columns=['id'])['id'].to_numpy()
+        if IncendioForestal.objects.filter(id__in=ids[:1].tolist()).exists():
+            ruta.unlink()
+        else:
+            os.replace(ruta, ruta.with_name(ruta.name[len(PENDIENTE):]))
+            logger.warning(f"♻️ Lote pendiente confirmado: {ruta.name}")
+
+
+def archivar(antes_de=None, directorio=None, filas_por_lote=None, simular=False):
+    """
+    Mueve a Parquet particionado por mes (anio=AAAA/mes=M) las detecciones
+    extintas anteriores a `antes_de` (por defecto, el horizonte de retención)
+    y las borra de SQLite. El resumen diario y los eventos no se tocan.
+
+    Cada lote se escribe primero con prefijo '_pendiente-', luego se borran
+    sus filas y recién entonces se renombra el archivo, así una corrida
+    interrumpida nunca duplica ni pierde detecciones.
+    """
+    import pyarrow.dataset as ds
+    from monitoreo.models import IncendioForestal
+
+    config = configuracion()
+    directorio = Path(directorio or config['directorio'])
+    filas_por_lote = filas_por_lote or config['filas_por_lote']
+    antes_de = antes_de or timezone.now() - timedelta(days=config['retencion_dias'])
+
+    # Solo detecciones cerradas: un evento activo se recalcula desde sus detecciones
+    candidatas = IncendioForestal.objects.filter(fecha_deteccion__lt=antes_de, estado='extinto')
+    if simular:
+        return {'archivadas': candidatas.count(), 'archivos': 0, 'antes_de': antes_de}
+
+    directorio.mkdir(parents=True, exist_ok=True)
+    _recuperar_pendientes(directorio)
+
+    inicio = time.perf_counter()
+    marca = _marca()
+    archivadas = 0
+    archivos = 0
+    ultimo_id = 0
+    lote = 0
+    while True:
+        escritos = []
+        # Lectura, archivo pendiente y borrado en la misma transacción de
+        # escritura: actualizar_estados no puede cambiar el estado de una fila
+        # entre la lectura y el borrado. Se borran exactamente los ids escritos.
+        with escritura():
+            filas = list(candidatas.filter(id__gt=ultimo_id).order_by('id').values_list(
+                *(campo for _, campo in CAMPOS)
+            )[:filas_por_lote])
+            if not filas:
+                break
+            ultimo_id = filas[-1][0]
+
+            ds.write_dataset(
+                _tabla(filas), directorio, format='parquet', partitioning=_particionado(),
+                basename_template=f'{PENDIENTE}{marca}-{lote}-{{i}}.parquet',
+                existing_data_behavior='overwrite_or_ignore',
+                file_visitor=lambda archivo: escritos.append(archivo.path),
+            )
+            ids = [f[0] for f in filas]
+            borradas = sum(
+                IncendioForestal.objects.filter(id__in=ids[i:i + IDS_POR_CONSULTA]).delete()[0]
+                for i in range(0, len(ids), IDS_POR_CONSULTA)
+            )
+        for ruta in map(Path, escritos):
+            os.replace(ruta, ruta.with_name(ruta.name[len(PENDIENTE):]))
+        teselas.invalidar([f[3] for f in filas], [f[4] for f in filas])
+
+        archivadas += len(filas)
+        archivos += len(escritos)
+        lote += 1
+        logger.info(f"🗄️ Lote {lote}: {len(filas)} detecciones archivadas ({borradas} filas borradas)")
+
+    logger.info(
+        f"🗄️ {archivadas} detecciones anteriores a {antes_de:%Y-%m-%d} archivadas en "
+        f"{archivos} archivo(s) ({time.perf_counter() - inicio:.1f}s)"
+    )
+    return {'archivadas': archivadas, 'archivos': archivos, 'antes_de': antes_de}
+
+
+def compactar(directorio=None, filas_por_grupo=128 * 1024):
+    """
+    Reescribe cada partición con varios archivos como uno solo, ordenado por
+    fecha de detección (grupos de filas con rangos de fecha estrechos, que el
+    lector descarta por estadísticas) y sin ids repetidos.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directorio = Path(directorio or configuracion()['directorio'])
+    if not directorio.is_dir():
+        return 0
+
+    compactadas = 0
+    marca = _marca()
+    for particion in sorted({p.parent for p in directorio.glob('anio=*/mes=*/*.parquet')}):
+        archivos = sorted(p for p in particion.glob('*.parquet') if not p.name.startswith('_'))
+        if len(archivos) < 2:
+            continue
+        tabla = pa.concat_tables([pq.read_table(p) for p in archivos])
+        _, unicos = np.unique(tabla['id'].to_numpy(), return_index=True)
+        tabla = tabla.take(unicos).sort_by('fecha_deteccion')
+
+        temporal = particion / f'_compactando-{marca}.parquet'
+        pq.write_table(tabla, temporal, row_group_size=filas_por_grupo)
+        # Si se corta acá quedan filas repetidas, que la próxima compactación elimina
+        os.replace(temporal, particion / f'compactado-{marca}.parquet')
+        for p in archivos:
+            p.unlink()
+        compactadas += 1
+        logger.info(f"🧱 {particion.relative_to(directorio)}: {len(archivos)} archivos → 1 "
+                    f"({tabla.num_rows} filas)")
+    return compactadas
+
+
+def _dataset(directorio):
+    import pyarrow.dataset as ds
+    import pyarrow.fs as fs
+
+    return ds.dataset(str(directorio), format='parquet', partitioning=_particionado(),
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def _filtro_mes(fecha, operador):
+    """Condición sobre las columnas de partición: descarta meses enteros sin leerlos"""
+    import pyarrow.dataset as ds
+
+    anio, mes = ds.field('anio'), ds.field('mes')
+    if operador == '>=':
+        return (anio > fecha.year) | ((anio == fecha.year) & (mes >= fecha.month))
+    return (anio < fecha.year) | ((anio == fecha.year) & (mes <= fecha.month))
+
+
+def leer_historico(columnas=None, desde=None, hasta=None, bbox=None, directorio=None):
+    """
+    Lee detecciones archivadas como DataFrame. Solo se leen las columnas
+    pedidas, las particiones de los meses del rango [desde, hasta) y los
+    grupos de filas cuyas estadísticas pueden cumplir el filtro; los archivos
+    se abren con memory-map. bbox = (min_lat, min_lon, max_lat, max_lon).
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    directorio = Path(directorio or configuracion()['directorio'])
+    columnas = list(columnas) if columnas else _esquema().names
+    if not directorio.is_dir():
+        return pd.DataFrame(columns=columnas)
+
+    condiciones = []
+    tipo_fecha = pa.timestamp('us', tz='UTC')
+    if desde is not None:
+        condiciones += [_filtro_mes(timezone.localdate(desde), '>='),
+                        ds.field('fecha_deteccion') >= pa.scalar(desde, type=tipo_fecha)]
+    if hasta is not None:
+        condiciones += [_filtro_mes(timezone.localdate(hasta), '<='),
+                        ds.field('fecha_deteccion') < pa.scalar(hasta, type=tipo_fecha)]
+    if bbox is not None:
+        min_lat, min_lon, max_lat, max_lon = bbox
+        condiciones += [
+            (ds.field('latitud') >= min_lat) & (ds.field('latitud') <= max_lat),
+            (ds.field('longitud') >= min_lon) & (ds.field('longitud') <= max_lon),
+        ]
+    filtro = None
+    for condicion in condiciones:
+        filtro = condicion if filtro is None else filtro & condicion
+
+    return _dataset(directorio).to_table(columns=columnas, filter=filtro).to_pandas()
+
+
+def agregados_historicos(directorio=None):
+    """
+    Agregados por (día local, departamento, severidad, satélite) de lo
+    archivado, con las mismas claves que resumen.agregados_desde_detecciones.
+    """
+    directorio = Path(directorio or configuracion()['directorio'])
+    if not directorio.is_dir() or not any(directorio.glob('anio=*/mes=*/*.parquet')):
+        return []
+
+    tabla = _dataset(directorio).to_table(
+        columns=['dia', 'departamento_id', 'severidad', 'satelite', 'area_afectada_ha', 'intensidad']
+    )
+    agrupado = tabla.group_by(['dia', 'departamento_id', 'severidad', 'satelite']).aggregate([
+        ([], 'count_all'), ('area_afectada_ha', 'sum'), ('intensidad', 'sum'),
+    ])
+    return [
+        {'dia': fila['dia'], 'departamento_id': fila['departamento_id'], 'severidad': fila['severidad'],
+         'satelite': fila['satelite'], 'n': fila['count_all'], 'area': fila['area_afectada_ha_sum'],
+         'intensidad': fila['intensidad_sum']}
+        for fila in agrupado.to_pylist()
+    ]
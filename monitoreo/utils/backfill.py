@@ -0,0 +1,136 @@
+# monitoreo/utils/backfill.py
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
+from itertools import islice
+
+from monitoreo.utils.ciclo_vida import actualizar_estados
+from monitoreo.utils.clusters import actualizar_clusters
+from monitoreo.utils.densidad import actualizar_densidad
+from monitoreo.utils.eventos import actualizar_eventos
+
+logger = logging.getLogger(__name__)
+
+
+def tramos(desde, hasta, dias_por_tramo):
+    """[(inicio, días)] que cubren desde..hasta (inclusive) con tramos de a lo sumo dias_por_tramo"""
+    resultado = []
+    inicio = desde
+    while inicio <= hasta:
+        dias = min(dias_por_tramo, (hasta - inicio).days + 1)
+        resultado.append((inicio, dias))
+        inicio += timedelta(days=dias)
+    return resultado
+
+
+def preparar_tramos(desde, hasta, fuentes, dias_por_tramo, reintentar=True):
+    """
+    Crea los puntos de control que falten y devuelve, en orden cronológico,
+    los tramos por hacer. Los completados en una corrida anterior se saltan
+    (reanudar requiere el mismo dias_por_tramo); los fallidos se reintentan
+    si `reintentar`.
+    """
+    from monitoreo.models import TramoBackfill
+
+    rangos = tramos(desde, hasta, dias_por_tramo)
+    TramoBackfill.objects.bulk_create(
+        [TramoBackfill(fuente=fuente, fecha_inicio=inicio, dias=dias)
+         for inicio, dias in rangos for fuente in fuentes],
+        ignore_conflicts=True
+    )
+    estados = ['pendiente', 'error'] if reintentar else ['pendiente']
+    buscados = set(rangos)
+    return [
+        tramo for tramo in TramoBackfill.objects.filter(
+            fuente__in=fuentes, fecha_inicio__range=(desde, hasta), estado__in=estados
+        ).order_by('fecha_inicio', 'fuente')
+        if (tramo.fecha_inicio, tramo.dias) in buscados
+    ]
+
+
+def ejecutar_backfill(desde, hasta, fuentes, dias_por_tramo=5, workers=4, updater=None,
+                      reintentar=True, informar=None):
+    """
+    Carga el rango histórico desde..hasta (días UTC) de las fuentes FIRMS.
+
+    Los tramos se descargan en un pool de `workers` hilos con a lo sumo
+    `workers` descargas en vuelo, así la memoria no crece si la red va más
+    rápido que la base. Cada tramo se escribe en el hilo actual por la ruta
+    bulk y se marca completado en TramoBackfill; una corrida interrumpida
+    retoma desde los pendientes. Reprocesar un tramo es inofensivo: las
+    detecciones ya cargadas se emparejan como duplicados y se actualizan.
+
+    La agrupación en eventos y el ciclo de vida se hacen una sola vez al
+    final. `informar(tramo, totales)` se llama al terminar cada tramo.
+    """
+    from monitoreo.utils.nasa_firms import NASAFirmsUpdater
+
+    updater = updater or NASAFirmsUpdater()
+    pendientes = preparar_tramos(desde, hasta, fuentes, dias_por_tramo, reintentar)
+    totales = {'tramos': len(pendientes), 'completados': 0, 'errores': 0,
+               'filas': 0, 'nuevos': 0, 'actualizados': 0}
+    if not pendientes:
+        return totales
+
+    inicio = time.perf_counter()
+    agrupar = updater.agrupar_eventos
+    updater.agrupar_eventos = False
+
+    def descargar(tramo):
+        return updater.obtener_datos_nasa(days=tramo.dias, source=tramo.fuente,
+                                          fecha=tramo.fecha_inicio, estricto=True)
+
+    def registrar(tramo, futuro):
+        tramo.intentos += 1
+        try:
+            df = futuro.result()
+            nuevos, actualizados = (0, 0) if df.empty else updater.procesar_incendios(
+                df.assign(source=tramo.fuente), bulk=True
+            )
+        except Exception as e:
+            logger.error(f"❌ Tramo {tramo}: {e}")
+            tramo.estado = 'error'
+            tramo.error = str(e)
+            tramo.save(update_fields=['estado', 'error', 'intentos', 'fecha_actualizacion'])
+            totales['errores'] += 1
+            return
+        tramo.estado = 'completado'
+        tramo.error = ''
+        tramo.filas, tramo.nuevos, tramo.actualizados = len(df), nuevos, actualizados
+        tramo.save()
+        totales['completados'] += 1
+        totales['filas'] += len(df)
+        totales['nuevos'] += nuevos
+        totales['actualizados'] += actualizados
+
+    restantes = iter(pendientes)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='backfill')
+    try:
+        en_vuelo = {executor.submit(descargar, t): t for t in islice(restantes, workers)}
+        while en_vuelo:
+            listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                tramo = en_vuelo.pop(futuro)
+                registrar(tramo, futuro)
+                if informar:
+                    informar(tramo, totales)
+                for siguiente in islice(restantes, 1):
+                    en_vuelo[executor.submit(descargar, siguiente)] = siguiente
+    finally:
+        # Ante una interrupción no se esperan las descargas que aún no empezaron
+        executor.shutdown(wait=False, cancel_futures=True)
+        updater.agrupar_eventos = agrupar
+
+    if agrupar and totales['nuevos']:
+        actualizar_eventos(updater.celda_evento_km, updater.brecha_evento, updater.batch_size)
+    actualizar_estados()
+    actualizar_clusters()
+    actualizar_densidad()
+
+    totales['segundos'] = round(time.perf_counter() - inicio, 1)
+    logger.info(
+        f"🗓️ Backfill {desde}..{hasta}: {totales['completados']}/{totales['tramos']} tramos, "
+        f"{totales['filas']} filas, {totales['nuevos']} nuevas ({totales['segundos']}s)"
+    )
+    return totales
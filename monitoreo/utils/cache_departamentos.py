@@ -0,0 +1,74 @@
+# monitoreo/utils/cache_departamentos.py
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_departamentos = None
+_version = None
+
+
+def _version_actual():
+    """Huella barata de la tabla: (cantidad, id máximo)"""
+    from django.db.models import Count, Max
+    from monitoreo.models import Departamento
+
+    datos = Departamento.objects.aggregate(total=Count('id'), ultimo=Max('id'))
+    return datos['total'], datos['ultimo']
+
+
+def _cargar():
+    from monitoreo.models import Departamento
+
+    departamentos = {}
+    for depto in Departamento.objects.order_by('id'):
+        # Con nombres repetidos se conserva el primero
+        departamentos.setdefault(depto.nombre, depto)
+    return departamentos
+
+
+def obtener_departamentos():
+    """Devuelve el diccionario {nombre: Departamento}, cargándolo una sola vez por proceso"""
+    global _departamentos, _version
+
+    with _lock:
+        if _departamentos is None:
+            _version = _version_actual()
+            _departamentos = _cargar()
+            logger.debug(f"Cache de departamentos cargado ({len(_departamentos)})")
+        return _departamentos
+
+
+def obtener_departamento(nombre):
+    """Resuelve un departamento por nombre, creándolo si no existe"""
+    if not nombre:
+        return None
+
+    depto = obtener_departamentos().get(nombre)
+    if depto is None:
+        from monitoreo.models import Departamento
+
+        depto, created = Departamento.objects.get_or_create(
+            nombre=nombre,
+            defaults={'codigo': nombre[:2].upper()}
+        )
+        with _lock:
+            if _departamentos is not None:
+                _departamentos.setdefault(nombre, depto)
+    return depto
+
+
+def refrescar_si_cambio():
+    """Recarga el cache si la tabla cambió (por ejemplo, desde otro proceso)"""
+    if _departamentos is not None and _version_actual() != _version:
+        invalidar_cache()
+
+
+def invalidar_cache(**kwargs):
+    """Descarta el cache; se usa también como receptor de señales"""
+    global _departamentos, _version
+
+    with _lock:
+        _departamentos = None
+        _version = None
@@ -0,0 +1,83 @@
+# monitoreo/utils/ciclo_vida.py
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from monitoreo.utils import teselas
+from monitoreo.utils.conexion_sqlite import escritura
+
+logger = logging.getLogger(__name__)
+
+ESTADOS = ('activo', 'controlado', 'extinto')
+
+
+def ventanas():
+    """(controlado, extinto) como timedelta, según settings.CICLO_VIDA_INCENDIOS"""
+    from django.conf import settings
+
+    config = getattr(settings, 'CICLO_VIDA_INCENDIOS', {})
+    return (timedelta(hours=config.get('controlado_horas', 24)),
+            timedelta(hours=config.get('extinto_horas', 72)))
+
+
+def _actualizar(queryset, estado, ahora, coordenadas=None):
+    """UPDATE al estado destino; con `coordenadas` agrega las (lat, lon) de las filas que cambian"""
+    queryset = queryset.exclude(estado=estado)
+    if coordenadas is not None:
+        coordenadas.extend(queryset.values_list('latitud', 'longitud'))
+    return queryset.update(estado=estado, fecha_ultima_actualizacion=ahora)
+
+
+def _transiciones(queryset, campo, ahora, controlado, extinto, coordenadas=None):
+    """
+    Un UPDATE por estado destino: cada fila queda en el estado que le
+    corresponde según la antigüedad de `campo` (se reactiva si volvió a
+    detectarse). Devuelve {estado: filas cambiadas}.
+    """
+    filtros = {
+        'activo': {f'{campo}__gte': ahora - controlado},
+        'controlado': {f'{campo}__lt': ahora - controlado, f'{campo}__gte': ahora - extinto},
+        'extinto': {f'{campo}__lt': ahora - extinto},
+    }
+    return {
+        estado: _actualizar(queryset.filter(**filtros[estado]), estado, ahora, coordenadas)
+        for estado in ESTADOS
+    }
+
+
+def actualizar_estados(ahora=None):
+    """
+    Avanza el ciclo de vida activo → controlado → extinto con UPDATE por lotes.
+
+    Un evento cambia según su última detección; sus detecciones heredan el
+    estado del evento, y las detecciones sin evento usan su propia fecha.
+    Devuelve {'eventos': {...}, 'incendios': {...}} con las filas cambiadas.
+    """
+    from monitoreo.models import EventoIncendio, IncendioForestal
+
+    ahora = ahora or timezone.now()
+    controlado, extinto = ventanas()
+
+    # Posiciones de las detecciones que cambian, para invalidar sus teselas
+    coordenadas = []
+    with escritura():
+        eventos = _transiciones(EventoIncendio.objects.all(), 'ultima_deteccion',
+                                ahora, controlado, extinto)
+        incendios = {
+            estado: _actualizar(IncendioForestal.objects.filter(evento__estado=estado), estado, ahora,
+                                coordenadas)
+            for estado in ESTADOS
+        }
+        sueltos = _transiciones(IncendioForestal.objects.filter(evento__isnull=True), 'fecha_deteccion',
+                                ahora, controlado, extinto, coordenadas)
+        for estado, cambiadas in sueltos.items():
+            incendios[estado] += cambiadas
+    if coordenadas:
+        teselas.invalidar(*zip(*coordenadas))
+
+    logger.info(
+        "🔁 Estados: " + ', '.join(f"{n} → {estado}" for estado, n in incendios.items())
+        + f" (eventos: {', '.join(f'{n} → {estado}' for estado, n in eventos.items())})"
+    )
+    return {'eventos': eventos, 'incendios': incendios}
@@ -0,0 +1,139 @@
+# monitoreo/utils/clave_espacial.py
+import math
+
+import numpy as np
+
+# Bits por eje: 2^20 celdas en 360° de longitud ≈ 38 m en el ecuador
+BITS = 20
+_MAXIMO = (1 << BITS) - 1
+KM_POR_GRADO = 111.32
+
+
+def _separar(v):
+    """Intercala ceros entre los bits de v (v < 2^32)"""
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def _celdas(lat, lon):
+    x = np.floor((np.asarray(lon, dtype=float) + 180.0) / 360.0 * (1 << BITS))
+    y = np.floor((np.asarray(lat, dtype=float) + 90.0) / 180.0 * (1 << BITS))
+    return (np.clip(x, 0, _MAXIMO).astype(np.uint64),
+            np.clip(y, 0, _MAXIMO).astype(np.uint64))
+
+
+def _morton(x, y):
+    return (_separar(np.asarray(x, dtype=np.uint64)) |
+            (_separar(np.asarray(y, dtype=np.uint64)) << np.uint64(1))).astype(np.int64)
+
+
+def clave_espacial(lat, lon):
+    """
+    Clave Z-order (Morton) de 40 bits para lat/lon: puntos cercanos suelen
+    tener claves cercanas, así que un bbox se resuelve con pocos rangos sobre
+    un índice B-tree normal. Acepta escalares o arrays.
+    """
+    claves = _morton(*_celdas(lat, lon))
+    return int(claves) if np.ndim(claves) == 0 else claves
+
+
+def rangos_bbox(min_lat, min_lon, max_lat, max_lon, max_rangos=24):
+    """
+    Cubre el bbox con nodos del quadtree Z-order y devuelve los rangos de
+    claves [desde, hasta] (inclusive), fusionando los contiguos. Se refina
+    nivel a nivel mientras el número de rangos no supere max_rangos; los
+    nodos que quedan a medias agregan falsos positivos que se descartan con
+    el filtro exacto por latitud/longitud.
+    """
+    (x0, x1), (y0, y1) = zip(*(map(int, c) for c in (
+        _celdas(min_lat, min_lon), _celdas(max_lat, max_lon))))
+
+    def clasificar(cx, cy, nivel):
+        desde_x, hasta_x = cx << nivel, ((cx + 1) << nivel) - 1
+        desde_y, hasta_y = cy << nivel, ((cy + 1) << nivel) - 1
+        if hasta_x < x0 or desde_x > x1 or hasta_y < y0 or desde_y > y1:
+            return None
+        return x0 <= desde_x and hasta_x <= x1 and y0 <= desde_y and hasta_y <= y1
+
+    def rango(cx, cy, nivel):
+        desde = int(_morton(cx << nivel, cy << nivel))
+        return desde, desde + (1 << (2 * nivel)) - 1
+
+    # Nivel inicial: el más fino en que el bbox abarca a lo sumo 2x2 nodos
+    nivel = 0
+    while (x1 >> nivel) - (x0 >> nivel) > 1 or (y1 >> nivel) - (y0 >> nivel) > 1:
+        nivel += 1
+    completos = []
+    parciales = []
+    for cx in range(x0 >> nivel, (x1 >> nivel) + 1):
+        for cy in range(y0 >> nivel, (y1 >> nivel) + 1):
+            (completos if clasificar(cx, cy, nivel) else parciales).append((cx, cy, nivel))
+
+    while parciales and nivel > 0:
+        nivel -= 1
+        hijos_completos, hijos_parciales = [], []
+        for cx, cy, _ in parciales:
+            for hx in (2 * cx, 2 * cx + 1):
+                for hy in (2 * cy, 2 * cy + 1):
+                    tipo = clasificar(hx, hy, nivel)
+                    if tipo is not None:
+                        (hijos_completos if tipo else hijos_parciales).append((hx, hy, nivel))
+        candidatos = _fusionar([rango(*n) for n in completos + hijos_completos + hijos_parciales])
+        if len(candidatos) > max_rangos:
+            break
+        completos += hijos_completos
+        parciales = hijos_parciales
+
+    return _fusionar([rango(*n) for n in completos + parciales])
+
+
+def _fusionar(rangos):
+    fusionados = []
+    for desde, hasta in sorted(rangos):
+        if fusionados and desde <= fusionados[-1][1] + 1:
+            fusionados[-1][1] = max(fusionados[-1][1], hasta)
+        else:
+            fusionados.append([desde, hasta])
+    return [tuple(r) for r in fusionados]
+
+
+def bbox_radio(lat, lon, radio_km):
+    """Bbox (min_lat, min_lon, max_lat, max_lon) que contiene el círculo"""
+    d_lat = radio_km / KM_POR_GRADO
+    d_lon = radio_km / (KM_POR_GRADO * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon
+
+
+def filtrar_bbox(queryset, min_lat, min_lon, max_lat, max_lon, max_rangos=24):
+    """Filtra por bbox usando rangos de clave_espacial (índice) más el filtro exacto"""
+    from django.db.models import Q
+
+    condicion = Q()
+    for desde, hasta in rangos_bbox(min_lat, min_lon, max_lat, max_lon, max_rangos):
+        condicion |= Q(clave_espacial__range=(desde, hasta))
+    return queryset.filter(
+        condicion,
+        latitud__range=(min_lat, max_lat),
+        longitud__range=(min_lon, max_lon),
+    )
+
+
+def filtrar_radio(queryset, lat, lon, radio_km, max_rangos=24):
+    """
+    Detecciones a menos de radio_km de (lat, lon): prefiltro por rangos de
+    clave y distancia de círculo máximo anotada como `distancia_km`.
+    """
+    from django.db.models import F, FloatField, Value
+    from django.db.models.functions import ACos, Cos, Greatest, Least, Radians, Sin
+
+    lat0 = Radians(Value(lat, output_field=FloatField()))
+    coseno = (Sin(lat0) * Sin(Radians(F('latitud'))) +
+              Cos(lat0) * Cos(Radians(F('latitud'))) *
+              Cos(Radians(F('longitud')) - Radians(Value(lon, output_field=FloatField()))))
+    return filtrar_bbox(queryset, *bbox_radio(lat, lon, radio_km), max_rangos=max_rangos).annotate(
+        distancia_km=ACos(Least(Greatest(coseno, Value(-1.0)), Value(1.0))) * 6371.0
+    ).filter(distancia_km__lte=radio_km)
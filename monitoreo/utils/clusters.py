@@ -0,0 +1,265 @@
+# monitoreo/utils/clusters.py
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+SEVERIDADES = ['bajo', 'medio', 'alto', 'critico']
+# Margen al releer cambios: una escritura con fecha un poco anterior a la
+# última construcción igual se incluye (reaplicar un cambio es inofensivo)
+SOLAPE = timedelta(minutes=5)
+_CAMPOS = ('clave', 'cy', 'lat', 'lon', 'cantidad', 'severidad', 'id')
+
+
+def configuracion():
+    """settings.CLUSTERS_INCENDIOS con valores por defecto"""
+    return {
+        'archivo': Path(settings.BASE_DIR) / 'cache' / 'clusters.npz',
+        'zoom_maximo': 16,
+        'celda_px': 64,
+        'estados': ['activo', 'controlado'],
+        'reconstruir_horas': 24,
+        **getattr(settings, 'CLUSTERS_INCENDIOS', {}),
+    }
+
+
+def _mercator(latitudes, longitudes):
+    """Web Mercator normalizado a [0, 1) (x hacia el este, y hacia el sur)"""
+    lat = np.radians(np.clip(np.asarray(latitudes, dtype=float), -85.0511287798, 85.0511287798))
+    return ((np.asarray(longitudes, dtype=float) + 180) / 360,
+            (1 - np.arcsinh(np.tan(lat)) / np.pi) / 2)
+
+
+def _clave(cx, cy):
+    """Orden (columna, fila): una franja de columnas es un tramo contiguo"""
+    return cx << 32 | cy
+
+
+class IndiceClusters:
+    """
+    Jerarquía de clusters por zoom sobre una grilla de celdas de `celda_px`
+    píxeles (potencia de dos). La celda de un zoom contiene exactamente cuatro
+    del siguiente, así cada nivel se arma agregando el nivel inferior y el
+    costo total es proporcional a la cantidad de puntos. Sobre zoom_maximo se
+    devuelven los puntos sueltos.
+
+    Cada nivel guarda, ordenado por (columna, fila) de celda, el centroide,
+    la cantidad, la severidad máxima y el id cuando la celda tiene un solo punto.
+
+    `generado` es la marca de la última actualización (incremental o no) y
+    `construido` la de la última construcción completa desde la base.
+    """
+
+    def __init__(self, ids, latitudes, longitudes, severidades, generado, zoom_maximo=16, celda_px=64,
+                 construido=None):
+        if celda_px & (celda_px - 1) or not 1 <= celda_px <= 256:
+            raise ValueError("celda_px debe ser una potencia de dos entre 1 y 256")
+        self.generado = generado
+        self.construido = construido or generado
+        self.zoom_maximo = zoom_maximo
+        self.celda_px = celda_px
+        self.bits = int(math.log2(256 // celda_px))
+        self.puntos = {
+            'id': np.asarray(ids, dtype=np.int64),
+            'lat': np.asarray(latitudes, dtype=float),
+            'lon': np.asarray(longitudes, dtype=float),
+            'severidad': np.asarray(severidades, dtype=np.int8),
+        }
+        self.niveles = self._construir()
+
+    @staticmethod
+    def _columnas(filas):
+        """(ids, latitudes, longitudes, códigos de severidad) de filas (id, latitud, longitud, severidad)"""
+        filas = list(filas)
+        ids, latitudes, longitudes, severidades = zip(*filas) if filas else ([], [], [], [])
+        codigos = {s: i for i, s in enumerate(SEVERIDADES)}
+        return (np.asarray(ids, dtype=np.int64), np.asarray(latitudes, dtype=float),
+                np.asarray(longitudes, dtype=float),
+                np.asarray([codigos.get(s, 0) for s in severidades], dtype=np.int8))
+
+    @classmethod
+    def desde_filas(cls, filas, generado, **opciones):
+        """filas: (id, latitud, longitud, severidad) de las detecciones a agrupar"""
+        return cls(*cls._columnas(filas), generado, **opciones)
+
+    def __len__(self):
+        return len(self.puntos['id'])
+
+    def _celdas(self, zoom, mx, my):
+        escala = 2 ** (zoom + self.bits)
+        return (np.floor(mx * escala).astype(np.int64), np.floor(my * escala).astype(np.int64))
+
+    def _construir(self):
+        puntos = self.puntos
+        mx, my = _mercator(puntos['lat'], puntos['lon'])
+        cx, cy = self._celdas(self.zoom_maximo + 1, mx, my)
+        claves = _clave(cx, cy)
+        orden = np.argsort(claves, kind='stable')
+        nivel = {
+            'clave': claves[orden], 'cx': cx[orden], 'cy': cy[orden], 'mx': mx[orden], 'my': my[orden],
+            'lat': puntos['lat'][orden], 'lon': puntos['lon'][orden],
+            'cantidad': np.ones(len(orden), dtype=np.int64),
+            'severidad': puntos['severidad'][orden], 'id': puntos['id'][orden],
+        }
+        niveles = {self.zoom_maximo + 1: nivel}
+        for zoom in range(self.zoom_maximo, -1, -1):
+            nivel = self._agregar(nivel)
+            niveles[zoom] = nivel
+        return niveles
+
+    @staticmethod
+    def _agregar(inferior):
+        """Nivel superior: cada celda junta las cuatro celdas hijas del nivel inferior"""
+        claves, inverso = np.unique(_clave(inferior['cx'] >> 1, inferior['cy'] >> 1), return_inverse=True)
+        cantidad = np.bincount(inverso, weights=inferior['cantidad']).astype(np.int64)
+        mx = np.bincount(inverso, weights=inferior['mx'] * inferior['cantidad']) / np.maximum(cantidad, 1)
+        my = np.bincount(inverso, weights=inferior['my'] * inferior['cantidad']) / np.maximum(cantidad, 1)
+        severidad = np.zeros(len(claves), dtype=np.int8)
+        np.maximum.at(severidad, inverso, inferior['severidad'])
+        ids = np.full(len(claves), -1, dtype=np.int64)
+        np.maximum.at(ids, inverso, inferior['id'])
+        ids[cantidad > 1] = -1
+        return {
+            'clave': claves, 'cx': claves >> 32, 'cy': claves & 0xFFFFFFFF, 'mx': mx, 'my': my,
+            'lat': np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * my)))), 'lon': mx * 360 - 180,
+            'cantidad': cantidad, 'severidad': severidad, 'id': ids,
+        }
+
+    def actualizar(self, filas, generado, estados):
+        """
+        Índice nuevo aplicando los cambios: filas (id, latitud, longitud,
+        severidad, estado) de detecciones modificadas desde la última
+        construcción. Las que ya no están en `estados` salen del índice.
+        """
+        filas = list(filas)
+        if not filas:
+            self.generado = generado
+            return self
+        cambiados = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+        quedan = ~np.isin(self.puntos['id'], cambiados)
+        nuevos = self._columnas(f[:4] for f in filas if f[4] in estados)
+        return IndiceClusters(
+            *(np.concatenate([self.puntos[c][quedan], columna])
+              for c, columna in zip(('id', 'lat', 'lon', 'severidad'), nuevos)),
+            generado, zoom_maximo=self.zoom_maximo, celda_px=self.celda_px, construido=self.construido,
+        )
+
+    def consultar(self, sur, oeste, norte, este, zoom):
+        """
+        Clusters del zoom cuyas celdas tocan el bbox. Solo se recorre la franja
+        de columnas del bbox (búsqueda binaria), no el nivel completo.
+        """
+        zoom = max(0, min(int(zoom), self.zoom_maximo + 1))
+        nivel = self.niveles[zoom]
+        (x0, x1), (y0, y1) = self._celdas(zoom, *_mercator([norte, sur], [oeste, este]))
+        seleccion = slice(np.searchsorted(nivel['clave'], _clave(x0, 0), side='left'),
+                          np.searchsorted(nivel['clave'], _clave(x1, 0xFFFFFFFF), side='right'))
+        dentro = (nivel['cy'][seleccion] >= y0) & (nivel['cy'][seleccion] <= y1)
+        return {c: nivel[c][seleccion][dentro] for c in ('lat', 'lon', 'cantidad', 'severidad', 'id')}
+
+    def guardar(self, archivo):
+        """npz con los puntos y todos los niveles (escritura atómica)"""
+        archivo = Path(archivo)
+        archivo.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {f'puntos_{c}': v for c, v in self.puntos.items()}
+        for zoom, nivel in self.niveles.items():
+            arrays.update({f'{zoom}_{c}': nivel[c] for c in _CAMPOS})
+        temporal = archivo.with_name(f'_{archivo.stem}-{uuid.uuid4().hex[:8]}.npz')
+        np.savez(temporal, generado=self.generado.timestamp(), construido=self.construido.timestamp(),
+                 zoom_maximo=self.zoom_maximo, celda_px=self.celda_px, **arrays)
+        os.replace(temporal, archivo)
+
+    @classmethod
+    def cargar(cls, archivo):
+        with np.load(archivo) as datos:
+            indice = cls.__new__(cls)
+            indice.generado = datetime.fromtimestamp(float(datos['generado']), tz=dt_timezone.utc)
+            # Índices guardados antes de existir `construido`: se toma `generado`
+            construido = datos['construido'] if 'construido' in datos.files else datos['generado']
+            indice.construido = datetime.fromtimestamp(float(construido), tz=dt_timezone.utc)
+            indice.zoom_maximo = int(datos['zoom_maximo'])
+            indice.celda_px = int(datos['celda_px'])
+            indice.bits = int(math.log2(256 // indice.celda_px))
+            indice.puntos = {c: datos[f'puntos_{c}'] for c in ('id', 'lat', 'lon', 'severidad')}
+            indice.niveles = {
+                zoom: {c: datos[f'{zoom}_{c}'] for c in _CAMPOS}
+                for zoom in range(indice.zoom_maximo + 2)
+            }
+        return indice
+
+
+def actualizar_clusters(completo=False):
+    """
+    Reconstruye el índice de clusters después de una ingesta y lo guarda en
+    disco. Solo relee las detecciones modificadas desde la construcción
+    anterior (fecha_ultima_actualizacion); se reconstruye desde cero si no
+    hay índice, si cambió la configuración, si pasaron `reconstruir_horas`
+    desde la última construcción completa (para descartar borrados) o si
+    `completo`.
+    """
+    from monitoreo.models import IncendioForestal
+
+    config = configuracion()
+    archivo = Path(config['archivo'])
+    opciones = {'zoom_maximo': config['zoom_maximo'], 'celda_px': config['celda_px']}
+    inicio = time.perf_counter()
+    ahora = timezone.now()
+
+    anterior = None
+    if not completo and archivo.exists():
+        anterior = IndiceClusters.cargar(archivo)
+        vencido = ahora - anterior.construido > timedelta(hours=config['reconstruir_horas'])
+        if vencido or (anterior.zoom_maximo, anterior.celda_px) != tuple(opciones.values()):
+            anterior = None
+
+    if anterior is None:
+        filas = IncendioForestal.objects.filter(estado__in=config['estados']).values_list(
+            'id', 'latitud', 'longitud', 'severidad'
+        )
+        indice = IndiceClusters.desde_filas(filas, ahora, **opciones)
+        modo = 'completo'
+    else:
+        filas = IncendioForestal.objects.filter(
+            fecha_ultima_actualizacion__gte=anterior.generado - SOLAPE
+        ).values_list('id', 'latitud', 'longitud', 'severidad', 'estado')
+        indice = anterior.actualizar(filas, ahora, config['estados'])
+        modo = 'incremental'
+
+    indice.guardar(archivo)
+    logger.info(f"🫧 Clusters ({modo}): {len(indice)} detecciones, "
+                f"{len(indice.niveles[0]['cantidad'])} en zoom 0 ({time.perf_counter() - inicio:.2f}s)")
+    return indice
+
+
+_cargado = {'clave': None, 'indice': None}
+_bloqueo = threading.Lock()
+
+
+def obtener_indice():
+    """
+    Índice guardado en disco, recargado solo cuando el archivo cambia. None
+    si todavía no se construyó: lo construyen la ingesta o el comando
+    reconstruir_clusters, nunca una solicitud web.
+    """
+    archivo = Path(configuracion()['archivo'])
+    with _bloqueo:
+        try:
+            estado = archivo.stat()
+        except FileNotFoundError:
+            return None
+        clave = (str(archivo), estado.st_mtime_ns, estado.st_size)
+        if _cargado['clave'] != clave:
+            _cargado['indice'] = IndiceClusters.cargar(archivo)
+            _cargado['clave'] = clave
+        return _cargado['indice']
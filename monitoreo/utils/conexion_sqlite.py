@@ -0,0 +1,78 @@
+# monitoreo/utils/conexion_sqlite.py
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# WAL permite leer mientras la ingesta escribe; con synchronous=NORMAL en WAL
+# un corte de luz puede perder la última transacción pero no corrompe la base.
+PRAGMAS_DEFECTO = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 30000,       # ms esperando un bloqueo antes de "database is locked"
+    'cache_size': -64000,        # negativo = KiB (≈ 64 MB por conexión)
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def pragmas():
+    """PRAGMAS_DEFECTO con los valores de settings.SQLITE_PRAGMAS (None desactiva uno)"""
+    configurados = {**PRAGMAS_DEFECTO, **getattr(settings, 'SQLITE_PRAGMAS', {})}
+    return {nombre: valor for nombre, valor in configurados.items() if valor is not None}
+
+
+def aplicar_pragmas(conexion, valores=None):
+    """
+    Aplica los PRAGMA a una conexión sqlite3 (DB-API) y devuelve los valores
+    que quedaron vigentes. Una base en memoria responde journal_mode=memory.
+    """
+    valores = pragmas() if valores is None else valores
+    vigentes = {}
+    for nombre, valor in valores.items():
+        conexion.execute(f'PRAGMA {nombre} = {valor}')
+        fila = conexion.execute(f'PRAGMA {nombre}').fetchone()
+        vigentes[nombre] = fila[0] if fila else None
+    return vigentes
+
+
+def configurar_conexion(connection):
+    """Receptor de connection_created: cada conexión nueva de Django sale configurada"""
+    if connection.vendor != 'sqlite':
+        return None
+    vigentes = aplicar_pragmas(connection.connection)
+    logger.debug(f"🗄️ SQLite {connection.alias}: {vigentes}")
+    return vigentes
+
+
+@contextmanager
+def escritura(using=None):
+    """
+    Transacción corta de escritura. En SQLite abre con BEGIN IMMEDIATE: el
+    bloqueo de escritura se pide al inicio, donde busy_timeout puede esperar.
+    Con el BEGIN diferido de Django, una transacción que primero lee y luego
+    escribe falla al instante (SQLITE_BUSY) si otro escritor se adelantó.
+    Dentro de otra transacción se comporta como transaction.atomic().
+    """
+    using = using or DEFAULT_DB_ALIAS
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite' or not conexion.get_autocommit():
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    # Django 4.2 no expone el modo de transacción de SQLite (llega en 5.1 con
+    # OPTIONS['transaction_mode']); se reemplaza el BEGIN solo para este bloque
+    conexion.ensure_connection()
+    conexion._start_transaction_under_autocommit = (
+        lambda: conexion.cursor().execute('BEGIN IMMEDIATE')
+    )
+    try:
+        with transaction.atomic(using=using):
+            conexion.__dict__.pop('_start_transaction_under_autocommit', None)
+            yield
+    finally:
+        conexion.__dict__.pop('_start_transaction_under_autocommit', None)
@@ -0,0 +1,160 @@
+# monitoreo/utils/consultas.py
+import base64
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from monitoreo.utils import cache_departamentos
+
+# Columnas que devuelve la API de incendios (values_list, sin instanciar modelos)
+CAMPOS_API = [
+    'id', 'nombre', 'latitud', 'longitud', 'fecha_deteccion', 'intensidad', 'severidad',
+    'estado', 'area_afectada_ha', 'frp', 'satelite', 'departamento_id', 'evento_id',
+]
+
+EPOCA = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+LIMITE_DEFECTO = 500
+LIMITE_MAXIMO = 5000
+
+
+def _lista(valor):
+    return [v.strip() for v in valor.split(',') if v.strip()] if valor else []
+
+
+def _instante(valor, fin_de_dia=False):
+    """AAAA-MM-DD (día local) o fecha-hora ISO; sin zona se asume la hora local"""
+    fecha_hora = parse_datetime(valor)
+    if fecha_hora is None:
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValueError(f"Fecha inválida: {valor!r}")
+        fecha_hora = datetime.combine(dia + timedelta(days=1) if fin_de_dia else dia, time())
+    if timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+def parsear_bbox(valor):
+    """'oeste,sur,este,norte' (como L.LatLngBounds.toBBoxString()) → (sur, oeste, norte, este)"""
+    try:
+        oeste, sur, este, norte = map(float, valor.split(','))
+    except ValueError:
+        raise ValueError("bbox debe ser oeste,sur,este,norte")
+    if sur > norte or oeste > este:
+        raise ValueError("bbox con límites invertidos")
+    return sur, oeste, norte, este
+
+
+def parsear_filtros(parametros):
+    """
+    Filtros de la API a partir de los parámetros GET. Lanza ValueError con
+    un mensaje para el cliente si alguno es inválido.
+
+    bbox=oeste,sur,este,norte (como L.LatLngBounds.toBBoxString()),
+    desde/hasta (día local inclusive o fecha-hora ISO), severidad, estado y
+    departamento (nombres o ids) separados por coma.
+    """
+    filtros = {}
+    if parametros.get('bbox'):
+        filtros['bbox'] = parsear_bbox(parametros['bbox'])
+    if parametros.get('desde'):
+        filtros['desde'] = _instante(parametros['desde'])
+    if parametros.get('hasta'):
+        filtros['hasta'] = _instante(parametros['hasta'], fin_de_dia=True)
+
+    from monitoreo.models import IncendioForestal
+    for campo, opciones in (('severidad', IncendioForestal.SEVERIDAD_CHOICES),
+                            ('estado', IncendioForestal.ESTADO_CHOICES)):
+        valores = _lista(parametros.get(campo))
+        validos = {clave for clave, _ in opciones}
+        if set(valores) - validos:
+            raise ValueError(f"{campo} debe ser uno de: {', '.join(sorted(validos))}")
+        if valores:
+            filtros[campo] = valores
+
+    departamentos = _lista(parametros.get('departamento'))
+    if departamentos:
+        por_nombre = cache_departamentos.obtener_departamentos()
+        ids = set()
+        for valor in departamentos:
+            if valor.isdigit():
+                ids.add(int(valor))
+            elif valor in por_nombre:
+                ids.add(por_nombre[valor].id)
+            else:
+                raise ValueError(f"Departamento desconocido: {valor!r}")
+        filtros['departamento'] = sorted(ids)
+    return filtros
+
+
+def filtrar_incendios(filtros, queryset=None):
+    """QuerySet de detecciones con los filtros de parsear_filtros (bbox por R-tree o clave espacial)"""
+    from monitoreo.models import IncendioForestal
+    from monitoreo.utils.rtree import detecciones_en_bbox
+
+    queryset = IncendioForestal.objects.all() if queryset is None else queryset
+    if 'bbox' in filtros:
+        queryset = detecciones_en_bbox(*filtros['bbox'], queryset=queryset)
+    if 'desde' in filtros:
+        queryset = queryset.filter(fecha_deteccion__gte=filtros['desde'])
+    if 'hasta' in filtros:
+        queryset = queryset.filter(fecha_deteccion__lt=filtros['hasta'])
+    if 'severidad' in filtros:
+        queryset = queryset.filter(severidad__in=filtros['severidad'])
+    if 'estado' in filtros:
+        queryset = queryset.filter(estado__in=filtros['estado'])
+    if 'departamento' in filtros:
+        queryset = queryset.filter(departamento_id__in=filtros['departamento'])
+    return queryset
+
+
+def codificar_cursor(fecha, id):
+    microsegundos = (fecha - EPOCA) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(f'{microsegundos}:{id}'.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        microsegundos, id = map(int, texto.split(':'))
+    except ValueError:
+        raise ValueError("cursor inválido")
+    return EPOCA + timedelta(microseconds=microsegundos), id
+
+
+def pagina(queryset, limite=LIMITE_DEFECTO, cursor=None, campos=CAMPOS_API):
+    """
+    Una página ordenada por (fecha_deteccion, id) descendente, paginada por
+    keyset: la página siguiente empieza después de la última clave vista, así
+    que el costo no crece con la profundidad como con OFFSET. El índice de
+    fecha_deteccion incluye el rowid (= id), que desempata el orden.
+
+    Devuelve (filas como tuplas de `campos`, cursor siguiente o None).
+    """
+    if cursor:
+        fecha, id = decodificar_cursor(cursor)
+        # El rango sobre fecha usa el índice; el OR solo desempata dentro de la misma fecha
+        queryset = queryset.filter(Q(fecha_deteccion__lt=fecha) | Q(id__lt=id),
+                                   fecha_deteccion__lte=fecha)
+    campos = list(campos)
+    filas = list(queryset.order_by('-fecha_deteccion', '-id').values_list(*campos)[:limite + 1])
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(ultima[campos.index('fecha_deteccion')], ultima[campos.index('id')])
+    return filas, siguiente
+
+
+def nombres_departamentos(ids=()):
+    """
+    {id: nombre} desde el cache de departamentos, para no unir tablas en cada
+    página. Si falta alguno de `ids` (creado por otro proceso) se recarga.
+    """
+    nombres = {depto.id: nombre for nombre, depto in cache_departamentos.obtener_departamentos().items()}
+    if not {i for i in ids if i is not None} <= nombres.keys():
+        cache_departamentos.refrescar_si_cambio()
+        nombres = {depto.id: nombre for nombre, depto in cache_departamentos.obtener_departamentos().items()}
+    return nombres
@@ -0,0 +1,234 @@
+# monitoreo/utils/densidad.py
+import logging
+import math
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+import zlib
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Gradiente (posición 0-1, RGBA) del mapa de calor: transparente → amarillo → rojo oscuro
+GRADIENTE = [
+    (0.0, (255, 255, 178, 0)),
+    (0.15, (254, 204, 92, 140)),
+    (0.4, (253, 141, 60, 190)),
+    (0.7, (240, 59, 32, 220)),
+    (1.0, (189, 0, 38, 240)),
+]
+
+
+def configuracion():
+    """settings.DENSIDAD_INCENDIOS con valores por defecto"""
+    return {
+        'directorio': Path(settings.BASE_DIR) / 'cache' / 'densidad',
+        'ventanas': {'24h': 24, '7d': 7 * 24, '30d': 30 * 24},
+        'zoom_maximo': 7,
+        'sigma_px': 4.0,
+        'bbox': (-22.9, -69.6, -9.7, -57.5),
+        'max_age': 300,
+        **getattr(settings, 'DENSIDAD_INCENDIOS', {}),
+    }
+
+
+def _paleta():
+    """Tabla de 256 colores RGBA interpolando GRADIENTE"""
+    posiciones = np.linspace(0, 1, 256)
+    puntos = [p for p, _ in GRADIENTE]
+    colores = np.array([c for _, c in GRADIENTE], dtype=float)
+    return np.stack([np.interp(posiciones, puntos, colores[:, i]) for i in range(4)], axis=1).astype(np.uint8)
+
+
+PALETA = _paleta()
+
+
+def png(rgba):
+    """PNG RGBA de 8 bits a partir de un array (alto, ancho, 4) uint8"""
+    alto, ancho, _ = rgba.shape
+    filas = np.concatenate([np.zeros((alto, 1), dtype=np.uint8), rgba.reshape(alto, ancho * 4)], axis=1)
+
+    def bloque(tipo, datos):
+        return (struct.pack('>I', len(datos)) + tipo + datos
+                + struct.pack('>I', zlib.crc32(tipo + datos) & 0xffffffff))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + bloque(b'IHDR', struct.pack('>IIBBBBB', ancho, alto, 8, 6, 0, 0, 0))
+            + bloque(b'IDAT', zlib.compress(filas.tobytes(), 6))
+            + bloque(b'IEND', b''))
+
+
+def _pixeles(latitudes, longitudes, zoom):
+    """Píxel global (x, y) en Web Mercator con teselas de 256 px"""
+    lat = np.radians(np.clip(np.asarray(latitudes, dtype=float), -85.0511287798, 85.0511287798))
+    escala = 256 * 2 ** zoom
+    return ((np.asarray(longitudes, dtype=float) + 180) / 360 * escala,
+            (1 - np.arcsinh(np.tan(lat)) / np.pi) / 2 * escala)
+
+
+def _suavizar(grilla, sigma):
+    """Convolución gaussiana separable (filas y columnas), con ceros fuera de la grilla"""
+    radio = max(1, int(math.ceil(3 * sigma)))
+    nucleo = np.exp(-np.arange(-radio, radio + 1) ** 2 / (2 * sigma ** 2))
+    nucleo /= nucleo.sum()
+    alto, ancho = grilla.shape
+    ampliada = np.pad(grilla, ((radio, radio), (0, 0)))
+    grilla = sum(peso * ampliada[i:i + alto] for i, peso in enumerate(nucleo))
+    ampliada = np.pad(grilla, ((0, 0), (radio, radio)))
+    grilla = sum(peso * ampliada[:, i:i + ancho] for i, peso in enumerate(nucleo))
+    return grilla.astype(np.float32)
+
+
+def calcular_niveles(latitudes, longitudes, pesos, config=None):
+    """
+    Grillas de densidad por zoom (0..zoom_maximo) sobre el bbox: cada detección
+    suma su peso en su píxel y se suaviza con un núcleo de sigma_px píxeles de
+    ese zoom, como un mapa de calor dibujado en el navegador. Devuelve
+    {zoom: (x0, y0, grilla)} con el origen en píxeles globales.
+    """
+    config = config or configuracion()
+    sur, oeste, norte, este = config['bbox']
+    margen = int(math.ceil(3 * config['sigma_px']))
+    niveles = {}
+    for zoom in range(config['zoom_maximo'] + 1):
+        (x0, x1), (y0, y1) = (np.floor(v).astype(int) for v in _pixeles([norte, sur], [oeste, este], zoom))
+        x0, y0 = x0 - margen, y0 - margen
+        ancho, alto = x1 + margen - x0 + 1, y1 + margen - y0 + 1
+        px, py = (np.floor(v).astype(np.int64) for v in _pixeles(latitudes, longitudes, zoom))
+        px, py = px - x0, py - y0
+        dentro = (px >= 0) & (px < ancho) & (py >= 0) & (py < alto)
+        grilla = np.bincount(py[dentro] * ancho + px[dentro], weights=np.asarray(pesos)[dentro],
+                             minlength=ancho * alto).reshape(alto, ancho)
+        niveles[zoom] = (int(x0), int(y0), _suavizar(grilla, config['sigma_px']))
+    return niveles
+
+
+def _escala(grilla):
+    """Valor que se pinta con el color más intenso: percentil alto, no el máximo"""
+    positivos = grilla[grilla > 0]
+    return float(np.percentile(positivos, 99.5)) if len(positivos) else 1.0
+
+
+def actualizar_densidad(ahora=None):
+    """
+    Recalcula las grillas de densidad de cada ventana (24h, 7d, 30d por
+    defecto) con la intensidad como peso y las guarda en un npz. Las teselas
+    PNG de la versión anterior se descartan.
+    """
+    from monitoreo.models import IncendioForestal
+
+    config = configuracion()
+    directorio = Path(config['directorio'])
+    directorio.mkdir(parents=True, exist_ok=True)
+    ahora = ahora or timezone.now()
+    inicio = time.perf_counter()
+
+    horas_max = max(config['ventanas'].values())
+    filas = list(IncendioForestal.objects.filter(
+        fecha_deteccion__gte=ahora - timedelta(hours=horas_max)
+    ).values_list('latitud', 'longitud', 'intensidad', 'fecha_deteccion'))
+    latitudes, longitudes, pesos, fechas = zip(*filas) if filas else ((), (), (), ())
+    latitudes, longitudes = np.array(latitudes, dtype=float), np.array(longitudes, dtype=float)
+    pesos = np.nan_to_num(np.array(pesos, dtype=float), nan=0.5)
+    antiguedad = np.array([(ahora - f).total_seconds() / 3600 for f in fechas], dtype=float)
+
+    arrays = {'generado': ahora.timestamp()}
+    for nombre, horas in config['ventanas'].items():
+        en_ventana = antiguedad <= horas
+        niveles = calcular_niveles(latitudes[en_ventana], longitudes[en_ventana], pesos[en_ventana], config)
+        for zoom, (x0, y0, grilla) in niveles.items():
+            arrays[f'{nombre}_{zoom}'] = grilla
+            arrays[f'{nombre}_{zoom}_meta'] = np.array([x0, y0, _escala(grilla)])
+
+    archivo = directorio / 'densidad.npz'
+    temporal = directorio / f'_densidad-{uuid.uuid4().hex[:8]}.npz'
+    np.savez(temporal, **arrays)
+    os.replace(temporal, archivo)
+
+    version = _version(ahora.timestamp())
+    for anterior in (directorio / 'teselas').glob('*'):
+        if anterior.name != version:
+            shutil.rmtree(anterior, ignore_errors=True)
+    logger.info(f"🌡️ Densidad: {len(filas)} detecciones en {len(config['ventanas'])} ventanas "
+                f"({time.perf_counter() - inicio:.2f}s)")
+    return {'detecciones': len(filas), 'generado': ahora}
+
+
+def _version(generado):
+    return f'{int(generado * 1000):x}'
+
+
+_cargado = {'clave': None, 'datos': None}
+_bloqueo = threading.Lock()
+
+
+def obtener_densidad():
+    """
+    Grillas guardadas en disco, recargadas solo cuando el archivo cambia.
+    None si todavía no se calcularon: las calcula la ingesta, nunca una
+    solicitud web.
+    """
+    archivo = Path(configuracion()['directorio']) / 'densidad.npz'
+    with _bloqueo:
+        try:
+            estado = archivo.stat()
+        except FileNotFoundError:
+            return None
+        clave = (str(archivo), estado.st_mtime_ns, estado.st_size)
+        if _cargado['clave'] != clave:
+            with np.load(archivo) as datos:
+                _cargado['datos'] = {k: datos[k] for k in datos.files}
+            _cargado['clave'] = clave
+        return _cargado['datos']
+
+
+def renderizar(datos, ventana, z, x, y):
+    """PNG 256x256 de la tesela z/x/y recortando la grilla de su zoom"""
+    x0, y0, escala = datos[f'{ventana}_{z}_meta']
+    grilla = datos[f'{ventana}_{z}']
+    valores = np.zeros((256, 256), dtype=np.float32)
+    # Intersección de la tesela con la grilla, en coordenadas de la grilla
+    c0, f0 = x * 256 - int(x0), y * 256 - int(y0)
+    cs = slice(max(c0, 0), min(c0 + 256, grilla.shape[1]))
+    fs = slice(max(f0, 0), min(f0 + 256, grilla.shape[0]))
+    if cs.start < cs.stop and fs.start < fs.stop:
+        valores[fs.start - f0:fs.stop - f0, cs.start - c0:cs.stop - c0] = grilla[fs, cs]
+    indices = np.clip(valores / escala * 255, 0, 255).astype(np.uint8)
+    return png(PALETA[indices])
+
+
+def tesela(ventana, z, x, y):
+    """
+    Bytes del PNG de la tesela desde el cache de disco, generándolo si falta
+    (None si no hay grillas). El cache se separa por versión de las grillas,
+    así cada recálculo lo renueva entero sin invalidar tesela por tesela; como
+    el recálculo borra la versión anterior en cualquier momento, se devuelven
+    los bytes y no la ruta.
+    """
+    datos = obtener_densidad()
+    if datos is None:
+        return None
+    version = _version(float(datos['generado']))
+    ruta = Path(configuracion()['directorio']) / 'teselas' / version / ventana / str(z) / str(x) / f'{y}.png'
+    try:
+        return ruta.read_bytes()
+    except FileNotFoundError:
+        pass
+    contenido = renderizar(datos, ventana, z, x, y)
+    try:
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(f'_{ruta.name}-{uuid.uuid4().hex[:8]}')
+        temporal.write_bytes(contenido)
+        os.replace(temporal, ruta)
+    except FileNotFoundError:
+        pass  # la versión se descartó mientras tanto: se sirve sin guardar
+    return contenido
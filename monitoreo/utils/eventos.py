@@ -0,0 +1,202 @@
+# monitoreo/utils/eventos.py
+import logging
+import math
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from monitoreo.utils.conexion_sqlite import escritura
+
+logger = logging.getLogger(__name__)
+
+KM_POR_GRADO = 111.32
+# Escala de longitud a la latitud media de Bolivia
+COS_LATITUD = math.cos(math.radians(-16.3))
+
+_BITS = 21
+_DESPLAZAMIENTO = 1 << (_BITS - 1)
+_MASCARA = (1 << _BITS) - 1
+
+# Vecinos "hacia adelante" en la grilla (x, y, t): cada par de celdas se visita una vez
+_VECINOS = [
+    (dx, dy, dt)
+    for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dt in (-1, 0, 1)
+    if (dx, dy, dt) > (0, 0, 0)
+]
+
+
+def _claves(lat, lon, segundos, celda_km, brecha_s):
+    ix = np.floor(lon * COS_LATITUD * KM_POR_GRADO / celda_km).astype(np.int64) + _DESPLAZAMIENTO
+    iy = np.floor(lat * KM_POR_GRADO / celda_km).astype(np.int64) + _DESPLAZAMIENTO
+    it = np.floor(segundos / brecha_s).astype(np.int64)
+    it -= it.min() - 1
+    return (ix << (2 * _BITS)) | (iy << _BITS) | (it & _MASCARA)
+
+
+def _componentes(n, a, b):
+    """Componentes conexas (etiqueta = menor nodo) con enganche y compresión de caminos"""
+    padre = np.arange(n)
+    while True:
+        ra, rb = padre[a], padre[b]
+        distintos = ra != rb
+        if not distintos.any():
+            return padre
+        ra, rb = ra[distintos], rb[distintos]
+        np.minimum.at(padre, np.maximum(ra, rb), np.minimum(ra, rb))
+        while True:
+            abuelo = padre[padre]
+            if np.array_equal(abuelo, padre):
+                break
+            padre = abuelo
+
+
+def agrupar(lat, lon, segundos, celda_km=1.0, brecha_s=24 * 3600):
+    """
+    Etiqueta puntos (lat, lon, tiempo) en grupos conexos sobre una grilla.
+
+    Como un DBSCAN con min_samples=1 sobre índice de grilla: los puntos se
+    asignan a celdas de celda_km x celda_km x brecha_s, y dos celdas ocupadas
+    vecinas (incluidas diagonales) pertenecen al mismo grupo. Devuelve un
+    array de etiquetas 0..k-1.
+    """
+    lat = np.asarray(lat, dtype=float)
+    if not len(lat):
+        return np.zeros(0, dtype=np.int64)
+
+    claves = _claves(lat, np.asarray(lon, dtype=float), np.asarray(segundos, dtype=float),
+                     celda_km, brecha_s)
+    celdas, inversa = np.unique(claves, return_inverse=True)
+
+    origen, destino = [], []
+    for dx, dy, dt in _VECINOS:
+        vecinas = celdas + ((dx << (2 * _BITS)) + (dy << _BITS) + dt)
+        pos = np.searchsorted(celdas, vecinas)
+        pos_valida = np.minimum(pos, len(celdas) - 1)
+        existe = celdas[pos_valida] == vecinas
+        origen.append(np.nonzero(existe)[0])
+        destino.append(pos_valida[existe])
+
+    raices = _componentes(len(celdas), np.concatenate(origen), np.concatenate(destino))
+    _, etiquetas = np.unique(raices[inversa], return_inverse=True)
+    return etiquetas.reshape(-1)
+
+
+def recalcular_eventos(ids, batch_size=500):
+    """Recalcula los agregados de los eventos indicados a partir de sus detecciones"""
+    from django.db.models import Avg, Count, Max, Min, Sum
+    from monitoreo.models import EventoIncendio, IncendioForestal
+
+    ids = sorted(set(ids))
+    campos = [
+        'latitud', 'longitud', 'min_latitud', 'max_latitud', 'min_longitud', 'max_longitud',
+        'num_detecciones', 'area_total_ha', 'frp_maximo', 'primera_deteccion', 'ultima_deteccion',
+    ]
+    for inicio in range(0, len(ids), batch_size):
+        lote = ids[inicio:inicio + batch_size]
+        # Alias con prefijo: no pueden coincidir con campos de IncendioForestal
+        agregados = IncendioForestal.objects.filter(evento_id__in=lote).values('evento_id').annotate(
+            a_latitud=Avg('latitud'), a_longitud=Avg('longitud'),
+            a_min_latitud=Min('latitud'), a_max_latitud=Max('latitud'),
+            a_min_longitud=Min('longitud'), a_max_longitud=Max('longitud'),
+            a_num_detecciones=Count('id'), a_area_total_ha=Sum('area_afectada_ha'),
+            a_frp_maximo=Max('frp'), a_primera_deteccion=Min('fecha_deteccion'),
+            a_ultima_deteccion=Max('fecha_deteccion'),
+        ).order_by()
+        eventos = [
+            EventoIncendio(id=fila['evento_id'], **{campo: fila[f'a_{campo}'] for campo in campos})
+            for fila in agregados
+        ]
+        EventoIncendio.objects.bulk_update(eventos, campos, batch_size=batch_size)
+
+
+def actualizar_eventos(celda_km=1.0, brecha=timedelta(hours=24), batch_size=500):
+    """
+    Asigna a eventos las detecciones que aún no tienen uno.
+
+    Solo se agrupan las detecciones pendientes junto con las ya asignadas
+    que están cerca en espacio y tiempo; el historial no se vuelve a
+    agrupar. Una detección que une dos eventos existentes los fusiona en
+    el más antiguo. Devuelve {'nuevos', 'asignadas', 'fusionados'}.
+    """
+    from monitoreo.models import EventoIncendio, IncendioForestal
+
+    inicio = time.perf_counter()
+    pendientes = list(IncendioForestal.objects.filter(evento__isnull=True).values_list(
+        'id', 'latitud', 'longitud', 'fecha_deteccion', 'departamento_id'
+    ))
+    if not pendientes:
+        return {'nuevos': 0, 'asignadas': 0, 'fusionados': 0}
+
+    df = pd.DataFrame(pendientes, columns=['id', 'latitud', 'longitud', 'fecha', 'departamento'])
+    df['evento'] = -1
+
+    # Contexto: detecciones ya agrupadas alcanzables desde las pendientes
+    margen = 2 * celda_km / KM_POR_GRADO
+    contexto = IncendioForestal.objects.filter(
+        evento__isnull=False,
+        fecha_deteccion__range=(df['fecha'].min() - 2 * brecha, df['fecha'].max() + 2 * brecha),
+        latitud__range=(df['latitud'].min() - margen, df['latitud'].max() + margen),
+        longitud__range=(df['longitud'].min() - margen / COS_LATITUD,
+                         df['longitud'].max() + margen / COS_LATITUD),
+    ).values_list('id', 'latitud', 'longitud', 'fecha_deteccion', 'departamento_id', 'evento_id')
+    df = pd.concat([
+        df,
+        pd.DataFrame(list(contexto), columns=['id', 'latitud', 'longitud', 'fecha', 'departamento', 'evento']),
+    ], ignore_index=True)
+
+    segundos = np.array([f.timestamp() for f in df['fecha']], dtype=float)
+    df['grupo'] = agrupar(df['latitud'].to_numpy(), df['longitud'].to_numpy(), segundos,
+                          celda_km, brecha.total_seconds())
+    df['segundos'] = segundos
+
+    nuevos_df = df[df['evento'] < 0]
+    existentes = df[df['evento'] >= 0].groupby('grupo')['evento'].unique()
+
+    destino = {}
+    absorbidos = {}
+    por_crear = []
+    for grupo, miembros in nuevos_df.groupby('grupo'):
+        eventos = existentes.get(grupo)
+        if eventos is None:
+            primera = miembros.loc[miembros['segundos'].idxmin()]
+            depto = primera['departamento']
+            por_crear.append((grupo, EventoIncendio(
+                nombre=f"Evento_{primera['fecha']:%Y%m%d}_{int(primera['id'])}",
+                departamento_id=None if pd.isna(depto) else int(depto),
+            )))
+        else:
+            eventos = sorted(int(e) for e in eventos)
+            destino[grupo] = eventos[0]
+            if len(eventos) > 1:
+                absorbidos[eventos[0]] = eventos[1:]
+
+    with escritura():
+        creados = EventoIncendio.objects.bulk_create([e for _, e in por_crear], batch_size=batch_size)
+        for (grupo, _), evento in zip(por_crear, creados):
+            destino[grupo] = evento.pk
+
+        IncendioForestal.objects.bulk_update(
+            [IncendioForestal(id=int(i), evento_id=destino[g])
+             for i, g in zip(nuevos_df['id'], nuevos_df['grupo'])],
+            ['evento'],
+            batch_size=batch_size
+        )
+
+        for evento_id, otros in absorbidos.items():
+            IncendioForestal.objects.filter(evento_id__in=otros).update(evento_id=evento_id)
+            EventoIncendio.objects.filter(id__in=otros).delete()
+
+        recalcular_eventos(destino.values(), batch_size=batch_size)
+
+    resultado = {
+        'nuevos': len(creados),
+        'asignadas': len(nuevos_df),
+        'fusionados': sum(len(otros) for otros in absorbidos.values()),
+    }
+    logger.info(
+        f"🔗 Eventos: {resultado['asignadas']} detecciones, {resultado['nuevos']} eventos nuevos, "
+        f"{resultado['fusionados']} fusionados ({time.perf_counter() - inicio:.2f}s)"
+    )
+    return resultado
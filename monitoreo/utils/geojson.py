@@ -0,0 +1,61 @@
+# monitoreo/utils/geojson.py
+import json
+
+from monitoreo.utils import consultas
+
+try:
+    import orjson
+except ImportError:  # opcional: con json de la biblioteca estándar es ~5 veces más lento
+    orjson = None
+
+# Filas por consulta; cada bloque es una lectura corta por keyset, así la
+# exportación no retiene un snapshot de lectura mientras dura la descarga
+FILAS_POR_BLOQUE = 5000
+
+PROPIEDADES = [
+    'id', 'nombre', 'fecha_deteccion', 'intensidad', 'severidad', 'estado',
+    'area_afectada_ha', 'frp', 'satelite', 'departamento_id', 'evento_id',
+]
+CAMPOS = PROPIEDADES + ['latitud', 'longitud']
+_DEPARTAMENTO = PROPIEDADES.index('departamento_id')
+
+INICIO = b'{"type":"FeatureCollection","features":['
+FIN = b']}'
+
+
+def codificar(objeto):
+    """JSON compacto en bytes (orjson si está instalado); fechas en ISO 8601"""
+    if orjson is not None:
+        return orjson.dumps(objeto)
+    return json.dumps(objeto, separators=(',', ':'), default=lambda o: o.isoformat()).encode()
+
+
+def _feature(fila, departamentos):
+    propiedades = dict(zip(PROPIEDADES, fila))
+    propiedades['departamento'] = departamentos.get(propiedades.pop('departamento_id'))
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [fila[-1], fila[-2]]},
+        'properties': propiedades,
+    }
+
+
+def feature_collection(queryset, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Genera una FeatureCollection de `queryset` en trozos de bytes, un bloque
+    de features por trozo. Recorre las detecciones de la más reciente a la más
+    antigua con consultas.pagina, así que la memoria no depende del total y el
+    primer byte sale antes de ejecutar la primera consulta.
+    """
+    yield INICIO
+    cursor = None
+    separador = b''
+    while True:
+        filas, cursor = consultas.pagina(queryset, filas_por_bloque, cursor, campos=CAMPOS)
+        if filas:
+            departamentos = consultas.nombres_departamentos(fila[_DEPARTAMENTO] for fila in filas)
+            yield separador + b','.join(codificar(_feature(fila, departamentos)) for fila in filas)
+            separador = b','
+        if cursor is None:
+            break
+    yield FIN
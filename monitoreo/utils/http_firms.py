@@ -0,0 +1,153 @@
+# monitoreo/utils/http_firms.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+_lock_sesion = threading.Lock()
+_sesion = None
+
+
+def _reintentos(total=3, backoff=0.5, jitter=0.5):
+    """Reintentos acotados con backoff exponencial y jitter (urllib3 >= 2)"""
+    kwargs = dict(
+        total=total,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return Retry(backoff_jitter=jitter, **kwargs)
+    except TypeError:
+        # urllib3 1.x no soporta jitter
+        return Retry(**kwargs)
+
+
+def obtener_sesion():
+    """Sesión HTTP compartida por el proceso: keep-alive, pool de conexiones y reintentos"""
+    global _sesion
+
+    with _lock_sesion:
+        if _sesion is None:
+            sesion = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=_reintentos())
+            sesion.mount('https://', adaptador)
+            sesion.mount('http://', adaptador)
+            sesion.headers['User-Agent'] = 'monitoreo-incendios-bolivia'
+            _sesion = sesion
+        return _sesion
+
+
+class CacheRespuestas:
+    """
+    Cache en disco de respuestas FIRMS, direccionado por el hash de
+    (fuente, bbox, rango de días).
+
+    Los rangos que incluyen el día en curso expiran rápido (ttl_abierto);
+    los días ya terminados no cambian y se conservan ttl_cerrado. Cuando el
+    directorio supera max_bytes se eliminan los archivos menos usados (LRU
+    por fecha de acceso).
+    """
+
+    def __init__(self, directorio, ttl_abierto=600, ttl_cerrado=30 * 24 * 3600,
+                 max_bytes=500 * 1024 * 1024):
+        self.directorio = Path(directorio)
+        self.ttl_abierto = ttl_abierto
+        self.ttl_cerrado = ttl_cerrado
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def clave(source, bbox, fecha_inicio, days):
+        texto = '|'.join([
+            source,
+            ','.join(str(bbox[k]) for k in ('min_lon', 'min_lat', 'max_lon', 'max_lat')),
+            fecha_inicio.isoformat(),
+            str(days),
+        ])
+        return hashlib.sha256(texto.encode()).hexdigest()
+
+    def _ruta(self, clave):
+        return self.directorio / clave[:2] / f"{clave}.csv"
+
+    def obtener(self, clave, cerrado):
+        """Ruta del archivo en cache si existe y no expiró; None si no"""
+        ruta = self._ruta(clave)
+        ttl = self.ttl_cerrado if cerrado else self.ttl_abierto
+        try:
+            estado = ruta.stat()
+        except FileNotFoundError:
+            self._contar(hit=False)
+            return None
+
+        if time.time() - estado.st_mtime > ttl:
+            ruta.unlink(missing_ok=True)
+            self._contar(hit=False)
+            return None
+
+        # Marca de acceso para la política LRU (mtime se conserva para el TTL)
+        os.utime(ruta, (time.time(), estado.st_mtime))
+        self._contar(hit=True)
+        return ruta
+
+    def guardar(self, clave, bloques):
+        """Escribe en disco un iterable de bytes de forma atómica y devuelve la ruta"""
+        ruta = self._ruta(clave)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_suffix(f'.{threading.get_ident()}.tmp')
+        try:
+            with open(temporal, 'wb') as f:
+                for bloque in bloques:
+                    f.write(bloque)
+            os.replace(temporal, ruta)
+        except BaseException:
+            # Descarga cortada: el .tmp no lo purga nadie más
+            temporal.unlink(missing_ok=True)
+            raise
+        self.desalojar()
+        return ruta
+
+    def desalojar(self):
+        """Elimina los archivos con acceso más antiguo hasta quedar bajo max_bytes"""
+        archivos = [(r.stat(), r) for r in self.directorio.glob('*/*.csv')]
+        total = sum(estado.st_size for estado, _ in archivos)
+        if total <= self.max_bytes:
+            return
+
+        for estado, ruta in sorted(archivos, key=lambda a: a[0].st_atime):
+            ruta.unlink(missing_ok=True)
+            total -= estado.st_size
+            if total <= self.max_bytes:
+                break
+
+    def _contar(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def estadisticas(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def crear_cache():
+    """Cache configurado en settings.FIRMS_CACHE, o None si está desactivado"""
+    from django.conf import settings
+
+    opciones = dict(getattr(settings, 'FIRMS_CACHE', {}))
+    if not opciones.pop('activo', False):
+        return None
+    return CacheRespuestas(**opciones)
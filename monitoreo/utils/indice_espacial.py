@@ -0,0 +1,52 @@
+# monitoreo/utils/indice_espacial.py
+import math
+
+
+class IndiceEspacioTemporal:
+    """
+    Índice hash en memoria para detectar duplicados durante la ingesta.
+
+    Agrupa incendios en celdas (celda_x, celda_y, fecha) de tamaño igual a la
+    tolerancia, de modo que cada búsqueda solo revisa las celdas vecinas en
+    lugar de hacer una consulta a la base de datos por fila.
+    """
+
+    def __init__(self, tolerancia=0.01, tamano_celda=None):
+        self.tolerancia = tolerancia
+        self.tamano_celda = tamano_celda or tolerancia
+        self._celdas = {}
+        self._total = 0
+
+    def __len__(self):
+        return self._total
+
+    def _celda(self, valor):
+        return math.floor(valor / self.tamano_celda)
+
+    def agregar(self, incendio, fecha):
+        """Agrega un objeto con latitud/longitud/fecha_deteccion a la celda del día"""
+        clave = (self._celda(incendio.longitud), self._celda(incendio.latitud), fecha)
+        self._celdas.setdefault(clave, []).append(incendio)
+        self._total += 1
+
+    def buscar(self, lat, lon, fecha):
+        """
+        Devuelve el incendio más reciente del mismo día dentro de ±tolerancia.
+
+        Aplica la misma regla que filter(latitud__range, longitud__range,
+        fecha_deteccion__date).first() con ordering '-fecha_deteccion'.
+        """
+        tol = self.tolerancia
+        min_lat, max_lat = lat - tol, lat + tol
+        min_lon, max_lon = lon - tol, lon + tol
+
+        encontrado = None
+        for celda_x in range(self._celda(min_lon), self._celda(max_lon) + 1):
+            for celda_y in range(self._celda(min_lat), self._celda(max_lat) + 1):
+                for candidato in self._celdas.get((celda_x, celda_y, fecha), ()):
+                    if (min_lat <= candidato.latitud <= max_lat and
+                            min_lon <= candidato.longitud <= max_lon and
+                            (encontrado is None or
+                             candidato.fecha_deteccion > encontrado.fecha_deteccion)):
+                        encontrado = candidato
+        return encontrado
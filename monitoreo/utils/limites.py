@@ -0,0 +1,208 @@
+# monitoreo/utils/limites.py
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Bounding Box de Bolivia (igual que NASAFirmsUpdater.bolivia_bbox)
+BBOX_BOLIVIA = {'min_lon': -69.6, 'min_lat': -22.9, 'max_lon': -57.5, 'max_lat': -9.7}
+
+SIN_POLIGONO = -1
+CELDA_MIXTA = -2
+
+
+def _anillos(geometria):
+    """Extrae los anillos (exteriores y huecos) de un Polygon/MultiPolygon GeoJSON"""
+    if geometria['type'] == 'Polygon':
+        poligonos = [geometria['coordinates']]
+    elif geometria['type'] == 'MultiPolygon':
+        poligonos = geometria['coordinates']
+    else:
+        return []
+    return [np.asarray(anillo, dtype=float)[:, :2] for poligono in poligonos for anillo in poligono]
+
+
+def _aristas(anillos):
+    """Convierte anillos en arrays de aristas (x1, y1, x2, y2)"""
+    x1, y1, x2, y2 = [], [], [], []
+    for anillo in anillos:
+        siguiente = np.roll(anillo, -1, axis=0)
+        x1.append(anillo[:, 0])
+        y1.append(anillo[:, 1])
+        x2.append(siguiente[:, 0])
+        y2.append(siguiente[:, 1])
+    return tuple(np.concatenate(v) for v in (x1, y1, x2, y2))
+
+
+def puntos_en_poligono(x, y, aristas, bloque=4096):
+    """Prueba exacta (regla par-impar) de muchos puntos contra un polígono con huecos"""
+    x1, y1, x2, y2 = aristas
+    dentro = np.zeros(len(x), dtype=bool)
+    for inicio in range(0, len(x), bloque):
+        px = x[inicio:inicio + bloque, None]
+        py = y[inicio:inicio + bloque, None]
+        cruza = (y1 > py) != (y2 > py)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_corte = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        dentro[inicio:inicio + bloque] = np.count_nonzero(cruza & (px < x_corte), axis=1) % 2 == 1
+    return dentro
+
+
+class GrillaLimites:
+    """
+    Grilla raster precalculada de límites administrativos.
+
+    Cada celda guarda el índice del polígono que la contiene, o CELDA_MIXTA si
+    algún borde la atraviesa. La búsqueda es un simple indexado NumPy; solo
+    los puntos que caen en celdas mixtas se resuelven con punto-en-polígono
+    exacto contra los polígonos candidatos. Si los polígonos se solapan gana
+    el primero, tanto en la grilla como en las celdas mixtas.
+    """
+
+    def __init__(self, nombres, aristas, bbox=None, resolucion=0.01):
+        self.nombres = np.array(list(nombres) + [None], dtype=object)
+        self.aristas = aristas
+        self.bbox = bbox or BBOX_BOLIVIA
+        self.resolucion = resolucion
+
+        self.nx = int(np.ceil((self.bbox['max_lon'] - self.bbox['min_lon']) / resolucion))
+        self.ny = int(np.ceil((self.bbox['max_lat'] - self.bbox['min_lat']) / resolucion))
+        self.cajas = np.array([
+            (a[0].min(), a[1].min(), a[0].max(), a[1].max()) for a in aristas
+        ]).reshape(-1, 4)
+        self.grilla = self._rasterizar()
+
+    @classmethod
+    def desde_archivo(cls, ruta, propiedad='nombre', **kwargs):
+        """Carga polígonos desde un GeoJSON o, si geopandas está instalado, un shapefile"""
+        ruta = Path(ruta)
+        if ruta.suffix.lower() in ('.geojson', '.json'):
+            with open(ruta, encoding='utf-8') as f:
+                features = json.load(f)['features']
+        else:
+            import geopandas as gpd
+            features = gpd.read_file(ruta).to_crs(epsg=4326).__geo_interface__['features']
+
+        nombres, aristas = [], []
+        for feature in features:
+            anillos = _anillos(feature['geometry'] or {'type': None})
+            if anillos:
+                nombres.append(feature['properties'][propiedad])
+                aristas.append(_aristas(anillos))
+
+        logger.info(f"Límites cargados desde {ruta.name}: {len(nombres)} polígonos")
+        return cls(nombres, aristas, **kwargs)
+
+    def _rasterizar(self):
+        res = self.resolucion
+        grilla = np.full((self.ny, self.nx), SIN_POLIGONO, dtype=np.int32)
+        centros_x = self.bbox['min_lon'] + (np.arange(self.nx) + 0.5) * res
+        centros_y = self.bbox['min_lat'] + (np.arange(self.ny) + 0.5) * res
+
+        for codigo, (x1, y1, x2, y2) in enumerate(self.aristas):
+            # Relleno por líneas de barrido: cruces de cada fila con las aristas
+            filas = np.nonzero((centros_y >= self.cajas[codigo, 1]) &
+                               (centros_y <= self.cajas[codigo, 3]))[0]
+            for j in filas:
+                y = centros_y[j]
+                cruza = (y1 > y) != (y2 > y)
+                if not cruza.any():
+                    continue
+                cortes = np.sort(
+                    x1[cruza] + (y - y1[cruza]) * (x2[cruza] - x1[cruza]) / (y2[cruza] - y1[cruza])
+                )
+                inicios = np.searchsorted(centros_x, cortes[0::2])
+                fines = np.searchsorted(centros_x, cortes[1::2])
+                for i0, i1 in zip(inicios, fines):
+                    tramo = grilla[j, i0:i1]
+                    tramo[tramo == SIN_POLIGONO] = codigo
+
+        # Celdas atravesadas por algún borde: densificar aristas y dilatar una celda
+        mixta = np.zeros_like(grilla, dtype=bool)
+        for x1, y1, x2, y2 in self.aristas:
+            pasos = np.maximum(np.ceil(np.hypot(x2 - x1, y2 - y1) / (res / 2)), 1).astype(int)
+            t = np.concatenate([np.arange(n + 1) / n for n in pasos])
+            idx = np.repeat(np.arange(len(pasos)), pasos + 1)
+            ix, iy, validos = self._celdas(y1[idx] + t * (y2[idx] - y1[idx]),
+                                           x1[idx] + t * (x2[idx] - x1[idx]))
+            mixta[iy[validos], ix[validos]] = True
+
+        dilatada = mixta.copy()
+        dilatada[1:, :] |= mixta[:-1, :]
+        dilatada[:-1, :] |= mixta[1:, :]
+        dilatada[:, 1:] |= mixta[:, :-1]
+        dilatada[:, :-1] |= mixta[:, 1:]
+        dilatada[1:, 1:] |= mixta[:-1, :-1]
+        dilatada[:-1, :-1] |= mixta[1:, 1:]
+        dilatada[1:, :-1] |= mixta[:-1, 1:]
+        dilatada[:-1, 1:] |= mixta[1:, :-1]
+        grilla[dilatada] = CELDA_MIXTA
+        return grilla
+
+    def _celdas(self, lat, lon):
+        ix = np.floor((lon - self.bbox['min_lon']) / self.resolucion).astype(np.int64)
+        iy = np.floor((lat - self.bbox['min_lat']) / self.resolucion).astype(np.int64)
+        validos = (ix >= 0) & (ix < self.nx) & (iy >= 0) & (iy < self.ny)
+        return ix, iy, validos
+
+    def codigos(self, lat, lon):
+        """Índice del polígono para cada punto (SIN_POLIGONO si no cae en ninguno)"""
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        ix, iy, validos = self._celdas(lat, lon)
+
+        codigos = np.full(len(lat), SIN_POLIGONO, dtype=np.int32)
+        codigos[validos] = self.grilla[iy[validos], ix[validos]]
+
+        mixtos = np.nonzero(codigos == CELDA_MIXTA)[0]
+        if len(mixtos):
+            codigos[mixtos] = SIN_POLIGONO
+            pendientes = mixtos
+            for codigo, caja in enumerate(self.cajas):
+                px, py = lon[pendientes], lat[pendientes]
+                en_caja = (px >= caja[0]) & (px <= caja[2]) & (py >= caja[1]) & (py <= caja[3])
+                if not en_caja.any():
+                    continue
+                candidatos = pendientes[en_caja]
+                dentro = puntos_en_poligono(lon[candidatos], lat[candidatos], self.aristas[codigo])
+                codigos[candidatos[dentro]] = codigo
+                pendientes = np.setdiff1d(pendientes, candidatos[dentro], assume_unique=True)
+                if not len(pendientes):
+                    break
+        return codigos
+
+    def nombres_para(self, lat, lon):
+        """Nombre del polígono para cada punto (None si no cae en ninguno)"""
+        return self.nombres[self.codigos(lat, lon)]
+
+
+_lock = threading.Lock()
+_grillas = {}
+
+
+def obtener_grilla(nivel):
+    """
+    Devuelve la grilla del nivel ('departamento' o 'municipio') configurado en
+    settings.LIMITES_ADMINISTRATIVOS, construyéndola una vez por proceso.
+    Retorna None si no hay archivo de límites disponible.
+    """
+    from django.conf import settings
+
+    config_nivel = getattr(settings, 'LIMITES_ADMINISTRATIVOS', {}).get(nivel)
+    if not config_nivel or not os.path.exists(config_nivel['ruta']):
+        return None
+
+    clave = (nivel, str(config_nivel['ruta']), os.path.getmtime(config_nivel['ruta']))
+    with _lock:
+        if clave not in _grillas:
+            _grillas[clave] = GrillaLimites.desde_archivo(
+                config_nivel['ruta'],
+                propiedad=config_nivel.get('propiedad', 'nombre'),
+                resolucion=config_nivel.get('resolucion', 0.01),
+            )
+        return _grillas[clave]
@@ -0,0 +1,55 @@
+# monitoreo/utils/mapas.py
+from folium.elements import JSCSSMixin
+from folium.map import Layer
+from jinja2 import Template
+
+
+class CapaIncendiosMVT(JSCSSMixin, Layer):
+    """
+    Capa folium con las detecciones como teselas vectoriales (Leaflet.VectorGrid):
+    el navegador pide solo las teselas de la vista en lugar de un marcador por
+    detección. Color por severidad; las extintas se dibujan atenuadas.
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = L.vectorGrid.protobuf({{ this.url|tojson }}, {
+                rendererFactory: L.canvas.tile,
+                interactive: true,
+                maxNativeZoom: {{ this.zoom_maximo }},
+                getFeatureId: function (f) { return f.id; },
+                vectorTileLayerStyles: {
+                    incendios: function (props, zoom) {
+                        var colores = {{ this.colores|tojson }};
+                        return {
+                            radius: Math.max(2, Math.min(8, zoom - 3)),
+                            fill: true,
+                            fillColor: colores[props.severidad] || 'red',
+                            fillOpacity: props.estado === 'extinto' ? 0.3 : 0.8,
+                            stroke: false
+                        };
+                    }
+                }
+            }).on('click', function (e) {
+                var p = e.layer.properties;
+                L.popup()
+                    .setLatLng(e.latlng)
+                    .setContent('<b>Detección ' + (p.satelite || '') + '</b><br>' +
+                        new Date(p.fecha * 1000).toLocaleString() +
+                        '<br>Severidad: ' + p.severidad + '<br>Estado: ' + p.estado +
+                        (p.cantidad > 1 ? '<br>' + p.cantidad + ' detecciones en este punto' : ''))
+                    .openOn({{ this._parent.get_name() }});
+            });
+        {% endmacro %}
+    """)
+
+    default_js = [
+        ('leaflet_vectorgrid', 'https://unpkg.com/leaflet.vectorgrid@1.3.0/dist/Leaflet.VectorGrid.bundled.js'),
+    ]
+
+    def __init__(self, url='/tiles/{z}/{x}/{y}.pbf', name='Detecciones', zoom_maximo=18, colores=None,
+                 overlay=True, control=True, show=True):
+        super().__init__(name=name, overlay=overlay, control=control, show=show)
+        self._name = 'CapaIncendiosMVT'
+        self.url = url
+        self.zoom_maximo = zoom_maximo
+        self.colores = colores or {'bajo': 'green', 'medio': 'orange', 'alto': 'red', 'critico': 'darkred'}
@@ -0,0 +1,100 @@
+# monitoreo/utils/mvt.py
+"""
+Codificación mínima de Mapbox Vector Tiles (especificación 2.1) para capas
+de puntos, sin dependencias: el protobuf se escribe a mano.
+"""
+import math
+import struct
+
+import numpy as np
+
+LATITUD_MAXIMA = 85.0511287798  # límite de Web Mercator
+
+# Clave protobuf (campo << 3 | tipo): 0 = varint, 1 = 64 bits, 2 = con longitud
+_VERSION = bytes([15 << 3 | 0, 2])
+_TIPO_PUNTO = bytes([3 << 3 | 0, 1])
+_MOVE_TO_1 = 1 | 1 << 3  # comando MoveTo con un solo punto
+
+
+def _varint(n):
+    partes = bytearray()
+    while n > 0x7f:
+        partes.append(n & 0x7f | 0x80)
+        n >>= 7
+    partes.append(n)
+    return bytes(partes)
+
+
+def _zigzag(n):
+    return n << 1 if n >= 0 else (-n << 1) - 1
+
+
+def _mensaje(campo, datos):
+    return _varint(campo << 3 | 2) + _varint(len(datos)) + datos
+
+
+def _valor(valor):
+    """Mensaje Value: string, double, entero con o sin signo o bool"""
+    if isinstance(valor, str):
+        return _mensaje(1, valor.encode())
+    if isinstance(valor, (bool, np.bool_)):
+        return bytes([7 << 3 | 0, int(valor)])
+    if isinstance(valor, (int, np.integer)):
+        valor = int(valor)
+        return bytes([5 << 3 | 0]) + _varint(valor) if valor >= 0 else bytes([6 << 3 | 0]) + _varint(_zigzag(valor))
+    return bytes([3 << 3 | 1]) + struct.pack('<d', valor)
+
+
+def a_tesela(latitudes, longitudes, z, x, y, extension=4096):
+    """Coordenadas enteras dentro de la tesela z/x/y (origen arriba a la izquierda)"""
+    lat = np.radians(np.clip(np.asarray(latitudes, dtype=float), -LATITUD_MAXIMA, LATITUD_MAXIMA))
+    n = 2 ** z
+    tx = (np.asarray(longitudes, dtype=float) + 180) / 360 * n
+    ty = (1 - np.arcsinh(np.tan(lat)) / math.pi) / 2 * n
+    return (np.floor((tx - x) * extension).astype(np.int64),
+            np.floor((ty - y) * extension).astype(np.int64))
+
+
+def limites(z, x, y, margen=0.0):
+    """(sur, oeste, norte, este) en grados de la tesela, ampliada en `margen` teselas por lado"""
+    n = 2 ** z
+
+    def latitud(ty):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * ty / n))))
+
+    return (max(latitud(y + 1 + margen), -LATITUD_MAXIMA), (x - margen) / n * 360 - 180,
+            min(latitud(y - margen), LATITUD_MAXIMA), (x + 1 + margen) / n * 360 - 180)
+
+
+def capa_puntos(nombre, px, py, propiedades, ids=None, extension=4096):
+    """
+    Mensaje Layer con un feature Point por punto. `propiedades` es una lista
+    de dicts (un valor None omite el atributo); claves y valores repetidos se
+    guardan una sola vez en las tablas de la capa.
+    """
+    claves, valores = {}, {}
+    features = []
+    for i, atributos in enumerate(propiedades):
+        etiquetas = bytearray()
+        for clave, valor in atributos.items():
+            if valor is None or valor != valor:  # None o NaN
+                continue
+            etiquetas += _varint(claves.setdefault(clave, len(claves)))
+            etiquetas += _varint(valores.setdefault((type(valor), valor), len(valores)))
+        geometria = bytes([_MOVE_TO_1]) + _varint(_zigzag(int(px[i]))) + _varint(_zigzag(int(py[i])))
+        feature = (
+            (bytes([1 << 3 | 0]) + _varint(int(ids[i])) if ids is not None else b'')
+            + _mensaje(2, bytes(etiquetas)) + _TIPO_PUNTO + _mensaje(4, geometria)
+        )
+        features.append(_mensaje(2, feature))
+    return (
+        _VERSION + _mensaje(1, nombre.encode()) + b''.join(features)
+        + b''.join(_mensaje(3, clave.encode()) for clave in claves)
+        + b''.join(_mensaje(4, _valor(valor)) for _, valor in valores)
+        + bytes([5 << 3 | 0]) + _varint(extension)
+    )
+
+
+def tesela(*capas):
+    """Mensaje Tile a partir de capas ya codificadas con capa_puntos"""
+    return b''.join(_mensaje(3, capa) for capa in capas if capa)
@@ -1,19 +1,95 @@
 # monitoreo/utils/nasa_firms.py
 import requests
+import numpy as np
 import pandas as pd
 from io import StringIO
-from datetime import datetime, timedelta
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
 from django.contrib.gis.geos import Point
 from decouple import config
+from monitoreo.utils import cache_departamentos, teselas
+from monitoreo.utils.ciclo_vida import actualizar_estados
+from monitoreo.utils.clave_espacial import clave_espacial
+from monitoreo.utils.clusters import actualizar_clusters
+from monitoreo.utils.densidad import actualizar_densidad
+from monitoreo.utils.conexion_sqlite import escritura
+from monitoreo.utils.eventos import actualizar_eventos, recalcular_eventos
+from monitoreo.utils.http_firms import crear_cache, obtener_sesion
+from monitoreo.utils.indice_espacial import IndiceEspacioTemporal
+from monitoreo.utils.limites import obtener_grilla
+from monitoreo.utils.resumen import DeltasResumen
+from django.conf import settings
+from django.utils import timezone
+from concurrent.futures import ThreadPoolExecutor, wait
+import queue
+import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Productos NRT de NASA FIRMS disponibles para Bolivia
+FUENTES_FIRMS = ['MODIS_NRT', 'VIIRS_SNPP_NRT', 'VIIRS_NOAA20_NRT', 'VIIRS_NOAA21_NRT']
+
+# VIIRS usa canales I4/I5; se renombran a los nombres de columna de MODIS
+COLUMNAS_VIIRS = {'bright_ti4': 'brightness', 'bright_ti5': 'bright_t31'}
+
+
+class ErrorDescargaFirms(Exception):
+    """Descarga fallida de FIRMS (solo con estricto=True; por defecto se registra y se sigue)"""
+
+
+# Columnas que identifican el contenido de una detección para la ingesta incremental
+COLUMNAS_HUELLA = [
+    'source', 'latitude', 'longitude', 'acq_date', 'acq_time', 'satellite',
+    'brightness', 'bright_t31', 'frp', 'confidence', 'version',
+]
+
 class NASAFirmsUpdater:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, batch_size=500, modo_bulk=True, timeout=30,
+                 tiles=(1, 1), workers_tiles=4, streaming=False, chunksize=5000,
+                 usar_cache=True, incremental=True):
         self.api_key = api_key or config('NASA_FIRMS_API_KEY', default=None)
         self.base_url = "https://firms.modaps.eosdis.nasa.gov/api/area/csv"
+        self.timeout = timeout
+        
+        # Sesión HTTP compartida (keep-alive + reintentos) y cache en disco
+        self.sesion = obtener_sesion()
+        self.cache = crear_cache() if usar_cache else None
+        
+        # Ingesta incremental: ventana mínima desde la marca de agua de cada
+        # fuente y descarte de filas ya vistas (hash de contenido)
+        self.incremental = incremental
+        self.dias_maximos = 10  # límite de días por consulta de FIRMS
+        self.margen_marca = timedelta(hours=6)  # FIRMS NRT publica con retraso
+        
+        # Descarga por teselas: (filas, columnas) del bbox y descargas simultáneas
+        self.tiles = tuple(tiles)
+        self.workers_tiles = workers_tiles
+        
+        # Streaming: el CSV se parsea en bloques de `chunksize` filas y cada
+        # bloque pasa directo a transformación y escritura
+        self.streaming = streaming
+        self.chunksize = chunksize
+        self.bloques_en_cola = 4
+        
+        # Ingesta: tamaño de lote para bulk_create/bulk_update y modo de escritura
+        self.batch_size = batch_size
+        self.modo_bulk = modo_bulk
+        # Filas por transacción de escritura: transacciones cortas liberan
+        # seguido el bloqueo de SQLite para otros escritores
+        self.filas_por_transaccion = 2000
+        
+        # Tolerancia (grados) para considerar que un incendio ya existe
+        self.tolerancia_duplicado = 0.01
+        
+        # Agrupación de detecciones en eventos: celda espacial y brecha temporal
+        self.agrupar_eventos = True
+        self.celda_evento_km = 1.0
+        self.brecha_evento = timedelta(hours=24)
+        
+        # Confianza VIIRS (low/nominal/high) expresada en la escala 0-1 de MODIS
+        self.confianza_viirs = {'l': 0.3, 'n': 0.6, 'h': 0.9}
         
         # Bounding Box de Bolivia
         self.bolivia_bbox = {
@@ -36,27 +112,119 @@ class NASAFirmsUpdater:
             'Pando': {'min_lat': -12.0, 'max_lat': -9.7, 'min_lon': -70.0, 'max_lon': -64.5},
         }
     
+    def _url(self, source, days, bbox, fecha=None):
+        """URL del endpoint de área (coordenadas oeste,sur,este,norte)"""
+        area = f"{bbox['min_lon']},{bbox['min_lat']},{bbox['max_lon']},{bbox['max_lat']}"
+        url = f"{self.base_url}/{self.api_key}/{source}/{area}/{days}"
+        if fecha:
+            url += f"/{fecha.isoformat()}"
+        return url
+    
+    def _rango_dias(self, days, fecha=None):
+        """Fecha inicial (UTC) del rango pedido y si ya terminó por completo"""
+        hoy = datetime.now(dt_timezone.utc).date()
+        inicio = fecha or hoy - timedelta(days=days - 1)
+        return inicio, inicio + timedelta(days=days - 1) < hoy
+    
+    @contextmanager
+    def _abrir_csv(self, bbox, days, source, timeout=None, fecha=None):
+        """
+        Abre el CSV de FIRMS como archivo binario: desde el cache en disco si
+        está vigente, o descargándolo en streaming con la sesión compartida.
+        Entrega None si la respuesta HTTP no es 200.
+        """
+        url = self._url(source, days, bbox, fecha)
+        timeout = timeout or self.timeout
+        
+        if self.cache is None:
+            with self.sesion.get(url, timeout=timeout, stream=True) as response:
+                if response.status_code != 200:
+                    logger.error(f"Error HTTP {response.status_code} ({source})")
+                    yield None
+                    return
+                response.raw.decode_content = True
+                yield response.raw
+            return
+        
+        inicio, cerrado = self._rango_dias(days, fecha)
+        clave = self.cache.clave(source, bbox, inicio, days)
+        ruta = self.cache.obtener(clave, cerrado)
+        if ruta is None:
+            with self.sesion.get(url, timeout=timeout, stream=True) as response:
+                if response.status_code != 200:
+                    logger.error(f"Error HTTP {response.status_code} ({source})")
+                    yield None
+                    return
+                ruta = self.cache.guardar(clave, response.iter_content(chunk_size=64 * 1024))
+        else:
+            logger.info(f"📦 {source} servido desde cache local")
+        
+        with open(ruta, 'rb') as archivo:
+            yield archivo
+    
+    def dividir_bbox(self, filas, columnas, bbox=None):
+        """Divide el bbox en filas×columnas teselas que comparten bordes"""
+        bbox = bbox or self.bolivia_bbox
+        lats = np.linspace(bbox['min_lat'], bbox['max_lat'], filas + 1)
+        lons = np.linspace(bbox['min_lon'], bbox['max_lon'], columnas + 1)
+        return [
+            {
+                'min_lon': round(float(lons[j]), 6),
+                'min_lat': round(float(lats[i]), 6),
+                'max_lon': round(float(lons[j + 1]), 6),
+                'max_lat': round(float(lats[i + 1]), 6),
+            }
+            for i in range(filas)
+            for j in range(columnas)
+        ]
+    
     # monitoreo/utils/nasa_firms.py - VERSIÓN FINAL CORREGIDA
-    def obtener_datos_nasa(self, days=1, source='MODIS_NRT'):
-        """Obtiene datos de incendios de NASA FIRMS"""
+    def obtener_datos_nasa(self, days=1, source='MODIS_NRT', timeout=None, tiles=None, workers=None,
+                           fecha=None, estricto=False):
+        """
+        Obtiene datos de incendios de NASA FIRMS. Con estricto=True un error
+        de descarga lanza ErrorDescargaFirms en lugar de devolver un
+        DataFrame vacío, para distinguir "sin incendios" de "falló".
+        """
         
         if not self.api_key:
             logger.error("API Key de NASA FIRMS no configurada")
             return pd.DataFrame()
         
+        filas, columnas = tiles or self.tiles
+        if filas * columnas == 1:
+            return self._obtener_area(self.bolivia_bbox, days, source, timeout, fecha, estricto)
+        
+        # Teselas en paralelo: una tesela lenta o fallida no pierde toda la corrida
+        teselas = self.dividir_bbox(filas, columnas)
+        with ThreadPoolExecutor(max_workers=workers or self.workers_tiles,
+                                thread_name_prefix=f'firms-{source}') as executor:
+            partes = list(executor.map(
+                lambda bbox: self._obtener_area(bbox, days, source, timeout, fecha, estricto), teselas
+            ))
+        
+        partes = [df for df in partes if not df.empty]
+        if not partes:
+            return pd.DataFrame()
+        
+        # Los puntos sobre bordes compartidos llegan en ambas teselas
+        df = pd.concat(partes, ignore_index=True).drop_duplicates(ignore_index=True)
+        logger.info(f"✅ {len(df)} incendios en {len(teselas)} teselas ({source})")
+        return df
+    
+    def _obtener_area(self, bbox, days, source, timeout=None, fecha=None, estricto=False):
+        """Descarga y parsea el CSV de FIRMS para un bbox"""
         try:
-            # URL directa (formato de NASA FIRMS)
-            url = f"https://firms.modaps.eosdis.nasa.gov/api/area/csv/{self.api_key}/{source}/{self.bolivia_bbox['min_lat']},{self.bolivia_bbox['min_lon']},{self.bolivia_bbox['max_lat']},{self.bolivia_bbox['max_lon']}/{days}"
-            
-            logger.info(f"Consultando NASA FIRMS API...")
-            response = requests.get(url, timeout=30)
-            
-            if response.status_code != 200:
-                logger.error(f"Error HTTP {response.status_code}")
-                return pd.DataFrame()
+            logger.info(f"Consultando NASA FIRMS API ({source})...")
+            with self._abrir_csv(bbox, days, source, timeout, fecha) as archivo:
+                if archivo is None:
+                    if estricto:
+                        raise ErrorDescargaFirms(f"Respuesta HTTP con error ({source})")
+                    return pd.DataFrame()
+                content = archivo.read().decode('utf-8')
             
             # Verificar si hay contenido
-            content = response.text.strip()
+            content = content.strip()
             if not content or len(content) < 100:
                 logger.info("✅ No hay incendios detectados en el área especificada")
                 return pd.DataFrame()
@@ -83,6 +251,8 @@ class NASAFirmsUpdater:
             if missing:
                 logger.error(f"Faltan columnas requeridas: {missing}")
                 logger.info(f"Columnas disponibles: {df.columns.tolist()}")
+                if estricto:
+                    raise ErrorDescargaFirms(f"Faltan columnas requeridas: {missing}")
                 return pd.DataFrame()
             
             # Limpiar datos
@@ -92,116 +262,628 @@ class NASAFirmsUpdater:
                 logger.info("✅ CSV parseado pero sin datos válidos")
                 return pd.DataFrame()
             
-            logger.info(f"✅ {len(df)} incendios obtenidos exitosamente")
+            df = df.rename(columns=COLUMNAS_VIIRS)
+            
+            logger.info(f"✅ {len(df)} incendios obtenidos exitosamente ({source})")
             return df
             
         except Exception as e:
-            logger.error(f"Error en obtener_datos_nasa: {str(e)}")
+            logger.error(f"Error en obtener_datos_nasa ({source}): {str(e)}")
+            if estricto:
+                if isinstance(e, ErrorDescargaFirms):
+                    raise
+                raise ErrorDescargaFirms(f"{source}: {e}") from e
             return pd.DataFrame()
     
+    def iterar_datos_nasa(self, days=1, source='MODIS_NRT', timeout=None, chunksize=None, fecha=None,
+                          estricto=False):
+        """
+        Versión en streaming de obtener_datos_nasa: lee la respuesta con
+        stream=True y la parsea con read_csv(chunksize=...), entregando un
+        DataFrame por bloque. La memoria queda acotada al tamaño del bloque
+        sin importar cuántos días se pidan. Con estricto=True un error lanza
+        ErrorDescargaFirms (los bloques ya entregados quedan entregados).
+        """
+        if not self.api_key:
+            logger.error("API Key de NASA FIRMS no configurada")
+            return
+        
+        filas, columnas = self.tiles
+        for indice, bbox in enumerate(self.dividir_bbox(filas, columnas)):
+            fila, columna = divmod(indice, columnas)
+            for chunk in self._iterar_area(bbox, days, source, timeout, chunksize, fecha, estricto):
+                # Los puntos sobre bordes compartidos ya llegaron con la tesela anterior
+                if fila > 0:
+                    chunk = chunk[chunk['latitude'] != bbox['min_lat']]
+                if columna > 0:
+                    chunk = chunk[chunk['longitude'] != bbox['min_lon']]
+                if not chunk.empty:
+                    yield chunk
+    
+    def _iterar_area(self, bbox, days, source, timeout=None, chunksize=None, fecha=None, estricto=False):
+        """Descarga en streaming el CSV de FIRMS para un bbox, bloque a bloque"""
+        logger.info(f"Consultando NASA FIRMS API en streaming ({source})...")
+        
+        try:
+            with self._abrir_csv(bbox, days, source, timeout, fecha) as archivo:
+                if archivo is None:
+                    if estricto:
+                        raise ErrorDescargaFirms(f"Respuesta HTTP con error ({source})")
+                    return
+                
+                lector = pd.read_csv(
+                    archivo,
+                    chunksize=chunksize or self.chunksize,
+                    dtype={'acq_time': str},  # Mantener ceros a la izquierda
+                    on_bad_lines='skip'
+                )
+                
+                required_columns = ['latitude', 'longitude', 'acq_date', 'acq_time']
+                for chunk in lector:
+                    missing = [col for col in required_columns if col not in chunk.columns]
+                    if missing:
+                        logger.error(f"Faltan columnas requeridas: {missing}")
+                        if estricto:
+                            raise ErrorDescargaFirms(f"Faltan columnas requeridas: {missing}")
+                        return
+                    
+                    chunk = chunk.dropna(subset=['latitude', 'longitude'])
+                    if not chunk.empty:
+                        yield chunk.rename(columns=COLUMNAS_VIIRS)
+        
+        except pd.errors.EmptyDataError:
+            logger.info("✅ No hay incendios detectados en el área especificada")
+        except Exception as e:
+            logger.error(f"Error en iterar_datos_nasa ({source}): {str(e)}")
+            if estricto:
+                if isinstance(e, ErrorDescargaFirms):
+                    raise
+                raise ErrorDescargaFirms(f"{source}: {e}") from e
+    
+    def obtener_datos_multifuente(self, days=1, sources=None, timeout=None, fecha=None):
+        """
+        Descarga varias fuentes FIRMS en paralelo y las une en un DataFrame
+        con la columna 'source'.
+        
+        Cada fuente tiene su propio timeout y sus errores no afectan a las
+        demás; el tiempo total es aproximadamente el de la descarga más lenta.
+        Devuelve (df, resumen) donde resumen es {fuente: filas o 'error'}: las
+        fuentes se descargan en modo estricto, así una respuesta HTTP con
+        error o un CSV inválido cuenta como 'error' y no como 0 filas.
+        `days` puede ser un entero o un diccionario {fuente: días}.
+        """
+        sources = list(dict.fromkeys(sources or ['MODIS_NRT']))
+        timeout = timeout or self.timeout
+        resumen = {}
+        partes = []
+        
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='firms')
+        futuros = {
+            executor.submit(self.obtener_datos_nasa, days=self._dias(days, source), source=source,
+                            timeout=timeout, fecha=fecha, estricto=True): source
+            for source in sources
+        }
+        # Margen sobre el timeout HTTP para conexión + lectura del cuerpo,
+        # por cada ronda de teselas que procesa el pool de la fuente
+        rondas = -(-self.tiles[0] * self.tiles[1] // self.workers_tiles)
+        terminados, pendientes = wait(futuros, timeout=timeout * 2 * rondas)
+        executor.shutdown(wait=False, cancel_futures=True)
+        
+        for futuro in pendientes:
+            logger.error(f"Timeout descargando {futuros[futuro]}")
+            resumen[futuros[futuro]] = 'error'
+        
+        for futuro in terminados:
+            source = futuros[futuro]
+            try:
+                df = futuro.result()
+            except Exception as e:
+                logger.error(f"Error descargando {source}: {e}")
+                resumen[source] = 'error'
+                continue
+            resumen[source] = len(df)
+            if not df.empty:
+                partes.append(df.assign(source=source))
+        
+        if not partes:
+            return pd.DataFrame(), resumen
+        return pd.concat(partes, ignore_index=True), resumen
+    
     def identificar_departamento(self, lat, lon):
         """Identifica departamento basado en coordenadas"""
-        from monitoreo.models import Departamento
+        grilla = obtener_grilla('departamento')
+        if grilla is not None:
+            return cache_departamentos.obtener_departamento(grilla.nombres_para([lat], [lon])[0])
         
         for depto_nombre, limites in self.departamentos_coords.items():
             if (limites['min_lat'] <= lat <= limites['max_lat'] and
                 limites['min_lon'] <= lon <= limites['max_lon']):
                 
-                # Buscar o crear departamento
-                depto, created = Departamento.objects.get_or_create(
-                    nombre=depto_nombre,
-                    defaults={'codigo': depto_nombre[:2].upper()}
-                )
-                return depto
+                # Buscar o crear departamento (vía cache de proceso)
+                return cache_departamentos.obtener_departamento(depto_nombre)
         
         return None
     
-    def procesar_incendios(self, df):
-        """Procesa DataFrame y actualiza base de datos"""
-        from monitoreo.models import IncendioForestal
+    def asignar_departamentos(self, df):
+        """
+        Asigna el nombre de departamento a todo el DataFrame de una vez.
+        
+        Con límites reales configurados usa la grilla raster de polígonos;
+        si no, np.select evalúa las cajas en el orden de departamentos_coords
+        y toma la primera verdadera, igual que identificar_departamento.
+        """
+        lat = df['latitude'].to_numpy(dtype=float)
+        lon = df['longitude'].to_numpy(dtype=float)
+        
+        grilla = obtener_grilla('departamento')
+        if grilla is not None:
+            return pd.Series(grilla.nombres_para(lat, lon), index=df.index, dtype=object)
+        
+        condiciones = [
+            (lat >= limites['min_lat']) & (lat <= limites['max_lat']) &
+            (lon >= limites['min_lon']) & (lon <= limites['max_lon'])
+            for limites in self.departamentos_coords.values()
+        ]
+        nombres = np.select(condiciones, list(self.departamentos_coords), default=None)
+        return pd.Series(nombres, index=df.index, dtype=object)
+    
+    def asignar_municipios(self, df):
+        """Asigna el municipio a todo el DataFrame ('' si no hay límites cargados)"""
+        grilla = obtener_grilla('municipio')
+        if grilla is None:
+            return pd.Series('', index=df.index, dtype=object)
+        nombres = grilla.nombres_para(
+            df['latitude'].to_numpy(dtype=float),
+            df['longitude'].to_numpy(dtype=float)
+        )
+        return pd.Series(nombres, index=df.index, dtype=object).fillna('')
+    
+    def transformar(self, df):
+        """
+        Etapa de transformación vectorizada: deriva de una vez todas las
+        columnas que consume el escritor (métricas, fecha, ubicación).
+        
+        acq_date/acq_time de FIRMS están en UTC; fecha_deteccion se devuelve
+        como datetime con zona horaria settings.TIME_ZONE (America/La_Paz).
+        """
+        n = len(df)
+        
+        def columna(nombre, default):
+            if nombre in df.columns:
+                return df[nombre]
+            return pd.Series(default, index=df.index)
+        
+        acq_date = df['acq_date'].astype(str)
+        acq_time = df['acq_time'].astype(str).str.zfill(4)
+        
+        # Métricas
+        brillo = pd.to_numeric(columna('brightness', 300), errors='coerce').fillna(300).to_numpy(dtype=float)
+        intensidad = np.clip(brillo / 500, None, 1.0)
+        severidad = np.select(
+            [intensidad < 0.3, intensidad < 0.6, intensidad < 0.8],
+            ['bajo', 'medio', 'alto'],
+            default='critico'
+        )
         
+        # Estimar área afectada basada en FRP (Fire Radiative Power)
+        frp = pd.to_numeric(columna('frp', 0), errors='coerce').fillna(0).to_numpy(dtype=float)
+        area_estimada = frp * 0.15  # Conversión aproximada
+        
+        # Confianza: MODIS la reporta 0-100, VIIRS como l/n/h
+        if 'confidence' in df.columns:
+            confianza_txt = df['confidence'].astype(str).str.lower()
+            confianza = (pd.to_numeric(df['confidence'], errors='coerce') / 100).fillna(
+                confianza_txt.map(self.confianza_viirs)
+            ).fillna(0.7)
+        else:
+            confianza = pd.Series(0.7, index=df.index)
+        
+        # Fecha de detección: un solo to_datetime sobre "fecha hora" concatenados
+        fecha_deteccion = pd.to_datetime(
+            acq_date + ' ' + acq_time,
+            format='%Y-%m-%d %H%M',
+            errors='coerce',
+            utc=True
+        ).dt.tz_convert(settings.TIME_ZONE)
+        
+        brillo_t31 = pd.to_numeric(columna('bright_t31', np.nan), errors='coerce')
+        
+        transformado = pd.DataFrame({
+            'nombre': 'Incendio_' + acq_date + '_' + acq_time.str[:2] + 'h',
+            'latitud': df['latitude'].to_numpy(dtype=float),
+            'longitud': df['longitude'].to_numpy(dtype=float),
+            'clave_espacial': clave_espacial(df['latitude'].to_numpy(dtype=float),
+                                             df['longitude'].to_numpy(dtype=float)),
+            'intensidad': intensidad,
+            'severidad': severidad,
+            'area_afectada_ha': area_estimada,
+            'frp': frp,
+            'satelite': columna('satellite', 'MODIS').astype(str).to_numpy(),
+            'fuente_datos': 'NASA FIRMS',
+            'fecha_deteccion': fecha_deteccion,
+            'confianza_deteccion': confianza.to_numpy(dtype=float),
+            'estado': 'activo',
+            'brillo_temperatura': brillo_t31.astype(object).where(brillo_t31.notna(), None),
+            'pixel_size': 1.0,
+            'departamento': self.asignar_departamentos(df),
+            'municipio': self.asignar_municipios(df),
+        }, index=df.index)
+        
+        invalidas = transformado['fecha_deteccion'].isna()
+        if invalidas.any():
+            logger.error(f"Descartadas {int(invalidas.sum())} filas con fecha/hora inválida")
+            transformado = transformado[~invalidas]
+        
+        # Datetimes de Python para el ORM (evita Timestamps de pandas por fila)
+        transformado['fecha_deteccion'] = pd.Series(
+            np.asarray(transformado['fecha_deteccion'].dt.to_pydatetime(), dtype=object),
+            index=transformado.index,
+            dtype=object
+        )
+        logger.debug(f"Transformadas {len(transformado)} de {n} filas")
+        return transformado
+    
+    def procesar_incendios(self, df, bulk=None):
+        """Procesa DataFrame y actualiza base de datos"""
         if df.empty:
             logger.warning("DataFrame vacío, nada que procesar")
             return 0, 0
         
+        if bulk is None:
+            bulk = self.modo_bulk
+        
+        inicio = time.perf_counter()
+        cache_departamentos.refrescar_si_cambio()
+        
+        filas = self.transformar(df).to_dict('records')
+        
+        if bulk:
+            nuevos, actualizados, eventos = self._procesar_bulk(filas)
+        else:
+            nuevos, actualizados, eventos = self._procesar_por_fila(filas)
+        
+        if self.agrupar_eventos and nuevos:
+            actualizar_eventos(self.celda_evento_km, self.brecha_evento, self.batch_size)
+        if eventos:
+            # Una actualización cambia frp/área de detecciones ya agrupadas
+            with escritura():
+                recalcular_eventos(eventos, batch_size=self.batch_size)
+        
+        duracion = max(time.perf_counter() - inicio, 1e-6)
+        logger.info(f"Procesados: {nuevos} nuevos, {actualizados} actualizados")
+        logger.info(
+            f"⏱️ {len(df)} filas en {duracion:.2f}s "
+            f"({len(df) / duracion:.0f} filas/s, modo {'bulk' if bulk else 'por fila'})"
+        )
+        return nuevos, actualizados
+    
+    def _procesar_por_fila(self, filas):
+        """
+        Ruta original: una consulta y un save()/create() por detección.
+        Devuelve (nuevos, actualizados, ids de eventos de las actualizadas).
+        """
+        from monitoreo.models import IncendioForestal
+        
         nuevos = 0
         actualizados = 0
+        eventos = set()
+        tol = self.tolerancia_duplicado
+        resumen = DeltasResumen()
         
-        for _, row in df.iterrows():
+        for valores in filas:
             try:
-                # Crear ID único para el incendio
-                fire_id = f"{row['latitude']:.4f}_{row['longitude']:.4f}_{row['acq_date']}_{row['acq_time']}"
-                
-                # Crear nombre descriptivo
-                nombre = f"Incendio_{row['acq_date']}_{row['acq_time'][:2]}h"
-                
-                # Identificar departamento
-                departamento = self.identificar_departamento(row['latitude'], row['longitude'])
-                
-                # Calcular métricas
-                intensidad = min(row.get('brightness', 300) / 500, 1.0)
-                
-                if intensidad < 0.3:
-                    severidad = 'bajo'
-                elif intensidad < 0.6:
-                    severidad = 'medio'
-                elif intensidad < 0.8:
-                    severidad = 'alto'
-                else:
-                    severidad = 'critico'
+                lat = valores['latitud']
+                lon = valores['longitud']
                 
-                # Estimar área afectada basada en FRP (Fire Radiative Power)
-                area_estimada = row.get('frp', 0) * 0.15  # Conversión aproximada
+                # Búsqueda y escritura en la misma transacción: otra ingesta
+                # simultánea no puede crear el duplicado entre ambas
+                with escritura():
+                    # Buscar si ya existe un incendio similar
+                    incendio_existente = IncendioForestal.objects.filter(
+                        latitud__range=(lat - tol, lat + tol),
+                        longitud__range=(lon - tol, lon + tol),
+                        fecha_deteccion__date=timezone.localdate(valores['fecha_deteccion'])
+                    ).first()
                 
-                # Crear fecha de detección
-                fecha_deteccion = datetime.strptime(
-                    f"{row['acq_date']} {str(row['acq_time']).zfill(4)}", 
-                    '%Y-%m-%d %H%M'
-                )
-                
-                # Buscar si ya existe un incendio similar
-                incendio_existente = IncendioForestal.objects.filter(
-                    latitud__range=(row['latitude'] - 0.01, row['latitude'] + 0.01),
-                    longitud__range=(row['longitude'] - 0.01, row['longitude'] + 0.01),
-                    fecha_deteccion__date=fecha_deteccion.date()
-                ).first()
-                
-                if incendio_existente:
-                    # Actualizar existente
-                    incendio_existente.intensidad = intensidad
-                    incendio_existente.severidad = severidad
-                    incendio_existente.area_afectada_ha = area_estimada
-                    incendio_existente.save()
-                    actualizados += 1
-                else:
-                    # Crear nuevo
-                    IncendioForestal.objects.create(
-                        nombre=nombre,
-                        latitud=row['latitude'],
-                        longitud=row['longitude'],
-                        departamento=departamento,
-                        intensidad=intensidad,
-                        severidad=severidad,
-                        area_afectada_ha=area_estimada,
-                        satelite=row.get('satellite', 'MODIS'),
-                        fuente_datos='NASA FIRMS',
-                        fecha_deteccion=fecha_deteccion,
-                        confianza_deteccion=row.get('confidence', 50) / 100 if 'confidence' in row else 0.7,
-                        estado='activo',
-                        brillo_temperatura=row.get('bright_t31'),
-                        pixel_size=1.0
-                    )
-                    nuevos += 1
+                    if incendio_existente:
+                        # Actualizar existente
+                        resumen.sumar_incendio(incendio_existente, signo=-1)
+                        incendio_existente.intensidad = valores['intensidad']
+                        incendio_existente.severidad = valores['severidad']
+                        incendio_existente.area_afectada_ha = valores['area_afectada_ha']
+                        incendio_existente.frp = valores['frp']
+                        incendio_existente.save()
+                        resumen.sumar_incendio(incendio_existente)
+                        if incendio_existente.evento_id:
+                            eventos.add(incendio_existente.evento_id)
+                        actualizados += 1
+                    else:
+                        # Crear nuevo
+                        incendio = IncendioForestal.objects.create(**{
+                            **valores,
+                            'departamento': cache_departamentos.obtener_departamento(valores['departamento'])
+                        })
+                        resumen.sumar_incendio(incendio)
+                        nuevos += 1
                     
             except Exception as e:
                 logger.error(f"Error procesando fila: {e}")
                 continue
         
-        logger.info(f"Procesados: {nuevos} nuevos, {actualizados} actualizados")
-        return nuevos, actualizados
+        resumen.aplicar()
+        return nuevos, actualizados, eventos
+    
+    def _procesar_bulk(self, filas):
+        """
+        Ruta bulk: escribe con bulk_create/bulk_update en transacciones cortas
+        de `filas_por_transaccion` filas, para no bloquear a otros escritores.
+        
+        Cada bloque busca sus candidatos a duplicado dentro de su propia
+        transacción de escritura (BEGIN IMMEDIATE): otra ingesta simultánea
+        (trabajo web, backfill, comando) no puede escribir entre la búsqueda
+        y la escritura, así ninguna duplica las detecciones de la otra.
+        
+        Reproduce la semántica de la ruta por fila: una detección se empareja
+        con el incendio más reciente a ±tolerancia del mismo día, incluidos los
+        creados por filas anteriores del mismo DataFrame. Devuelve (nuevos,
+        actualizados, ids de eventos de las actualizadas).
+        """
+        nuevos = 0
+        actualizados = 0
+        eventos = set()
+        paso = self.filas_por_transaccion
+        for inicio in range(0, len(filas), paso):
+            with escritura():
+                n, a, escritos = self._escribir_bloque(filas[inicio:inicio + paso])
+            nuevos += n
+            actualizados += a
+            eventos.update(i.evento_id for i in escritos if i.pk and i.evento_id)
+            teselas.invalidar([i.latitud for i in escritos], [i.longitud for i in escritos])
+        
+        return nuevos, actualizados, eventos
+    
+    def _escribir_bloque(self, filas):
+        """
+        Empareja y escribe un bloque de filas; llamar dentro de escritura().
+        Devuelve (nuevos, actualizados, incendios escritos).
+        """
+        from monitoreo.models import IncendioForestal
+        
+        tol = self.tolerancia_duplicado
+        latitudes = [f['latitud'] for f in filas]
+        longitudes = [f['longitud'] for f in filas]
+        fechas = {timezone.localdate(f['fecha_deteccion']) for f in filas}
+        
+        nuevos = 0
+        actualizados = 0
+        por_crear = []
+        por_actualizar = {}
+        originales = {}
+        
+        # Una sola consulta para todos los posibles duplicados del bloque
+        existentes = IncendioForestal.objects.filter(
+            fecha_deteccion__date__in=fechas,
+            latitud__range=(min(latitudes) - tol, max(latitudes) + tol),
+            longitud__range=(min(longitudes) - tol, max(longitudes) + tol),
+        ).only(
+            'id', 'latitud', 'longitud', 'fecha_deteccion', 'departamento_id', 'satelite',
+            'intensidad', 'severidad', 'area_afectada_ha', 'frp', 'evento_id'
+        )
+        
+        # Índice en memoria por (celda_x, celda_y, fecha): búsqueda O(1) por fila
+        indice = IndiceEspacioTemporal(tolerancia=tol)
+        for incendio in existentes:
+            indice.agregar(incendio, timezone.localdate(incendio.fecha_deteccion))
+        
+        ahora = timezone.now()
+        for valores in filas:
+            lat = valores['latitud']
+            lon = valores['longitud']
+            fecha = timezone.localdate(valores['fecha_deteccion'])
+            incendio_existente = indice.buscar(lat, lon, fecha)
+            
+            if incendio_existente:
+                if incendio_existente.pk and incendio_existente.pk not in originales:
+                    # Valores originales, para restarlos una sola vez del resumen
+                    originales[incendio_existente.pk] = (
+                        incendio_existente.fecha_deteccion, incendio_existente.departamento_id,
+                        incendio_existente.severidad, incendio_existente.satelite,
+                        incendio_existente.area_afectada_ha, incendio_existente.intensidad,
+                    )
+                incendio_existente.intensidad = valores['intensidad']
+                incendio_existente.severidad = valores['severidad']
+                incendio_existente.area_afectada_ha = valores['area_afectada_ha']
+                incendio_existente.frp = valores['frp']
+                if incendio_existente.pk:
+                    incendio_existente.fecha_ultima_actualizacion = ahora
+                    por_actualizar[incendio_existente.pk] = incendio_existente
+                actualizados += 1
+            else:
+                incendio = IncendioForestal(**{
+                    **valores,
+                    'departamento': cache_departamentos.obtener_departamento(valores['departamento'])
+                })
+                por_crear.append(incendio)
+                indice.agregar(incendio, fecha)
+                nuevos += 1
+        
+        por_actualizar = list(por_actualizar.values())
+        
+        # Resumen diario del bloque: se resta lo original y se suma lo final
+        resumen = DeltasResumen()
+        for incendio in por_actualizar:
+            resumen.sumar(*originales[incendio.pk], signo=-1)
+        for incendio in por_crear + por_actualizar:
+            resumen.sumar_incendio(incendio)
+        
+        IncendioForestal.objects.bulk_create(por_crear, batch_size=self.batch_size)
+        IncendioForestal.objects.bulk_update(
+            por_actualizar,
+            ['intensidad', 'severidad', 'area_afectada_ha', 'frp', 'fecha_ultima_actualizacion'],
+            batch_size=self.batch_size
+        )
+        resumen.aplicar()
+        return nuevos, actualizados, por_crear + por_actualizar
+    
+    def _dias(self, days, source):
+        return days.get(source, self.dias_maximos) if isinstance(days, dict) else days
+    
+    def dias_pendientes(self, sources, days):
+        """
+        Ventana mínima de días (por fuente) que cubre el hueco desde la marca
+        de agua, con `days` como máximo. FIRMS cuenta días UTC hacia atrás
+        incluyendo el actual.
+        """
+        from monitoreo.models import MarcaIngesta
+        
+        marcas = dict(MarcaIngesta.objects.filter(fuente__in=sources)
+                      .values_list('fuente', 'ultima_adquisicion'))
+        hoy = datetime.now(dt_timezone.utc).date()
+        dias = {}
+        for source in sources:
+            if source not in marcas:
+                dias[source] = days
+                continue
+            desde = (marcas[source] - self.margen_marca).astimezone(dt_timezone.utc).date()
+            dias[source] = max(1, min(days, self.dias_maximos, (hoy - desde).days + 1))
+        return dias
+    
+    def _adquisicion_utc(self, df):
+        return pd.to_datetime(
+            df['acq_date'].astype(str) + ' ' + df['acq_time'].astype(str).str.zfill(4),
+            format='%Y-%m-%d %H%M',
+            errors='coerce',
+            utc=True
+        )
+    
+    def huellas(self, df):
+        """
+        Hash de contenido (int64) de cada fila FIRMS, estable entre corridas.
+        Se calcula sobre texto para no depender de los dtypes inferidos al
+        unir fuentes distintas.
+        """
+        columnas = [c for c in COLUMNAS_HUELLA if c in df.columns]
+        normalizado = df[columnas].astype(str).assign(
+            acq_time=df['acq_time'].astype(str).str.zfill(4)
+        )
+        return pd.util.hash_pandas_object(normalizado, index=False).to_numpy().view(np.int64)
+    
+    def descartar_vistas(self, df):
+        """
+        Elimina las filas cuyo hash ya se procesó en corridas anteriores.
+        Devuelve (df_filtrado, huellas) con las huellas de todas las filas.
+        """
+        from monitoreo.models import HuellaDeteccion
+        
+        huellas = self.huellas(df)
+        desde = self._adquisicion_utc(df).min()
+        vistas = set(HuellaDeteccion.objects.filter(
+            fecha_adquisicion__gte=desde
+        ).values_list('huella', flat=True)) if pd.notna(desde) else set()
+        
+        nuevas = ~np.isin(huellas, list(vistas))
+        if not nuevas.all():
+            logger.info(f"♻️ Descartadas {int((~nuevas).sum())} detecciones ya ingeridas")
+        return df[nuevas], huellas[nuevas]
+    
+    def registrar_vistas(self, df, huellas):
+        """Guarda las huellas procesadas y avanza la marca de agua de cada fuente"""
+        from monitoreo.models import HuellaDeteccion, MarcaIngesta
+        
+        if df.empty:
+            return
+        
+        adquisicion = self._adquisicion_utc(df)
+        fuentes = df['source'] if 'source' in df.columns else pd.Series('MODIS_NRT', index=df.index)
+        HuellaDeteccion.objects.bulk_create(
+            [
+                HuellaDeteccion(huella=int(h), fuente=f, fecha_adquisicion=a.to_pydatetime())
+                for h, f, a in zip(huellas, fuentes, adquisicion)
+                if pd.notna(a)
+            ],
+            batch_size=self.batch_size,
+            ignore_conflicts=True
+        )
+        
+        for source, maxima in adquisicion.groupby(fuentes.to_numpy()).max().items():
+            if pd.isna(maxima):
+                continue
+            marca, created = MarcaIngesta.objects.get_or_create(
+                fuente=source, defaults={'ultima_adquisicion': maxima.to_pydatetime()}
+            )
+            if not created and marca.ultima_adquisicion < maxima:
+                marca.ultima_adquisicion = maxima.to_pydatetime()
+                marca.save()
+    
+    def purgar_huellas(self):
+        """Las huellas solo sirven dentro de la ventana máxima de FIRMS"""
+        from monitoreo.models import HuellaDeteccion
+        
+        limite = timezone.now() - timedelta(days=self.dias_maximos + 1)
+        HuellaDeteccion.objects.filter(fecha_adquisicion__lt=limite).delete()
     
-    def ejecutar_actualizacion(self, days=7):
-        """Ejecuta la actualización completa"""
+    def _procesar_en_streaming(self, days, sources, chunksize=None, fecha=None, incremental=False,
+                               progreso=None):
+        """
+        Descarga las fuentes en hilos productores y escribe cada bloque en el
+        hilo actual a medida que llega. La cola acotada limita la memoria a
+        unos pocos bloques aunque la red vaya más rápido que la escritura.
+        """
+        sources = list(dict.fromkeys(sources or ['MODIS_NRT']))
+        cola = queue.Queue(maxsize=self.bloques_en_cola)
+        fin = object()
+        
+        def productor(source):
+            filas = 0
+            try:
+                for chunk in self.iterar_datos_nasa(days=self._dias(days, source), source=source,
+                                                    chunksize=chunksize, fecha=fecha, estricto=True):
+                    filas += len(chunk)
+                    cola.put(chunk.assign(source=source))
+            except Exception as e:
+                logger.error(f"Error descargando {source}: {e}")
+                filas = 'error'
+            finally:
+                cola.put((fin, source, filas))
+        
+        for source in sources:
+            threading.Thread(target=productor, args=(source,), daemon=True,
+                             name=f'firms-stream-{source}').start()
+        
+        nuevos = 0
+        actualizados = 0
+        fuentes = {}
+        pendientes = len(sources)
+        while pendientes:
+            item = cola.get()
+            if isinstance(item, tuple) and item[0] is fin:
+                fuentes[item[1]] = item[2]
+                pendientes -= 1
+                continue
+            filas = len(item)
+            if incremental:
+                item, huellas = self.descartar_vistas(item)
+            if not item.empty:
+                n, a = self.procesar_incendios(item)
+                nuevos += n
+                actualizados += a
+            if incremental:
+                self.registrar_vistas(item, huellas)
+            if progreso:
+                progreso('escritura', filas)
+        
+        return nuevos, actualizados, fuentes
+    
+    def ejecutar_actualizacion(self, days=7, sources=None, streaming=None, chunksize=None, fecha=None,
+                               incremental=None, progreso=None):
+        """
+        Ejecuta la actualización completa.
+        
+        `progreso`, si se indica, se llama como progreso(etapa, filas) al
+        cambiar de etapa y con las filas procesadas de cada bloque.
+        """
+        if progreso is None:
+            progreso = lambda etapa, filas=0: None
         
         # INICIALIZAR VARIABLES primero
         nuevos = 0
@@ -209,16 +891,61 @@ class NASAFirmsUpdater:
         total = 0
         activos = 0
         
+        if streaming is None:
+            streaming = self.streaming
+        if incremental is None:
+            incremental = self.incremental
+        sources = list(dict.fromkeys(sources or ['MODIS_NRT']))
+        
         logger.info("=" * 50)
         logger.info("INICIANDO ACTUALIZACIÓN NASA FIRMS")
         logger.info("=" * 50)
         
-        # Obtener datos
-        df = self.obtener_datos_nasa(days=days)
+        dias = days
+        if incremental and fecha is None:
+            dias = self.dias_pendientes(sources, days)
+            logger.info(f"🕒 Ventana incremental (días por fuente): {dias}")
         
-        if not df.empty:
-            nuevos, actualizados = self.procesar_incendios(df)
-            
+        inicio = time.perf_counter()
+        cache_antes = self.cache.estadisticas() if self.cache else None
+        progreso('descarga')
+        if streaming:
+            # Descarga, transformación y escritura bloque a bloque
+            nuevos, actualizados, fuentes = self._procesar_en_streaming(
+                dias, sources, chunksize, fecha, incremental, progreso
+            )
+            hay_datos = any(filas and filas != 'error' for filas in fuentes.values())
+        else:
+            # Obtener datos (todas las fuentes en paralelo)
+            df, fuentes = self.obtener_datos_multifuente(days=dias, sources=sources, fecha=fecha)
+            hay_datos = not df.empty
+        logger.info(f"📡 {len(fuentes)} fuente(s) en {time.perf_counter() - inicio:.1f}s: {fuentes}")
+        
+        cache = None
+        if self.cache:
+            cache = {k: v - cache_antes[k] for k, v in self.cache.estadisticas().items()}
+            logger.info(f"📦 Cache FIRMS: {cache['hits']} hits, {cache['misses']} misses")
+        
+        if hay_datos:
+            if not streaming:
+                progreso('escritura')
+                filas = len(df)
+                if incremental:
+                    df, huellas = self.descartar_vistas(df)
+                nuevos, actualizados = self.procesar_incendios(df)
+                if incremental:
+                    self.registrar_vistas(df, huellas)
+                progreso('estadisticas', filas)
+            if incremental:
+                self.purgar_huellas()
+        
+        # Ciclo de vida: el tiempo avanza aunque no lleguen datos nuevos
+        progreso('estados')
+        estados = actualizar_estados()
+        actualizar_clusters()
+        actualizar_densidad()
+        
+        if hay_datos:
             # Estadísticas
             from monitoreo.models import IncendioForestal
             total = IncendioForestal.objects.count()
@@ -240,5 +967,8 @@ class NASAFirmsUpdater:
             'nuevos': nuevos,
             'actualizados': actualizados,
             'total': total,
-            'activos': activos
+            'activos': activos,
+            'fuentes': fuentes,
+            'cache': cache,
+            'estados': estados['incendios']
         }
\ No newline at end of file
@@ -0,0 +1,261 @@
+# monitoreo/utils/planificador.py
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from monitoreo.utils.limites import BBOX_BOLIVIA
+
+logger = logging.getLogger(__name__)
+
+# Hora solar local aproximada de los pasos sobre Bolivia (diurno y nocturno).
+# MODIS combina Terra (~10:30/22:30) y Aqua (~13:30/01:30); los VIIRS van en
+# la órbita de Aqua con pocos minutos de diferencia entre sí.
+HORAS_PASO = {
+    'MODIS_NRT': (10.5, 22.5, 13.5, 1.5),
+    'VIIRS_SNPP_NRT': (13.5, 1.5),
+    'VIIRS_NOAA20_NRT': (12.7, 0.7),
+    'VIIRS_NOAA21_NRT': (13.1, 1.1),
+}
+
+# Hora UTC = hora solar local - longitud / 15 (centro del bbox de Bolivia)
+DESFASE_UTC = -(BBOX_BOLIVIA['min_lon'] + BBOX_BOLIVIA['max_lon']) / 2 / 15
+
+Ventana = namedtuple('Ventana', 'fuente paso inicio fin')
+
+
+def pasos(fuente, desde, hasta):
+    """Horas UTC estimadas de paso de `fuente` entre desde y hasta"""
+    dia = desde.date() - timedelta(days=1)
+    while dia <= hasta.date():
+        base = datetime(dia.year, dia.month, dia.day, tzinfo=dt_timezone.utc)
+        for hora in HORAS_PASO.get(fuente, ()):
+            paso = base + timedelta(hours=hora + DESFASE_UTC)
+            if desde <= paso <= hasta:
+                yield paso
+        dia += timedelta(days=1)
+
+
+class PlanificadorPasos:
+    """
+    Decide cuándo consultar cada fuente FIRMS según sus ventanas de publicación.
+
+    Tras cada paso, FIRMS publica los datos NRT con una latencia de entre
+    `latencia[0]` y `latencia[1]`. Dentro de esa ventana se consulta seguido
+    (intervalo creciente desde `intervalo_inicial` hasta `intervalo_ventana`);
+    en cuanto la marca de agua de la fuente alcanza el paso, la ventana se da
+    por cubierta y se duerme hasta la siguiente. Fuera de las ventanas solo
+    hay una consulta de seguridad cada `intervalo_seguridad`. Todos los
+    intervalos llevan jitter para no coincidir con otras instalaciones.
+    """
+
+    def __init__(self, fuentes, latencia=(timedelta(minutes=40), timedelta(hours=4)),
+                 intervalo_inicial=300, intervalo_ventana=1800, factor=1.5,
+                 intervalo_seguridad=6 * 3600, holgura=timedelta(hours=1), jitter=0.15,
+                 semilla=None):
+        self.fuentes = list(fuentes)
+        self.latencia = latencia
+        self.intervalo_inicial = intervalo_inicial
+        self.intervalo_ventana = intervalo_ventana
+        self.factor = factor
+        self.intervalo_seguridad = intervalo_seguridad
+        self.holgura = holgura
+        self.jitter = jitter
+        self.aleatorio = random.Random(semilla)
+
+        self.proxima = {}
+        self._intervalo = {}
+        self._ventana = {}
+
+    def ventanas(self, fuente, desde, hasta):
+        """Ventanas de publicación de `fuente` que se solapan con [desde, hasta]"""
+        for paso in pasos(fuente, desde - self.latencia[1], hasta):
+            yield Ventana(fuente, paso, paso + self.latencia[0], paso + self.latencia[1])
+
+    def _cubierta(self, ventana, marcas):
+        marca = marcas.get(ventana.fuente)
+        return marca is not None and marca >= ventana.paso - self.holgura
+
+    def _con_jitter(self, segundos):
+        return segundos * (1 + self.aleatorio.uniform(-self.jitter, self.jitter))
+
+    def ventana_activa(self, fuente, ahora, marcas):
+        """Ventana abierta y aún no cubierta de la fuente, o None"""
+        for ventana in self.ventanas(fuente, ahora, ahora):
+            if ventana.inicio <= ahora < ventana.fin and not self._cubierta(ventana, marcas):
+                return ventana
+        return None
+
+    def fuentes_a_consultar(self, ahora):
+        """Fuentes cuya próxima consulta ya venció (al arrancar, todas)"""
+        return [f for f in self.fuentes if self.proxima.get(f, ahora) <= ahora]
+
+    def registrar_consulta(self, fuente, ahora, marcas):
+        """Programa la siguiente consulta de `fuente` tras consultarla en `ahora`"""
+        ventana = self.ventana_activa(fuente, ahora, marcas)
+        if ventana is not None:
+            # Dentro de la ventana: intervalo creciente mientras no lleguen datos
+            if self._ventana.get(fuente) == ventana.paso:
+                intervalo = min(self._intervalo[fuente] * self.factor, self.intervalo_ventana)
+            else:
+                intervalo = self.intervalo_inicial
+            self._ventana[fuente] = ventana.paso
+            self._intervalo[fuente] = intervalo
+            self.proxima[fuente] = ahora + timedelta(seconds=self._con_jitter(intervalo))
+            return self.proxima[fuente]
+
+        # Fuera de ventana: dormir hasta la próxima, con tope de seguridad
+        self._ventana.pop(fuente, None)
+        tope = ahora + timedelta(seconds=self._con_jitter(self.intervalo_seguridad))
+        siguiente = tope
+        for ventana in self.ventanas(fuente, ahora, tope):
+            if ventana.inicio > ahora and not self._cubierta(ventana, marcas):
+                siguiente = min(siguiente, ventana.inicio)
+        if siguiente < tope:
+            # Pequeño desfase positivo para repartir la carga al abrir la ventana
+            siguiente += timedelta(seconds=self.aleatorio.uniform(0, self.jitter * self.intervalo_inicial))
+        self.proxima[fuente] = siguiente
+        return siguiente
+
+    def espera(self, ahora):
+        """Segundos hasta la próxima consulta programada"""
+        if len(self.proxima) < len(self.fuentes):
+            return 0.0
+        return max((min(self.proxima.values()) - ahora).total_seconds(), 0.0)
+
+
+def _proceso_vivo(pid):
+    if os.name == 'nt':
+        # En Windows os.kill(pid, 0) no sirve de sonda; se confía en el latido
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class BloqueoInstancia:
+    """
+    Archivo de bloqueo que impide correr dos planificadores a la vez.
+
+    Guarda el pid del dueño y se renueva (mtime) como latido; un bloqueo de
+    un proceso muerto o sin latido por más de `vencimiento` segundos se
+    considera abandonado y se reemplaza.
+    """
+
+    def __init__(self, ruta, vencimiento=1800):
+        self.ruta = Path(ruta)
+        self.vencimiento = vencimiento
+        self.adquirido = False
+
+    def _abandonado(self):
+        try:
+            pid = int(self.ruta.read_text().strip())
+            edad = time.time() - self.ruta.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        except ValueError:
+            return True
+        return edad > self.vencimiento or not _proceso_vivo(pid)
+
+    def adquirir(self):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._abandonado():
+                    return False
+                logger.warning(f"🔓 Bloqueo abandonado en {self.ruta}, se reemplaza")
+                self.ruta.unlink(missing_ok=True)
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            self.adquirido = True
+            return True
+        return False
+
+    def renovar(self):
+        if self.adquirido:
+            os.utime(self.ruta)
+
+    def liberar(self):
+        if not self.adquirido:
+            return
+        try:
+            if int(self.ruta.read_text().strip()) == os.getpid():
+                self.ruta.unlink()
+        except (FileNotFoundError, ValueError):
+            pass
+        self.adquirido = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
+
+
+def instalar_senales(parar):
+    """SIGINT/SIGTERM marcan el evento; la actualización en curso termina antes de salir"""
+
+    def manejador(signum, frame):
+        logger.info(f"⏹️  Señal {signum} recibida, deteniendo al terminar el ciclo")
+        parar.set()
+
+    for nombre in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+        senal = getattr(signal, nombre, None)
+        if senal is not None:
+            signal.signal(senal, manejador)
+
+
+def _marcas():
+    from monitoreo.models import MarcaIngesta
+
+    return dict(MarcaIngesta.objects.values_list('fuente', 'ultima_adquisicion'))
+
+
+def vigilar(updater, fuentes, days, planificador=None, parar=None, bloqueo=None,
+            latido=300, reloj=None):
+    """
+    Bucle del modo --watch: consulta solo las fuentes que el planificador
+    indica y duerme hasta la siguiente, renovando el bloqueo como latido.
+    Devuelve el número de ciclos de actualización ejecutados.
+    """
+    from django.db import close_old_connections
+
+    planificador = planificador or PlanificadorPasos(fuentes)
+    parar = parar or threading.Event()
+    reloj = reloj or (lambda: datetime.now(dt_timezone.utc))
+    ciclos = 0
+
+    while not parar.is_set():
+        close_old_connections()
+        ahora = reloj()
+        pendientes = planificador.fuentes_a_consultar(ahora)
+        if pendientes:
+            logger.info(f"🛰️  Consultando {pendientes}")
+            try:
+                updater.ejecutar_actualizacion(days=days, sources=pendientes)
+            except Exception:
+                logger.exception("Error en la actualización programada")
+            ciclos += 1
+            marcas = _marcas()
+            ahora = reloj()
+            for fuente in pendientes:
+                siguiente = planificador.registrar_consulta(fuente, ahora, marcas)
+                logger.info(f"⏰ {fuente}: próxima consulta {siguiente:%Y-%m-%d %H:%M} UTC")
+
+        if bloqueo:
+            bloqueo.renovar()
+        parar.wait(min(planificador.espera(reloj()), latido))
+
+    return ciclos
@@ -0,0 +1,133 @@
+# monitoreo/utils/resumen.py
+import logging
+from collections import defaultdict
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from monitoreo.utils.conexion_sqlite import escritura
+
+logger = logging.getLogger(__name__)
+
+
+class DeltasResumen:
+    """
+    Acumula cambios del resumen diario durante una escritura y los aplica al
+    final con un UPDATE ... SET total = total + delta por clave (o un INSERT si
+    la clave es nueva). Clave: (fecha local, departamento, severidad, satélite).
+    """
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def __len__(self):
+        return len(self._deltas)
+
+    def sumar(self, fecha_deteccion, departamento_id, severidad, satelite, area, intensidad, signo=1):
+        clave = (timezone.localdate(fecha_deteccion), departamento_id, severidad, satelite)
+        delta = self._deltas[clave]
+        delta[0] += signo
+        delta[1] += signo * (area or 0)
+        delta[2] += signo * (intensidad or 0)
+
+    def sumar_incendio(self, incendio, signo=1):
+        self.sumar(incendio.fecha_deteccion, incendio.departamento_id, incendio.severidad,
+                   incendio.satelite, incendio.area_afectada_ha, incendio.intensidad, signo)
+
+    def aplicar(self):
+        from monitoreo.models import ResumenDiario
+
+        deltas = {c: d for c, d in self._deltas.items() if any(d)}
+        if not deltas:
+            return 0
+
+        ahora = timezone.now()
+        with escritura():
+            fechas = {clave[0] for clave in deltas}
+            existentes = {
+                (r.fecha, r.departamento_id, r.severidad, r.satelite): r.pk
+                for r in ResumenDiario.objects.filter(fecha__in=fechas).only(
+                    'id', 'fecha', 'departamento_id', 'severidad', 'satelite'
+                )
+            }
+            por_crear = []
+            for clave, (total, area, intensidad) in deltas.items():
+                pk = existentes.get(clave)
+                if pk is None:
+                    fecha, departamento_id, severidad, satelite = clave
+                    por_crear.append(ResumenDiario(
+                        fecha=fecha, departamento_id=departamento_id, severidad=severidad,
+                        satelite=satelite, total=total, area_total_ha=area,
+                        suma_intensidad=intensidad, fecha_actualizacion=ahora,
+                    ))
+                else:
+                    ResumenDiario.objects.filter(pk=pk).update(
+                        total=F('total') + total,
+                        area_total_ha=F('area_total_ha') + area,
+                        suma_intensidad=F('suma_intensidad') + intensidad,
+                        fecha_actualizacion=ahora,
+                    )
+            ResumenDiario.objects.bulk_create(por_crear)
+        self._deltas.clear()
+        return len(deltas)
+
+
+def agregados_desde_detecciones(IncendioForestal):
+    """Agregados por (fecha local, departamento, severidad, satélite) calculados desde cero"""
+    return IncendioForestal.objects.annotate(
+        dia=TruncDate('fecha_deteccion', tzinfo=timezone.get_current_timezone())
+    ).values('dia', 'departamento_id', 'severidad', 'satelite').annotate(
+        n=Count('id'), area=Sum('area_afectada_ha'), intensidad=Sum('intensidad')
+    ).order_by()
+
+
+def reconstruir_resumen(IncendioForestal=None, ResumenDiario=None, batch_size=500):
+    """
+    Recalcula toda la tabla de resumen (también usado por la migración inicial)
+    a partir de las detecciones vivas y de las archivadas en Parquet.
+    """
+    from monitoreo.utils.archivo_historico import agregados_historicos
+
+    if IncendioForestal is None or ResumenDiario is None:
+        from monitoreo.models import IncendioForestal, ResumenDiario
+
+    agregados = defaultdict(lambda: [0, 0.0, 0.0])
+    for fila in [*agregados_desde_detecciones(IncendioForestal), *agregados_historicos()]:
+        acumulado = agregados[(fila['dia'], fila['departamento_id'], fila['severidad'], fila['satelite'])]
+        acumulado[0] += fila['n']
+        acumulado[1] += fila['area'] or 0
+        acumulado[2] += fila['intensidad'] or 0
+
+    ahora = timezone.now()
+    with escritura():
+        ResumenDiario.objects.all().delete()
+        filas = [
+            ResumenDiario(
+                fecha=fecha, departamento_id=departamento_id, severidad=severidad, satelite=satelite,
+                total=total, area_total_ha=area, suma_intensidad=intensidad, fecha_actualizacion=ahora,
+            )
+            for (fecha, departamento_id, severidad, satelite), (total, area, intensidad) in agregados.items()
+        ]
+        ResumenDiario.objects.bulk_create(filas, batch_size=batch_size)
+    logger.info(f"📊 Resumen diario reconstruido: {len(filas)} filas")
+    return len(filas)
+
+
+def estadisticas_generales():
+    """Totales del resumen: costo constante respecto del historial de detecciones"""
+    from monitoreo.models import ResumenDiario
+
+    datos = ResumenDiario.objects.aggregate(
+        detecciones=Sum('total'),
+        area=Sum('area_total_ha'),
+        intensidad=Sum('suma_intensidad'),
+        hoy=Sum('total', filter=Q(fecha=timezone.localdate())),
+    )
+    total = datos['detecciones'] or 0
+    return {
+        'total_incendios': total,
+        'area_total': datos['area'] or 0,
+        'promedio_intensidad': (datos['intensidad'] or 0) / total if total else 0,
+        'incendios_hoy': datos['hoy'] or 0,
+    }
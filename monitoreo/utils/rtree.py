@@ -0,0 +1,195 @@
+# monitoreo/utils/rtree.py
+import logging
+import math
+
+import numpy as np
+
+from django.db import DatabaseError, connection as conexion_defecto
+
+from monitoreo.utils.clave_espacial import bbox_radio
+from monitoreo.utils.limites import _anillos, _aristas, puntos_en_poligono
+
+logger = logging.getLogger(__name__)
+
+RADIO_TIERRA_KM = 6371.0
+
+# Índices R-tree de SQLite (tabla virtual) sincronizados por triggers con la tabla origen
+INDICES = {
+    'monitoreo_incendio_rtree': {
+        'tabla': 'monitoreo_incendioforestal',
+        'columnas': ('latitud', 'latitud', 'longitud', 'longitud'),
+    },
+    'monitoreo_areaprotegida_rtree': {
+        'tabla': 'monitoreo_areaprotegida',
+        'columnas': ('min_latitud', 'max_latitud', 'min_longitud', 'max_longitud'),
+    },
+}
+
+
+_disponible = {}
+
+
+def _sql_indice(nombre, tabla, columnas):
+    nuevos = ', '.join(f'new.{c}' for c in columnas)
+    origen = ', '.join(columnas)
+    vigiladas = ', '.join(dict.fromkeys(columnas))
+    return [
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {nombre} USING rtree(id, min_lat, max_lat, min_lon, max_lon)',
+        f'CREATE TRIGGER IF NOT EXISTS {nombre}_ai AFTER INSERT ON {tabla} BEGIN '
+        f'INSERT OR REPLACE INTO {nombre} VALUES (new.id, {nuevos}); END',
+        f'CREATE TRIGGER IF NOT EXISTS {nombre}_au AFTER UPDATE OF {vigiladas} ON {tabla} BEGIN '
+        f'INSERT OR REPLACE INTO {nombre} VALUES (new.id, {nuevos}); END',
+        f'CREATE TRIGGER IF NOT EXISTS {nombre}_ad AFTER DELETE ON {tabla} BEGIN '
+        f'DELETE FROM {nombre} WHERE id = old.id; END',
+    ], f'INSERT INTO {nombre} SELECT id, {origen} FROM {tabla}'
+
+
+def instalar(conexion=None):
+    """
+    Crea (si faltan) las tablas R-tree y sus triggers, y las repuebla cuando
+    los triggers no existían: Django reconstruye la tabla en algunas
+    migraciones de SQLite y eso borra los triggers. Devuelve False si la base
+    no es SQLite o no tiene el módulo rtree.
+    """
+    conexion = conexion or conexion_defecto
+    if conexion.vendor != 'sqlite':
+        return False
+
+    _disponible.pop(conexion.alias, None)
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existentes = {fila[0] for fila in cursor.fetchall()}
+        for nombre, config in INDICES.items():
+            if config['tabla'] not in existentes:
+                continue
+            sentencias, poblar = _sql_indice(nombre, config['tabla'], config['columnas'])
+            completo = {nombre, f'{nombre}_ai', f'{nombre}_au', f'{nombre}_ad'} <= existentes
+            if completo:
+                continue
+            try:
+                for sql in sentencias:
+                    cursor.execute(sql)
+            except DatabaseError as e:
+                logger.warning(f"⚠️ SQLite sin soporte R-tree ({e}); se usará clave_espacial")
+                return False
+            cursor.execute(f'DELETE FROM {nombre}')
+            cursor.execute(poblar)
+            logger.info(f"🌲 Índice R-tree {nombre} sincronizado")
+    return True
+
+
+def desinstalar(conexion=None):
+    conexion = conexion or conexion_defecto
+    if conexion.vendor != 'sqlite':
+        return
+    _disponible.pop(conexion.alias, None)
+    with conexion.cursor() as cursor:
+        for nombre in INDICES:
+            for sufijo in ('_ai', '_au', '_ad'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {nombre}{sufijo}')
+            cursor.execute(f'DROP TABLE IF EXISTS {nombre}')
+
+
+def disponible(conexion=None):
+    """True si el índice R-tree existe en la base (se consulta una vez por alias)"""
+    conexion = conexion or conexion_defecto
+    if conexion.alias not in _disponible:
+        existe = False
+        if conexion.vendor == 'sqlite':
+            with conexion.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'monitoreo_incendio_rtree'")
+                existe = cursor.fetchone() is not None
+        _disponible[conexion.alias] = existe
+    return _disponible[conexion.alias]
+
+
+def _candidatos(nombre, min_lat, min_lon, max_lat, max_lon):
+    with conexion_defecto.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM {nombre} WHERE max_lat >= %s AND min_lat <= %s '
+            f'AND max_lon >= %s AND min_lon <= %s',
+            [min_lat, max_lat, min_lon, max_lon]
+        )
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def detecciones_en_bbox(min_lat, min_lon, max_lat, max_lon, queryset=None):
+    """QuerySet de detecciones dentro del bbox, resuelto con el R-tree"""
+    from django.db.models.expressions import RawSQL
+    from monitoreo.models import IncendioForestal
+    from monitoreo.utils.clave_espacial import filtrar_bbox
+
+    queryset = IncendioForestal.objects.all() if queryset is None else queryset
+    if not disponible():
+        return filtrar_bbox(queryset, min_lat, min_lon, max_lat, max_lon)
+    return queryset.filter(
+        id__in=RawSQL(
+            'SELECT id FROM monitoreo_incendio_rtree WHERE max_lat >= %s AND min_lat <= %s '
+            'AND max_lon >= %s AND min_lon <= %s',
+            [min_lat, max_lat, min_lon, max_lon]
+        ),
+        # El R-tree guarda float32 redondeado hacia afuera: se afina con el valor exacto
+        latitud__range=(min_lat, max_lat),
+        longitud__range=(min_lon, max_lon),
+    )
+
+
+def _haversine(lat, lon, lat0, lon0):
+    lat, lon = np.radians(lat), np.radians(lon)
+    lat0, lon0 = math.radians(lat0), math.radians(lon0)
+    a = np.sin((lat - lat0) / 2) ** 2 + math.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(a))
+
+
+def detecciones_cerca(lat, lon, radio_km, queryset=None):
+    """
+    Detecciones a menos de radio_km, ordenadas por distancia. El R-tree da
+    los candidatos del bbox del círculo y la distancia exacta (haversine) se
+    calcula en NumPy solo sobre ellos; cada objeto trae `distancia_km`.
+    """
+    candidatos = list(detecciones_en_bbox(*bbox_radio(lat, lon, radio_km), queryset=queryset))
+    if not candidatos:
+        return []
+    distancias = _haversine(np.array([c.latitud for c in candidatos]),
+                            np.array([c.longitud for c in candidatos]), lat, lon)
+    cercanos = []
+    for i in np.argsort(distancias, kind='stable'):
+        if distancias[i] > radio_km:
+            break
+        candidatos[i].distancia_km = float(distancias[i])
+        cercanos.append(candidatos[i])
+    return cercanos
+
+
+def areas_para_punto(lat, lon):
+    """Áreas protegidas que contienen el punto: bbox por R-tree y prueba exacta en Python"""
+    from monitoreo.models import AreaProtegida
+
+    if disponible():
+        areas = AreaProtegida.objects.filter(
+            id__in=_candidatos('monitoreo_areaprotegida_rtree', lat, lon, lat, lon)
+        )
+    else:
+        areas = AreaProtegida.objects.filter(
+            min_latitud__lte=lat, max_latitud__gte=lat, min_longitud__lte=lon, max_longitud__gte=lon
+        )
+    x, y = np.array([lon], dtype=float), np.array([lat], dtype=float)
+    return [a for a in areas if puntos_en_poligono(x, y, a.aristas())[0]]
+
+
+def detecciones_en_area(area, queryset=None):
+    """Detecciones dentro del polígono del área: bbox por R-tree y prueba vectorizada"""
+    candidatos = list(detecciones_en_bbox(
+        area.min_latitud, area.min_longitud, area.max_latitud, area.max_longitud, queryset=queryset
+    ))
+    if not candidatos:
+        return []
+    dentro = puntos_en_poligono(np.array([c.longitud for c in candidatos], dtype=float),
+                                np.array([c.latitud for c in candidatos], dtype=float),
+                                area.aristas())
+    return [c for c, d in zip(candidatos, dentro) if d]
+
+
+def aristas_geojson(geometria):
+    """Aristas de un Polygon/MultiPolygon GeoJSON para puntos_en_poligono"""
+    return _aristas(_anillos(geometria))
@@ -0,0 +1,139 @@
+# monitoreo/utils/teselas.py
+import gzip
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from django.conf import settings
+
+from monitoreo.utils import mvt
+
+logger = logging.getLogger(__name__)
+
+CAPA = 'incendios'
+# Se toca en cada invalidación: una tesela renderizada antes no se guarda
+MARCA_INVALIDACION = '.invalidado'
+
+
+def configuracion():
+    """settings.TESELAS_MVT con valores por defecto"""
+    return {
+        'directorio': Path(settings.BASE_DIR) / 'cache' / 'teselas',
+        'zoom_maximo': 18,
+        'extension': 4096,
+        'margen': 64,
+        'max_detecciones': 50000,
+        'max_age': 60,
+        **getattr(settings, 'TESELAS_MVT', {}),
+    }
+
+
+def ruta(z, x, y, directorio=None):
+    return Path(directorio or configuracion()['directorio']) / str(z) / str(x) / f'{y}.pbf'
+
+
+def renderizar(z, x, y):
+    """
+    Tesela MVT (sin comprimir) con las detecciones de z/x/y y su margen, de
+    la más reciente a la más antigua. Las que caen en el mismo píxel de la
+    tesela se reducen a la más reciente, con 'cantidad' = detecciones del píxel.
+    """
+    from monitoreo.models import IncendioForestal
+    from monitoreo.utils.rtree import detecciones_en_bbox
+
+    config = configuracion()
+    extension = config['extension']
+    sur, oeste, norte, este = mvt.limites(z, x, y, margen=config['margen'] / extension)
+    filas = list(
+        detecciones_en_bbox(sur, oeste, norte, este, queryset=IncendioForestal.objects.all())
+        .order_by('-fecha_deteccion')
+        .values_list('id', 'latitud', 'longitud', 'fecha_deteccion', 'severidad', 'estado',
+                     'intensidad', 'frp', 'satelite')[:config['max_detecciones']]
+    )
+    if not filas:
+        return mvt.tesela()  # tesela vacía: cero bytes
+
+    ids, latitudes, longitudes = (np.array(c) for c in list(zip(*filas))[:3])
+    px, py = mvt.a_tesela(latitudes, longitudes, z, x, y, extension)
+    # np.unique devuelve la primera aparición de cada píxel: la más reciente
+    _, primeras, cantidades = np.unique(px * (4 * extension) + py, return_index=True, return_counts=True)
+    propiedades = [
+        {
+            'fecha': int(filas[i][3].timestamp()), 'severidad': filas[i][4], 'estado': filas[i][5],
+            'intensidad': filas[i][6], 'frp': filas[i][7], 'satelite': filas[i][8],
+            'cantidad': int(cantidad),
+        }
+        for i, cantidad in zip(primeras, cantidades)
+    ]
+    return mvt.tesela(mvt.capa_puntos(CAPA, px[primeras], py[primeras], propiedades,
+                                      ids=ids[primeras], extension=extension))
+
+
+def generar(z, x, y):
+    """
+    Renderiza z/x/y y la guarda comprimida con gzip en el cache de disco.
+    Devuelve los bytes comprimidos. Si hubo una invalidación mientras se
+    renderizaba, la tesela puede haber leído datos viejos y no se guarda.
+    """
+    directorio = Path(configuracion()['directorio'])
+    inicio = time.time()
+    datos = gzip.compress(renderizar(z, x, y), compresslevel=6, mtime=0)
+
+    destino = ruta(z, x, y, directorio)
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporal = destino.with_name(f'_{destino.name}-{uuid.uuid4().hex[:8]}')
+    temporal.write_bytes(datos)
+    try:
+        invalidada = (directorio / MARCA_INVALIDACION).stat().st_mtime >= inicio
+    except FileNotFoundError:
+        invalidada = False
+    if invalidada:
+        temporal.unlink()
+    else:
+        os.replace(temporal, destino)
+    return datos
+
+
+def invalidar(latitudes, longitudes, directorio=None):
+    """
+    Borra del cache las teselas de todos los zooms que contienen los puntos
+    o cuyo margen los alcanza. Llamar después de confirmar la escritura.
+    Devuelve la cantidad de archivos borrados.
+    """
+    config = configuracion()
+    directorio = Path(directorio or config['directorio'])
+    if not directorio.is_dir() or not len(latitudes):
+        return 0
+    (directorio / MARCA_INVALIDACION).touch()
+
+    lat = np.radians(np.clip(np.asarray(latitudes, dtype=float), -mvt.LATITUD_MAXIMA, mvt.LATITUD_MAXIMA))
+    tx = (np.asarray(longitudes, dtype=float) + 180) / 360
+    ty = (1 - np.arcsinh(np.tan(lat)) / np.pi) / 2
+    margen = config['margen'] / config['extension']
+
+    borradas = 0
+    for z in range(config['zoom_maximo'] + 1):
+        carpeta = directorio / str(z)
+        if not carpeta.is_dir():
+            continue
+        n = 2 ** z
+        # Un punto cerca del borde también aparece en el margen de la tesela vecina
+        xs = [np.floor(tx * n - margen), np.floor(tx * n + margen)]
+        ys = [np.floor(ty * n - margen), np.floor(ty * n + margen)]
+        pares = np.unique(np.concatenate([np.stack([a, b], axis=1) for a in xs for b in ys]), axis=0)
+        columnas = {x for x in np.unique(pares[:, 0]).astype(int).tolist() if (carpeta / str(x)).is_dir()}
+        for x, y in pares.astype(int).tolist():
+            if x not in columnas:
+                continue
+            try:
+                (carpeta / str(x) / f'{y}.pbf').unlink()
+                borradas += 1
+            except FileNotFoundError:
+                pass
+    if borradas:
+        logger.info(f"🧩 {borradas} tesela(s) invalidada(s) por {len(latitudes)} detecciones")
+    return borradas
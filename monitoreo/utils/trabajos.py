@@ -0,0 +1,119 @@
+# monitoreo/utils/trabajos.py
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+from monitoreo.utils.conexion_sqlite import escritura
+
+logger = logging.getLogger(__name__)
+
+ESTADOS_ACTIVOS = ('pendiente', 'en_curso')
+
+# Un trabajo 'en_curso' más antiguo que esto se considera abandonado
+# (por ejemplo, si el proceso web se reinició a mitad de la ingesta)
+TIEMPO_MAXIMO_TRABAJO = timedelta(hours=1)
+
+
+def encolar_actualizacion(days=7, sources=None):
+    """
+    Encola una actualización NASA FIRMS y devuelve (trabajo, fusionado).
+
+    Si ya hay un trabajo pendiente o en curso, el pedido se fusiona con él
+    en lugar de crear otro: un trabajo pendiente amplía sus parámetros y uno
+    en curso simplemente absorbe el pedido.
+    """
+    from monitoreo.models import TrabajoIngesta
+
+    sources = list(sources or ['MODIS_NRT'])
+    ahora = timezone.now()
+    with escritura():
+        TrabajoIngesta.objects.filter(
+            estado='en_curso', fecha_inicio__lt=ahora - TIEMPO_MAXIMO_TRABAJO
+        ).update(estado='error', error='Trabajo abandonado', fecha_fin=ahora)
+
+        # En SQLite select_for_update no bloquea nada: lo que serializa dos
+        # pedidos simultáneos es el BEGIN IMMEDIATE de escritura()
+        trabajo = (TrabajoIngesta.objects.select_for_update()
+                   .filter(estado__in=ESTADOS_ACTIVOS).order_by('fecha_creacion').first())
+        if trabajo is None:
+            trabajo = TrabajoIngesta.objects.create(parametros={'days': days, 'sources': sources})
+            return trabajo, False
+
+        if trabajo.estado == 'pendiente':
+            parametros = trabajo.parametros
+            parametros['days'] = max(parametros.get('days', days), days)
+            parametros['sources'] = list(dict.fromkeys(parametros.get('sources', []) + sources))
+            trabajo.parametros = parametros
+        trabajo.solicitudes = F('solicitudes') + 1
+        trabajo.save(update_fields=['parametros', 'solicitudes'])
+        trabajo.refresh_from_db()
+        return trabajo, True
+
+
+def ejecutar_trabajo(trabajo_id, updater=None):
+    """Ejecuta un trabajo pendiente; no hace nada si otro proceso ya lo tomó"""
+    from monitoreo.models import TrabajoIngesta
+    from monitoreo.utils.nasa_firms import NASAFirmsUpdater
+
+    # Reclamo atómico: solo un hilo/proceso pasa el trabajo a 'en_curso'
+    tomado = TrabajoIngesta.objects.filter(id=trabajo_id, estado='pendiente').update(
+        estado='en_curso', etapa='inicio', fecha_inicio=timezone.now()
+    )
+    if not tomado:
+        return None
+
+    trabajo = TrabajoIngesta.objects.get(id=trabajo_id)
+
+    def progreso(etapa, filas=0):
+        TrabajoIngesta.objects.filter(id=trabajo_id).update(
+            etapa=etapa, filas_procesadas=F('filas_procesadas') + filas
+        )
+
+    try:
+        updater = updater or NASAFirmsUpdater()
+        resultado = updater.ejecutar_actualizacion(
+            days=trabajo.parametros.get('days', 7),
+            sources=trabajo.parametros.get('sources'),
+            progreso=progreso
+        )
+        TrabajoIngesta.objects.filter(id=trabajo_id).update(
+            estado='completado', etapa='fin', resultado=resultado, fecha_fin=timezone.now()
+        )
+    except Exception as e:
+        logger.exception(f"Error en trabajo de ingesta #{trabajo_id}")
+        TrabajoIngesta.objects.filter(id=trabajo_id).update(
+            estado='error', error=str(e), fecha_fin=timezone.now()
+        )
+
+    return TrabajoIngesta.objects.get(id=trabajo_id)
+
+
+def lanzar_en_segundo_plano(trabajo_id):
+    """Ejecuta el trabajo en un hilo daemon del proceso web"""
+
+    def objetivo():
+        close_old_connections()
+        try:
+            ejecutar_trabajo(trabajo_id)
+        finally:
+            connections.close_all()
+
+    hilo = threading.Thread(target=objetivo, daemon=True, name=f'ingesta-{trabajo_id}')
+    hilo.start()
+    return hilo
+
+
+def procesar_pendientes():
+    """Ejecuta en orden los trabajos pendientes; devuelve cuántos se procesaron"""
+    from monitoreo.models import TrabajoIngesta
+
+    procesados = 0
+    for trabajo_id in TrabajoIngesta.objects.filter(estado='pendiente').order_by(
+            'fecha_creacion').values_list('id', flat=True):
+        if ejecutar_trabajo(trabajo_id) is not None:
+            procesados += 1
+    return procesados
@@ -1,20 +1,29 @@
 # monitoreo/views.py - Versión segura
 import folium
-from folium.plugins import HeatMap, MeasureControl, Geocoder
-from django.shortcuts import render
-from django.http import JsonResponse
+from folium.plugins import MeasureControl, Geocoder
+from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.contrib.auth.decorators import login_required
-from monitoreo.utils.nasa_firms import NASAFirmsUpdater
+from monitoreo.utils import clusters, consultas, densidad, geojson, teselas
+from monitoreo.utils.mapas import CapaIncendiosMVT
+from monitoreo.utils.resumen import estadisticas_generales
+from monitoreo.utils.trabajos import encolar_actualizacion, lanzar_en_segundo_plano
 from decouple import config
+import gzip
+from pathlib import Path
 import json
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.offline import plot
 import pandas as pd
-from django.db.models import Count, Sum, Avg
+from django.db.models import Max, Sum
 from django.utils import timezone
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 def index(request):
     """Página principal - versión segura sin dependencias de modelo"""
@@ -55,53 +64,26 @@ def mapa_avanzado(request):
         control_scale=True
     )
     
-    # Datos de ejemplo (más tarde vendrán de tu base de datos)
-    incendios_ejemplo = [
-        {'nombre': 'Incendio La Paz', 'lat': -16.5, 'lon': -68.2, 'intensidad': 0.8, 'severidad': 'alto'},
-        {'nombre': 'Incendio Santa Cruz', 'lat': -17.8, 'lon': -63.2, 'intensidad': 0.9, 'severidad': 'critico'},
-        {'nombre': 'Incendio Cochabamba', 'lat': -17.4, 'lon': -66.2, 'intensidad': 0.6, 'severidad': 'medio'},
-        {'nombre': 'Incendio Tarija', 'lat': -21.5, 'lon': -64.7, 'intensidad': 0.7, 'severidad': 'alto'},
-    ]
+    # Detecciones reales como teselas vectoriales (un marcador por detección
+    # congela el navegador con decenas de miles)
+    CapaIncendiosMVT(zoom_maximo=teselas.configuracion()['zoom_maximo']).add_to(m)
     
-    # Agregar cada incendio como marcador
-    for incendio in incendios_ejemplo:
-        # Determinar color según severidad
-        color_map = {
-            'bajo': 'green',
-            'medio': 'orange', 
-            'alto': 'red',
-            'critico': 'darkred'
-        }
-        color = color_map.get(incendio['severidad'], 'red')
-        
-        # Crear popup con información
-        popup_html = f"""
-        <div style="min-width: 200px;">
-            <h5><b>{incendio['nombre']}</b></h5>
-            <hr>
-            <p><b>Severidad:</b> {incendio['severidad'].title()}</p>
-            <p><b>Intensidad:</b> {incendio['intensidad']:.2f}</p>
-            <p><b>Coordenadas:</b><br>{incendio['lat']:.4f}, {incendio['lon']:.4f}</p>
-        </div>
-        """
-        
-        # Agregar marcador
-        folium.Marker(
-            location=[incendio['lat'], incendio['lon']],
-            popup=folium.Popup(popup_html, max_width=300),
-            tooltip=f"{incendio['nombre']} - {incendio['severidad'].title()}",
-            icon=folium.Icon(color=color, icon='fire', prefix='fa')
+    # Capas de calor precalculadas como teselas PNG (no se embeben los puntos
+    # en la página); sobre zoom_maximo Leaflet amplía las del último zoom
+    config_densidad = densidad.configuracion()
+    nombres = {'24h': 'Calor 24 h', '7d': 'Calor 7 días', '30d': 'Calor 30 días'}
+    for ventana in config_densidad['ventanas']:
+        folium.TileLayer(
+            tiles=f'/tiles/densidad/{ventana}/{{z}}/{{x}}/{{y}}.png',
+            name=nombres.get(ventana, f'Calor {ventana}'),
+            attr='NASA FIRMS',
+            overlay=True,
+            control=True,
+            show=ventana == '24h',
+            max_native_zoom=config_densidad['zoom_maximo'],
+            max_zoom=18,
         ).add_to(m)
     
-    # Agregar capa de calor
-    heat_data = []
-    for incendio in incendios_ejemplo:
-        # Peso basado en intensidad
-        weight = incendio['intensidad'] * 10
-        heat_data.append([incendio['lat'], incendio['lon'], weight])
-    
-    HeatMap(heat_data, radius=15, blur=10, max_zoom=10).add_to(m)
-    
     # Agregar controles de capas
     folium.TileLayer('cartodbpositron').add_to(m)
     folium.TileLayer('cartodbdark_matter').add_to(m)
@@ -137,17 +119,16 @@ def mapa_avanzado(request):
     # Convertir mapa a HTML
     mapa_html = m._repr_html_()
     
-    # Estadísticas
+    # Estadísticas (totales desde el resumen diario; activos por índice)
+    from monitoreo.models import IncendioForestal, ResumenDiario
+    
+    por_departamento = ResumenDiario.objects.filter(departamento__isnull=False).values(
+        'departamento__nombre'
+    ).annotate(cantidad=Sum('total')).order_by('-cantidad')
     estadisticas = {
-        'total_incendios': len(incendios_ejemplo),
-        'activos': len(incendios_ejemplo),  # Todos activos en ejemplo
-        'area_total': 1500.5,  # Ejemplo
-        'por_departamento': {
-            'La Paz': 1,
-            'Santa Cruz': 1,
-            'Cochabamba': 1,
-            'Tarija': 1
-        }
+        **estadisticas_generales(),
+        'activos': IncendioForestal.objects.filter(estado='activo').count(),
+        'por_departamento': {d['departamento__nombre']: d['cantidad'] for d in por_departamento if d['cantidad']},
     }
     
     return render(request, 'monitoreo/mapa_avanzado.html', {
@@ -157,43 +138,154 @@ def mapa_avanzado(request):
     })
 
 def api_incendios_json(request):
-    """API que devuelve incendios en formato JSON (sin GeoJSON por ahora)"""
-    # Datos de ejemplo
-    datos = {
+    """
+    Detecciones de IncendioForestal en JSON, de la más reciente a la más antigua.
+    
+    Filtros: bbox=oeste,sur,este,norte, desde, hasta, severidad, estado y
+    departamento. Paginación por cursor: `metadata.siguiente` se pasa como
+    ?cursor= para pedir la página siguiente (null en la última).
+    """
+    try:
+        filtros = consultas.parsear_filtros(request.GET)
+        limite = int(request.GET.get('limite', consultas.LIMITE_DEFECTO))
+        if not 1 <= limite <= consultas.LIMITE_MAXIMO:
+            raise ValueError(f"limite debe estar entre 1 y {consultas.LIMITE_MAXIMO}")
+        filas, siguiente = consultas.pagina(
+            consultas.filtrar_incendios(filtros), limite, request.GET.get('cursor')
+        )
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    campos = consultas.CAMPOS_API
+    departamentos = consultas.nombres_departamentos(fila[campos.index('departamento_id')] for fila in filas)
+    incendios = []
+    for fila in filas:
+        incendio = dict(zip(campos, fila))
+        incendio['fecha_deteccion'] = incendio['fecha_deteccion'].isoformat()
+        incendio['departamento'] = departamentos.get(incendio.pop('departamento_id'))
+        incendios.append(incendio)
+    
+    siguiente_url = None
+    if siguiente:
+        parametros = request.GET.copy()
+        parametros['cursor'] = siguiente
+        siguiente_url = f"{request.path}?{parametros.urlencode()}"
+    
+    return JsonResponse({
         'status': 'ok',
-        'incendios': [
-            {
-                'id': 1,
-                'nombre': 'Incendio La Paz',
-                'latitud': -16.5,
-                'longitud': -68.2,
-                'intensidad': 0.8,
-                'severidad': 'alto',
-                'departamento': 'La Paz'
-            },
-            {
-                'id': 2,
-                'nombre': 'Incendio Santa Cruz',
-                'latitud': -17.8,
-                'longitud': -63.2,
-                'intensidad': 0.9,
-                'severidad': 'critico',
-                'departamento': 'Santa Cruz'
-            }
-        ],
+        'incendios': incendios,
         'metadata': {
-            'total': 2,
-            'fuente': 'Datos de ejemplo',
-            'actualizado': '2024-12-10'
+            'cantidad': len(incendios),
+            'limite': limite,
+            'siguiente': siguiente,
+            'siguiente_url': siguiente_url,
+            'fuente': 'NASA FIRMS',
         }
+    })
+
+@gzip_page
+def api_incendios_geojson(request):
+    """
+    Detecciones como FeatureCollection GeoJSON en streaming, con los mismos
+    filtros que api_incendios_json y sin límite de cantidad. Se comprime con
+    gzip si el cliente lo acepta.
+    """
+    try:
+        filtros = consultas.parsear_filtros(request.GET)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    respuesta = StreamingHttpResponse(
+        geojson.feature_collection(consultas.filtrar_incendios(filtros)),
+        content_type='application/geo+json',
+    )
+    if request.GET.get('descargar'):
+        respuesta['Content-Disposition'] = 'attachment; filename="incendios.geojson"'
+    return respuesta
+
+def api_clusters(request):
+    """
+    Clusters de detecciones activas para un bbox y zoom del mapa, desde el
+    índice precalculado: centroide, cantidad y severidad máxima (y el id
+    cuando el cluster es una sola detección).
+    """
+    try:
+        if not request.GET.get('bbox'):
+            raise ValueError("bbox es obligatorio (oeste,sur,este,norte)")
+        sur, oeste, norte, este = consultas.parsear_bbox(request.GET['bbox'])
+        zoom = int(request.GET.get('zoom', 6))
+        if not 0 <= zoom <= 24:
+            raise ValueError("zoom debe estar entre 0 y 24")
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    
+    indice = clusters.obtener_indice()
+    if indice is None:
+        return JsonResponse({'status': 'error', 'message': 'Índice de clusters aún no generado'}, status=503)
+    seleccion = indice.consultar(sur, oeste, norte, este, zoom)
+    datos = {
+        'status': 'ok',
+        'zoom': zoom,
+        'clusters': [
+            {'lat': round(lat, 5), 'lon': round(lon, 5), 'cantidad': cantidad,
+             'severidad_max': clusters.SEVERIDADES[severidad], 'id': id if id >= 0 else None}
+            for lat, lon, cantidad, severidad, id in zip(
+                *(seleccion[c].tolist() for c in ('lat', 'lon', 'cantidad', 'severidad', 'id'))
+            )
+        ],
+        'metadata': {'detecciones': len(indice), 'generado': indice.generado.isoformat()},
     }
+    return HttpResponse(geojson.codificar(datos), content_type='application/json')
+
+def _etag_tesela(request, z, x, y):
+    """ETag del archivo en cache (None si aún no se generó)"""
+    try:
+        estado = teselas.ruta(z, x, y).stat()
+    except FileNotFoundError:
+        return None
+    return f'{estado.st_mtime_ns:x}-{estado.st_size:x}'
+
+@condition(etag_func=_etag_tesela)
+def tesela_mvt(request, z, x, y):
+    """
+    Detecciones de la tesela z/x/y como Mapbox Vector Tile (capa 'incendios').
+    Se sirve desde el cache en disco, ya comprimida con gzip; la ingesta
+    borra las teselas que toca y la siguiente solicitud la regenera.
+    """
+    config = teselas.configuracion()
+    if not (z <= config['zoom_maximo'] and x < 2 ** z and y < 2 ** z):
+        raise Http404('Tesela fuera de rango')
+    
+    ruta = teselas.ruta(z, x, y)
+    try:
+        archivo = open(ruta, 'rb')
+        datos = None
+    except FileNotFoundError:
+        datos = teselas.generar(z, x, y)
     
-    return JsonResponse(datos)
+    acepta_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if datos is None and acepta_gzip:
+        # sendfile/file_wrapper del servidor cuando está disponible
+        respuesta = FileResponse(archivo, content_type='application/vnd.mapbox-vector-tile')
+    else:
+        if datos is None:
+            with archivo:
+                datos = archivo.read()
+        respuesta = HttpResponse(datos if acepta_gzip else gzip.decompress(datos),
+                                 content_type='application/vnd.mapbox-vector-tile')
+    if acepta_gzip:
+        respuesta['Content-Encoding'] = 'gzip'
+    patch_vary_headers(respuesta, ['Accept-Encoding'])
+    patch_cache_control(respuesta, public=True, max_age=config['max_age'])
+    return respuesta
 
 @csrf_exempt
 @login_required
 def actualizar_datos_nasa(request):
-    """Endpoint para actualizar datos desde NASA FIRMS"""
+    """
+    Encola una actualización desde NASA FIRMS y responde de inmediato (202).
+    El progreso se consulta en el endpoint de estado del trabajo.
+    """
     if request.method != 'POST':
         return JsonResponse({'error': 'Método no permitido'}, status=405)
     
@@ -202,20 +294,23 @@ def actualizar_datos_nasa(request):
         if not api_key:
             return JsonResponse({'error': 'API Key no configurada'}, status=500)
         
-        updater = NASAFirmsUpdater(api_key=api_key)
-        
         # Obtener parámetros
         days = int(request.POST.get('days', 7))
+        sources = request.POST.getlist('source') or None
         
-        # Ejecutar actualización
-        resultados = updater.ejecutar_actualizacion(days=days)
+        # Encolar (o fusionar con un trabajo ya pendiente/en curso)
+        trabajo, fusionado = encolar_actualizacion(days=days, sources=sources)
+        if not fusionado:
+            lanzar_en_segundo_plano(trabajo.id)
         
         return JsonResponse({
-            'status': 'success',
-            'message': 'Datos actualizados correctamente',
-            'resultados': resultados,
+            'status': 'accepted',
+            'message': 'Actualización en curso' if fusionado else 'Actualización encolada',
+            'trabajo_id': trabajo.id,
+            'fusionado': fusionado,
+            'estado_url': reverse('estado_trabajo', args=[trabajo.id]),
             'timestamp': datetime.now().isoformat()
-        })
+        }, status=202)
         
     except Exception as e:
         return JsonResponse({
@@ -223,12 +318,33 @@ def actualizar_datos_nasa(request):
             'message': str(e)
         }, status=500)
 
+@login_required
+def estado_trabajo(request, trabajo_id):
+    """Estado de un trabajo de ingesta: etapa, filas procesadas y resultado"""
+    from monitoreo.models import TrabajoIngesta
+    
+    trabajo = get_object_or_404(TrabajoIngesta, id=trabajo_id)
+    return JsonResponse({
+        'status': 'ok',
+        'trabajo': {
+            'id': trabajo.id,
+            'estado': trabajo.estado,
+            'etapa': trabajo.etapa,
+            'filas_procesadas': trabajo.filas_procesadas,
+            'segundos': trabajo.segundos_transcurridos,
+            'solicitudes': trabajo.solicitudes,
+            'parametros': trabajo.parametros,
+            'resultado': trabajo.resultado,
+            'error': trabajo.error or None,
+        }
+    })
+
 def estado_actualizacion(request):
     """Muestra estado de la última actualización"""
     from monitoreo.models import IncendioForestal
     
-    # Obtener estadísticas
-    total = IncendioForestal.objects.count()
+    # Obtener estadísticas (total desde el resumen diario; activos y último por índice)
+    total = estadisticas_generales()['total_incendios']
     activos = IncendioForestal.objects.filter(estado='activo').count()
     ultimo = IncendioForestal.objects.order_by('-fecha_deteccion').first()
     
@@ -245,23 +361,25 @@ def estado_actualizacion(request):
 def dashboard(request):
     """Dashboard con gráficos de datos reales"""
     
-    from monitoreo.models import IncendioForestal, Departamento
+    from monitoreo.models import IncendioForestal, ResumenDiario
     
-    # Obtener datos
+    # Los agregados salen del resumen diario materializado: el costo no crece
+    # con el historial de detecciones
     incendios = IncendioForestal.objects.all()
+    resumen = ResumenDiario.objects.all()
     
     # Gráfico 1: Incendios por departamento (TOP 5)
-    depto_data = list(incendios.values('departamento__nombre').annotate(
-        total=Count('id'),
-        area_total=Sum('area_afectada_ha')
-    ).order_by('-total')[:5])
+    depto_data = list(resumen.values('departamento__nombre').annotate(
+        cantidad=Sum('total'),
+        area_total=Sum('area_total_ha')
+    ).order_by('-cantidad')[:5])
     
     if depto_data:
         fig1 = go.Figure(data=[
             go.Bar(
                 x=[d['departamento__nombre'] or 'Sin departamento' for d in depto_data],
-                y=[d['total'] for d in depto_data],
-                text=[d['total'] for d in depto_data],
+                y=[d['cantidad'] for d in depto_data],
+                text=[d['cantidad'] for d in depto_data],
                 textposition='auto',
                 marker_color='crimson'
             )
@@ -277,11 +395,11 @@ def dashboard(request):
         grafico1 = "<p class='text-muted'>No hay datos para mostrar</p>"
     
     # Gráfico 2: Distribución por severidad
-    severidad_data = list(incendios.values('severidad').annotate(total=Count('id')))
+    severidad_data = list(resumen.values('severidad').annotate(cantidad=Sum('total')).order_by('severidad'))
     
     if severidad_data:
         labels = [d['severidad'].title() for d in severidad_data]
-        values = [d['total'] for d in severidad_data]
+        values = [d['cantidad'] for d in severidad_data]
         
         colors = {'bajo': 'green', 'medio': 'yellow', 'alto': 'orange', 'critico': 'red'}
         color_sequence = [colors.get(sev.lower(), 'gray') for sev in labels]
@@ -298,12 +416,10 @@ def dashboard(request):
         grafico2 = "<p class='text-muted'>No hay datos para mostrar</p>"
     
     # Gráfico 3: Tendencia de últimos 30 días
-    fecha_limite = timezone.now() - timedelta(days=30)
-    tendencia_raw = incendios.filter(
-        fecha_deteccion__gte=fecha_limite
-    ).extra({
-        'fecha': "date(fecha_deteccion)"
-    }).values('fecha').annotate(total=Count('id')).order_by('fecha')
+    fecha_limite = timezone.localdate() - timedelta(days=30)
+    tendencia_raw = list(resumen.filter(
+        fecha__gte=fecha_limite
+    ).values('fecha').annotate(total=Sum('total', default=0)).order_by('fecha'))
     
     if tendencia_raw:
         tendencia_df = pd.DataFrame(list(tendencia_raw))
@@ -326,17 +442,12 @@ def dashboard(request):
         grafico3 = "<p class='text-muted'>No hay datos para mostrar</p>"
     
     # Estadísticas generales
+    ultima = resumen.aggregate(ultima=Max('fecha_actualizacion'))['ultima']
     estadisticas = {
-        'total_incendios': incendios.count(),
+        **estadisticas_generales(),
         'activos': incendios.filter(estado='activo').count(),
-        'area_total': incendios.aggregate(Sum('area_afectada_ha'))['area_afectada_ha__sum'] or 0,
-        'promedio_intensidad': incendios.aggregate(Avg('intensidad'))['intensidad__avg'] or 0,
-        'incendios_hoy': incendios.filter(
-            fecha_deteccion__date=timezone.now().date()
-        ).count(),
         'departamento_mas_afectado': depto_data[0]['departamento__nombre'] if depto_data else 'N/A',
-        'ultima_actualizacion': incendios.order_by('-fecha_ultima_actualizacion').first().fecha_ultima_actualizacion 
-                               if incendios.exists() else None,
+        'ultima_actualizacion': ultima,
     }
     
     # Incendios más recientes
@@ -350,4 +461,30 @@ def dashboard(request):
         'incendios_recientes': incendios_recientes,
         'title': 'Dashboard de Monitoreo en Tiempo Real',
         'api_key_configurada': bool(config('NASA_FIRMS_API_KEY', default=None))
-    })
\ No newline at end of file
+    })
+
+def _etag_densidad(request, ventana, z, x, y):
+    """ETag de la versión de las grillas: cambia con cada recálculo"""
+    try:
+        estado = (Path(densidad.configuracion()['directorio']) / 'densidad.npz').stat()
+    except FileNotFoundError:
+        return None
+    return f'{ventana}-{z}-{x}-{y}-{estado.st_mtime_ns:x}'
+
+@condition(etag_func=_etag_densidad)
+def tesela_densidad(request, ventana, z, x, y):
+    """
+    Mapa de calor de la ventana (24h, 7d, 30d) como tesela PNG z/x/y. Las
+    grillas se recalculan tras cada ingesta; las teselas se renderizan a
+    demanda y quedan en cache de disco hasta el siguiente recálculo.
+    """
+    config = densidad.configuracion()
+    if ventana not in config['ventanas'] or not (z <= config['zoom_maximo'] and x < 2 ** z and y < 2 ** z):
+        raise Http404('Tesela fuera de rango')
+    
+    contenido = densidad.tesela(ventana, z, x, y)
+    if contenido is None:
+        return HttpResponse('Mapa de calor aún no generado', status=503, content_type='text/plain')
+    respuesta = HttpResponse(contenido, content_type='image/png')
+    patch_cache_control(respuesta, public=True, max_age=config['max_age'])
+    return respuesta
@@ -1,5 +1,4 @@
 # test_nasa_detailed.py
-import requests
 import pandas as pd
 from io import StringIO
 import sys
@@ -10,6 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'incendios_bolivia.settings')
 
 from decouple import config
+from monitoreo.utils.http_firms import obtener_sesion
 
 def test_nasa_api():
     """Prueba detallada de la API de NASA FIRMS"""
@@ -32,7 +32,7 @@ def test_nasa_api():
     
     try:
         # 1. Hacer la petición
-        response = requests.get(url, timeout=30)
+        response = obtener_sesion().get(url, timeout=30)
         
         print(f"\n📊 Respuesta HTTP: {response.status_code}")
         print(f"   Tamaño respuesta: {len(response.text)} caracteres")